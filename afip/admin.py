@@ -1,3 +1,61 @@
 from django.contrib import admin
 
-# Register your models here.
+from estudios.contexto import filtrar_por_estudio
+
+from .models import TicketAcceso, ConsultaPadron, ColaComprobantes, Comprobante
+
+
+@admin.register(TicketAcceso)
+class TicketAccesoAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para los tickets del WSAA.
+    """
+    
+    list_display = ['cuit', 'servicio', 'generado', 'expira']
+    list_filter = ['servicio']
+    search_fields = ['cuit']
+    readonly_fields = ['cuit', 'servicio', 'token', 'sign', 'generado', 'expira', 'fecha_modificacion']
+
+
+@admin.register(ConsultaPadron)
+class ConsultaPadronAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para las consultas al padrón.
+    """
+    
+    list_display = ['cuit', 'encontrado', 'consultado']
+    list_filter = ['encontrado', 'consultado']
+    search_fields = ['cuit']
+    readonly_fields = ['cuit', 'encontrado', 'datos', 'consultado']
+
+
+@admin.register(ColaComprobantes)
+class ColaComprobantesAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para las colas de WSFE.
+    """
+    
+    list_display = ['cliente', 'punto_venta', 'tipo_cbte', 'procesando_desde']
+    list_filter = ['tipo_cbte']
+    search_fields = ['cliente__nombre', 'cliente__cuit']
+    raw_id_fields = ['cliente']
+    
+    def get_queryset(self, request):
+        return filtrar_por_estudio(super().get_queryset(request), 'cliente__estudio')
+
+
+@admin.register(Comprobante)
+class ComprobanteAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para los comprobantes.
+    """
+    
+    list_display = ['cola', 'numero', 'fecha', 'importe_total', 'estado', 'cae']
+    list_filter = ['estado', 'fecha']
+    search_fields = ['cae', 'cola__cliente__nombre', 'cola__cliente__cuit']
+    list_select_related = ['cola__cliente']
+    raw_id_fields = ['cola']
+    readonly_fields = ['numero', 'estado', 'intentos', 'cae', 'cae_vencimiento', 'observaciones']
+    
+    def get_queryset(self, request):
+        return filtrar_por_estudio(super().get_queryset(request), 'cola__cliente__estudio')
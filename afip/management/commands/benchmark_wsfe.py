@@ -0,0 +1,98 @@
+import http.server
+import re
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from afip.wsfe import NAMESPACE, ClienteWSFE, encolar_comprobante, procesar_cola
+from clientes.models import Cliente
+
+
+class WSFEFalso(http.server.BaseHTTPRequestHandler):
+    """
+    WSFE local que autoriza todo con una latencia fija por llamada.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    latencia = 0.05
+    ultimo = {}
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        time.sleep(self.latencia)
+        metodo = re.search(r'<ar:(\w+)>', cuerpo.split('<soap:Body>')[1]).group(1)
+
+        if metodo == 'FECompUltimoAutorizado':
+            resultado = f'<CbteNro>{self.ultimo.get("nro", 0)}</CbteNro>'
+        elif metodo == 'FECompTotXRequest':
+            resultado = '<RegXReq>250</RegXReq>'
+        else:
+            numeros = [int(n) for n in re.findall(r'<ar:CbteDesde>(\d+)</ar:CbteDesde>', cuerpo)]
+            self.ultimo['nro'] = max(numeros)
+            resultado = '<FeDetResp>' + ''.join(
+                f'<FECAEDetResponse><CbteDesde>{n}</CbteDesde><Resultado>A</Resultado>'
+                f'<CAE>7{n:013d}</CAE><CAEFchVto>20301231</CAEFchVto></FECAEDetResponse>'
+                for n in numeros
+            ) + '</FeDetResp>'
+
+        respuesta = (
+            '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+            f'<{metodo}Response xmlns="{NAMESPACE}"><{metodo}Result>{resultado}</{metodo}Result>'
+            f'</{metodo}Response></soap:Body></soap:Envelope>'
+        ).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(respuesta)))
+        self.end_headers()
+        self.wfile.write(respuesta)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Comparar envío por comprobante contra envío por lotes contra un WSFE local'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comprobantes', type=int, default=500)
+        parser.add_argument('--latencia', type=float, default=0.05, help='Segundos por llamada SOAP')
+
+    def handle(self, *args, **options):
+        WSFEFalso.latencia = options['latencia']
+        servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), WSFEFalso)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{servidor.server_port}/'
+
+        try:
+            for nombre, max_lote in [('Por comprobante', 1), ('Por lotes', 250)]:
+                segundos = self._medir(url, options['comprobantes'], max_lote)
+                self.stdout.write(
+                    f'{nombre}: {options["comprobantes"]} comprobantes en {segundos:.2f} s '
+                    f'({options["comprobantes"] / segundos:.1f} comprobantes/s)'
+                )
+        finally:
+            servidor.shutdown()
+
+    def _medir(self, url, cantidad, max_lote):
+        WSFEFalso.ultimo.clear()
+        with transaction.atomic():
+            cliente = Cliente.objects.create(
+                nombre='BENCHMARK WSFE', cuit='20-00000000-1', ptovta='1'
+            )
+            for _ in range(cantidad):
+                cbte = encolar_comprobante(
+                    cliente, 6, importe_neto=Decimal('100.00'), importe_iva=Decimal('21.00')
+                )
+
+            servicio = ClienteWSFE(cliente.cuit_sin_guiones, 'token', 'sign', url=url)
+            inicio = time.perf_counter()
+            resumen = procesar_cola(cbte.cola, servicio, max_lote=max_lote)
+            segundos = time.perf_counter() - inicio
+
+            assert resumen['autorizados'] == cantidad
+            transaction.set_rollback(True)
+        return segundos
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from afip.wsfe import procesar_colas
+
+
+class Command(BaseCommand):
+    help = 'Autorizar en WSFE los comprobantes pendientes de todas las colas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='URL alternativa del servicio WSFE')
+
+    def handle(self, *args, **options):
+        total = procesar_colas(url=options['url'])
+
+        for cola, error in total['errores'].items():
+            self.stdout.write(self.style.ERROR(f'{cola}: {error}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {total["autorizados"]} autorizados, '
+            f'{total["rechazados"]} rechazados, {total["reencolados"]} reencolados '
+            f'en {total["lotes"]} lotes ({total["segundos"]:.1f} s, '
+            f'{total["por_segundo"]:.1f} comprobantes/s).'
+        ))
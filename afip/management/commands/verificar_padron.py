@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+
+from afip.padron import consultar_padron, CONCURRENCIA
+from afip.wsaa import ErrorWSAA
+from clientes.models import Cliente
+from estudios.contexto import alcances, usar_estudio
+
+
+class Command(BaseCommand):
+    help = 'Verificar los CUIT de los clientes contra el padrón de AFIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Incluir clientes inactivos')
+        parser.add_argument('--forzar', action='store_true', help='Ignorar resultados en caché')
+        parser.add_argument('--concurrencia', type=int, default=CONCURRENCIA)
+        parser.add_argument('--url', help='URL alternativa del servicio de padrón')
+
+    def handle(self, *args, **options):
+        total = {'consultados': 0, 'desde_cache': 0, 'errores': 0, 'segundos': 0}
+        # Los clientes y la caché del padrón de un estudio con base propia están en su base
+        for estudio in alcances():
+            with usar_estudio(estudio):
+                try:
+                    resultado = self._verificar(options)
+                except ErrorWSAA as e:
+                    self.stdout.write(self.style.ERROR(f'No se pudo obtener el ticket de acceso: {e}'))
+                    return
+            total['consultados'] += resultado['consultados']
+            total['desde_cache'] += resultado['desde_cache']
+            total['errores'] += len(resultado['errores'])
+            total['segundos'] += resultado['segundos']
+
+        por_segundo = total['consultados'] / total['segundos'] if total['segundos'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {total["consultados"]} consultados, '
+            f'{total["desde_cache"]} desde caché, {total["errores"]} errores '
+            f'en {total["segundos"]:.1f} s ({por_segundo:.1f} CUIT/s).'
+        ))
+
+    def _verificar(self, options):
+        clientes = Cliente.objects.all() if options['todos'] else Cliente.objects.filter(activo=True)
+        nombres = dict(
+            (cuit.replace('-', ''), nombre)
+            for cuit, nombre in clientes.values_list('cuit', 'nombre')
+        )
+
+        resultado = consultar_padron(
+            list(nombres),
+            url=options['url'],
+            concurrencia=options['concurrencia'],
+            forzar=options['forzar'],
+        )
+
+        for cuit, consulta in sorted(resultado['resultados'].items()):
+            if not consulta.encontrado:
+                self.stdout.write(self.style.ERROR(f'{cuit} {nombres[cuit]}: no existe en el padrón'))
+            elif consulta.datos.get('estado_clave') not in ('', 'ACTIVO'):
+                self.stdout.write(self.style.WARNING(
+                    f'{cuit} {nombres[cuit]}: clave {consulta.datos["estado_clave"]}'
+                ))
+
+        for cuit, error in sorted(resultado['errores'].items()):
+            self.stdout.write(self.style.ERROR(f'{cuit} {nombres[cuit]}: {error}'))
+        return resultado
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketAcceso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cuit', models.CharField(help_text='CUIT sin guiones del representado', max_length=11, verbose_name='CUIT')),
+                ('servicio', models.CharField(help_text='Nombre del web service de AFIP (wsfe, ws_sr_padron_a5, etc.)', max_length=50, verbose_name='Servicio')),
+                ('token', models.TextField(blank=True, verbose_name='Token')),
+                ('sign', models.TextField(blank=True, verbose_name='Sign')),
+                ('generado', models.DateTimeField(blank=True, null=True, verbose_name='Generado')),
+                ('expira', models.DateTimeField(blank=True, null=True, verbose_name='Expira')),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True, verbose_name='Última Modificación')),
+            ],
+            options={
+                'verbose_name': 'Ticket de Acceso',
+                'verbose_name_plural': 'Tickets de Acceso',
+                'constraints': [models.UniqueConstraint(fields=('cuit', 'servicio'), name='ticket_acceso_cuit_servicio')],
+            },
+        ),
+    ]
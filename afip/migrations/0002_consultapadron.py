@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('afip', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaPadron',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cuit', models.CharField(help_text='CUIT sin guiones consultado', max_length=11, unique=True, verbose_name='CUIT')),
+                ('encontrado', models.BooleanField(default=False, verbose_name='Encontrado')),
+                ('datos', models.JSONField(blank=True, default=dict, help_text='Datos relevantes devueltos por el padrón', verbose_name='Datos')),
+                ('consultado', models.DateTimeField(verbose_name='Consultado')),
+            ],
+            options={
+                'verbose_name': 'Consulta de Padrón',
+                'verbose_name_plural': 'Consultas de Padrón',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('afip', '0002_consultapadron'),
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ColaComprobantes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('punto_venta', models.PositiveIntegerField(verbose_name='Punto de Venta')),
+                ('tipo_cbte', models.PositiveSmallIntegerField(help_text='Código AFIP del tipo de comprobante (1 = Factura A, 6 = Factura B, 11 = Factura C...)', verbose_name='Tipo de Comprobante')),
+                ('procesando_desde', models.DateTimeField(blank=True, null=True, verbose_name='Procesando Desde')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='colas_comprobantes', to='clientes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Cola de Comprobantes',
+                'verbose_name_plural': 'Colas de Comprobantes',
+            },
+        ),
+        migrations.CreateModel(
+            name='Comprobante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('concepto', models.PositiveSmallIntegerField(default=1, help_text='1 = Productos, 2 = Servicios, 3 = Productos y Servicios', verbose_name='Concepto')),
+                ('doc_tipo', models.PositiveSmallIntegerField(default=99, help_text='80 = CUIT, 96 = DNI, 99 = Consumidor Final', verbose_name='Tipo de Documento')),
+                ('doc_nro', models.BigIntegerField(default=0, verbose_name='Número de Documento')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('importe_neto', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Importe Neto')),
+                ('importe_iva', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Importe IVA')),
+                ('alicuota_iva', models.PositiveSmallIntegerField(default=5, help_text='Código AFIP de la alícuota (5 = 21%, 4 = 10,5%)', verbose_name='Alícuota IVA')),
+                ('importe_total', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Importe Total')),
+                ('numero', models.PositiveIntegerField(blank=True, help_text='Se asigna al enviar el comprobante a AFIP', null=True, verbose_name='Número')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('ENVIADO', 'Enviado'), ('AUTORIZADO', 'Autorizado'), ('RECHAZADO', 'Rechazado')], default='PENDIENTE', max_length=10, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('cae', models.CharField(blank=True, max_length=14, verbose_name='CAE')),
+                ('cae_vencimiento', models.DateField(blank=True, null=True, verbose_name='Vencimiento CAE')),
+                ('observaciones', models.TextField(blank=True, verbose_name='Observaciones')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('cola', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comprobantes', to='afip.colacomprobantes', verbose_name='Cola')),
+            ],
+            options={
+                'verbose_name': 'Comprobante',
+                'verbose_name_plural': 'Comprobantes',
+                'ordering': ['cola', 'numero', 'pk'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='colacomprobantes',
+            constraint=models.UniqueConstraint(fields=('cliente', 'punto_venta', 'tipo_cbte'), name='cola_comprobantes_cliente_ptovta_tipo'),
+        ),
+        migrations.AddIndex(
+            model_name='comprobante',
+            index=models.Index(fields=['cola', 'estado', 'id'], name='comprobante_cola_estado'),
+        ),
+    ]
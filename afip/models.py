@@ -1,3 +1,275 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class TicketAcceso(models.Model):
+    """
+    Ticket de acceso (TA) obtenido del WSAA para un CUIT y un servicio.
+
+    Se guarda en la base de datos para que todos los workers compartan el
+    mismo ticket mientras sea válido, en lugar de pedir uno nuevo cada uno.
+    """
+
+    cuit = models.CharField(
+        max_length=11,
+        verbose_name="CUIT",
+        help_text="CUIT sin guiones del representado"
+    )
+
+    servicio = models.CharField(
+        max_length=50,
+        verbose_name="Servicio",
+        help_text="Nombre del web service de AFIP (wsfe, ws_sr_padron_a5, etc.)"
+    )
+
+    token = models.TextField(
+        blank=True,
+        verbose_name="Token"
+    )
+
+    sign = models.TextField(
+        blank=True,
+        verbose_name="Sign"
+    )
+
+    generado = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Generado"
+    )
+
+    expira = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Expira"
+    )
+
+    fecha_modificacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Última Modificación"
+    )
+
+    class Meta:
+        verbose_name = "Ticket de Acceso"
+        verbose_name_plural = "Tickets de Acceso"
+        constraints = [
+            models.UniqueConstraint(fields=['cuit', 'servicio'], name='ticket_acceso_cuit_servicio')
+        ]
+
+    def __str__(self):
+        return f"{self.cuit} - {self.servicio}"
+
+    def vigente(self, margen=0):
+        """Indica si el ticket sigue siendo válido dentro de `margen` segundos"""
+        if not self.token or not self.expira:
+            return False
+        return (self.expira - timezone.now()).total_seconds() > margen
+
+
+class ConsultaPadron(models.Model):
+    """
+    Último resultado de la consulta al padrón de AFIP para un CUIT.
+
+    Funciona como caché con vencimiento: los CUIT consultados hace menos de
+    `AFIP_PADRON_TTL` segundos no se vuelven a pedir.
+    """
+
+    cuit = models.CharField(
+        max_length=11,
+        unique=True,
+        verbose_name="CUIT",
+        help_text="CUIT sin guiones consultado"
+    )
+
+    encontrado = models.BooleanField(
+        default=False,
+        verbose_name="Encontrado"
+    )
+
+    datos = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Datos",
+        help_text="Datos relevantes devueltos por el padrón"
+    )
+
+    consultado = models.DateTimeField(
+        verbose_name="Consultado"
+    )
+
+    class Meta:
+        verbose_name = "Consulta de Padrón"
+        verbose_name_plural = "Consultas de Padrón"
+
+    def __str__(self):
+        return f"{self.cuit} - {self.datos.get('razon_social', '')}"
+
+
+class ColaComprobantes(models.Model):
+    """
+    Cola de comprobantes a autorizar por WSFE para un cliente, punto de venta
+    y tipo de comprobante.
+
+    La numeración de AFIP es correlativa por (CUIT, punto de venta, tipo), así
+    que cada cola se procesa de a un proceso por vez. `procesando_desde`
+    funciona como un lease: se toma con un UPDATE condicional y vence solo si
+    el proceso que lo tenía murió.
+    """
+
+    cliente = models.ForeignKey(
+        'clientes.Cliente',
+        on_delete=models.CASCADE,
+        related_name='colas_comprobantes',
+        verbose_name="Cliente"
+    )
+
+    punto_venta = models.PositiveIntegerField(
+        verbose_name="Punto de Venta"
+    )
+
+    tipo_cbte = models.PositiveSmallIntegerField(
+        verbose_name="Tipo de Comprobante",
+        help_text="Código AFIP del tipo de comprobante (1 = Factura A, 6 = Factura B, 11 = Factura C...)"
+    )
+
+    procesando_desde = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Procesando Desde"
+    )
+
+    class Meta:
+        verbose_name = "Cola de Comprobantes"
+        verbose_name_plural = "Colas de Comprobantes"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cliente', 'punto_venta', 'tipo_cbte'],
+                name='cola_comprobantes_cliente_ptovta_tipo'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.cliente.cuit} - PV {self.punto_venta:04d} - Tipo {self.tipo_cbte}"
+
+
+class Comprobante(models.Model):
+    """
+    Comprobante electrónico pendiente o autorizado por WSFE.
+    """
+
+    PENDIENTE = 'PENDIENTE'
+    ENVIADO = 'ENVIADO'
+    AUTORIZADO = 'AUTORIZADO'
+    RECHAZADO = 'RECHAZADO'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (ENVIADO, 'Enviado'),
+        (AUTORIZADO, 'Autorizado'),
+        (RECHAZADO, 'Rechazado'),
+    ]
+
+    cola = models.ForeignKey(
+        ColaComprobantes,
+        on_delete=models.CASCADE,
+        related_name='comprobantes',
+        verbose_name="Cola"
+    )
+
+    concepto = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name="Concepto",
+        help_text="1 = Productos, 2 = Servicios, 3 = Productos y Servicios"
+    )
+
+    doc_tipo = models.PositiveSmallIntegerField(
+        default=99,
+        verbose_name="Tipo de Documento",
+        help_text="80 = CUIT, 96 = DNI, 99 = Consumidor Final"
+    )
+
+    doc_nro = models.BigIntegerField(
+        default=0,
+        verbose_name="Número de Documento"
+    )
+
+    fecha = models.DateField(
+        verbose_name="Fecha"
+    )
+
+    importe_neto = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        verbose_name="Importe Neto"
+    )
+
+    importe_iva = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        verbose_name="Importe IVA"
+    )
+
+    alicuota_iva = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name="Alícuota IVA",
+        help_text="Código AFIP de la alícuota (5 = 21%, 4 = 10,5%)"
+    )
+
+    importe_total = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        verbose_name="Importe Total"
+    )
+
+    numero = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Número",
+        help_text="Se asigna al enviar el comprobante a AFIP"
+    )
+
+    estado = models.CharField(
+        max_length=10,
+        choices=ESTADOS,
+        default=PENDIENTE,
+        verbose_name="Estado"
+    )
+
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Intentos"
+    )
+
+    cae = models.CharField(
+        max_length=14,
+        blank=True,
+        verbose_name="CAE"
+    )
+
+    cae_vencimiento = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Vencimiento CAE"
+    )
+
+    observaciones = models.TextField(
+        blank=True,
+        verbose_name="Observaciones"
+    )
+
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+
+    class Meta:
+        verbose_name = "Comprobante"
+        verbose_name_plural = "Comprobantes"
+        ordering = ['cola', 'numero', 'pk']
+        indexes = [
+            models.Index(fields=['cola', 'estado', 'id'], name='comprobante_cola_estado'),
+        ]
+
+    def __str__(self):
+        numero = f"{self.numero:08d}" if self.numero else "s/n"
+        return f"{self.cola} - {numero} ({self.estado})"
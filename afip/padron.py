@@ -0,0 +1,314 @@
+"""
+Consulta masiva al padrón de AFIP (ws_sr_padron_a5, método getPersona).
+
+Verificar toda la tabla de clientes de a un CUIT por vez tarda horas, casi
+todo esperando la red. `consultar_padron` resuelve el lote así:
+
+- Los CUIT con dígito verificador inválido se descartan sin consultarlos.
+- Los CUIT consultados hace menos de `AFIP_PADRON_TTL` segundos se toman de
+  `ConsultaPadron` con una sola consulta a la base.
+- El resto se pide en paralelo con concurrencia acotada sobre un pool de
+  conexiones HTTP keep-alive, reintentando con backoff exponencial los
+  errores de red y las respuestas 5xx.
+- Los resultados se guardan en bloque al final.
+
+Desde código asíncrono se usa `aconsultar_padron`, que corre las consultas
+en el event loop en curso.
+"""
+
+import asyncio
+import http.client
+import queue
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from clientes.cuit import validar_lote
+from monitoreo.metricas import contar_cache
+
+from .models import ConsultaPadron
+from .wsaa import obtener_ticket
+
+
+PADRON_URL = getattr(
+    settings, 'AFIP_PADRON_URL',
+    'https://awshomo.afip.gov.ar/sr-padron/webservices/personaServiceA5'
+)
+
+SERVICIO_PADRON = 'ws_sr_padron_a5'
+
+# CUIT del estudio, que consulta el padrón en nombre propio
+CUIT_REPRESENTADA = getattr(settings, 'AFIP_CUIT_REPRESENTADA', '')
+
+TTL = getattr(settings, 'AFIP_PADRON_TTL', 7 * 24 * 3600)
+
+CONCURRENCIA = getattr(settings, 'AFIP_PADRON_CONCURRENCIA', 16)
+
+REINTENTOS = 3
+
+TIMEOUT = getattr(settings, 'AFIP_TIMEOUT', 30)
+
+SOAP_GET_PERSONA = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:a5="http://a5.soap.ws.server.puc.sr/">
+<soapenv:Header/>
+<soapenv:Body>
+<a5:getPersona>
+<token>{token}</token>
+<sign>{sign}</sign>
+<cuitRepresentada>{representada}</cuitRepresentada>
+<idPersona>{cuit}</idPersona>
+</a5:getPersona>
+</soapenv:Body>
+</soapenv:Envelope>"""
+
+
+class ErrorPadron(Exception):
+    """Error al consultar el padrón de AFIP"""
+
+
+class ErrorTransitorio(ErrorPadron):
+    """Error de red o del servidor que vale la pena reintentar"""
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones HTTP persistentes a un mismo host.
+
+    Cada conexión se usa por un solo hilo a la vez y se devuelve al pool al
+    terminar, de modo que las consultas reutilizan la conexión TCP/TLS.
+    """
+
+    def __init__(self, url, tamanio):
+        partes = urlsplit(url)
+        self.ruta = partes.path or '/'
+        self._clase = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self._host = partes.hostname
+        self._puerto = partes.port
+        self._libres = queue.LifoQueue()
+        for _ in range(tamanio):
+            self._libres.put(None)
+
+    def post(self, cuerpo, headers):
+        """
+        Envía un POST y retorna (status, cuerpo de la respuesta).
+        """
+        conexion = self._libres.get()
+        if conexion is None:
+            conexion = self._clase(self._host, self._puerto, timeout=TIMEOUT)
+        try:
+            conexion.request('POST', self.ruta, body=cuerpo, headers=headers)
+            respuesta = conexion.getresponse()
+            contenido = respuesta.read()
+        except (OSError, http.client.HTTPException) as e:
+            conexion.close()
+            conexion = None
+            raise ErrorTransitorio(f'Error de conexión con el padrón: {e}') from e
+        finally:
+            self._libres.put(conexion)
+        return respuesta.status, contenido
+
+    def cerrar(self):
+        while not self._libres.empty():
+            conexion = self._libres.get_nowait()
+            if conexion is not None:
+                conexion.close()
+
+
+def interpretar_persona(cuerpo):
+    """
+    Extrae los datos relevantes de la respuesta de getPersona.
+    Retorna None si el CUIT no existe en el padrón.
+    """
+    raiz = ElementTree.fromstring(cuerpo)
+    valores = {}
+    for elemento in raiz.iter():
+        nombre = elemento.tag.rsplit('}', 1)[-1]
+        if elemento.text and elemento.text.strip():
+            valores.setdefault(nombre, elemento.text.strip())
+
+    if 'faultstring' in valores:
+        if 'no existe' in valores['faultstring'].lower():
+            return None
+        raise ErrorPadron(valores['faultstring'])
+
+    if 'idPersona' not in valores:
+        return None
+
+    razon_social = valores.get('razonSocial') or ' '.join(
+        filter(None, [valores.get('apellido'), valores.get('nombre')])
+    )
+    return {
+        'razon_social': razon_social,
+        'tipo_persona': valores.get('tipoPersona', ''),
+        'estado_clave': valores.get('estadoClave', ''),
+        'domicilio': valores.get('direccion', ''),
+        'localidad': valores.get('localidad', ''),
+        'provincia': valores.get('descripcionProvincia', ''),
+    }
+
+
+class ConsultorPadron:
+    """
+    Motor asíncrono de consultas al padrón con concurrencia acotada.
+    """
+
+    def __init__(self, token, sign, representada, url=None, concurrencia=CONCURRENCIA, reintentos=REINTENTOS):
+        self.token = token
+        self.sign = sign
+        self.representada = representada
+        self.concurrencia = concurrencia
+        self.reintentos = reintentos
+        self.pool = PoolConexiones(url or PADRON_URL, concurrencia)
+
+    def consultar(self, cuit):
+        """
+        Consulta un CUIT de forma bloqueante. Retorna los datos o None.
+        """
+        cuerpo = SOAP_GET_PERSONA.format(
+            token=escape(self.token), sign=escape(self.sign),
+            representada=self.representada, cuit=cuit,
+        ).encode('utf-8')
+        status, contenido = self.pool.post(cuerpo, {
+            'Content-Type': 'text/xml; charset=utf-8',
+            'SOAPAction': '""',
+        })
+        if status >= 500 and b'Fault' not in contenido:
+            raise ErrorTransitorio(f'El padrón respondió {status}')
+        return interpretar_persona(contenido)
+
+    async def _consultar_con_reintentos(self, cuit, semaforo, ejecutor):
+        loop = asyncio.get_running_loop()
+        async with semaforo:
+            for intento in range(self.reintentos + 1):
+                try:
+                    return cuit, await loop.run_in_executor(ejecutor, self.consultar, cuit), None
+                except ErrorTransitorio as e:
+                    if intento == self.reintentos:
+                        return cuit, None, str(e)
+                    await asyncio.sleep((2 ** intento) * 0.5 + random.random() * 0.1)
+                except (ErrorPadron, ElementTree.ParseError) as e:
+                    return cuit, None, str(e)
+
+    async def consultar_lote(self, cuits):
+        """
+        Consulta todos los CUIT y retorna una lista de (cuit, datos, error).
+        """
+        semaforo = asyncio.Semaphore(self.concurrencia)
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as ejecutor:
+            try:
+                return await asyncio.gather(*(
+                    self._consultar_con_reintentos(cuit, semaforo, ejecutor) for cuit in cuits
+                ))
+            finally:
+                self.pool.cerrar()
+
+
+def _desde_cache(cuits, ttl, forzar):
+    """
+    Descarta los CUIT inválidos y toma de `ConsultaPadron` los consultados
+    hace menos de `ttl` segundos. Retorna (pendientes, resultados, errores).
+    """
+    cuits = list(dict.fromkeys(cuit.replace('-', '') for cuit in cuits))
+
+    # Los CUIT con dígito verificador inválido no se consultan
+    validos = validar_lote(cuits)
+    errores = {cuit: 'CUIT inválido' for cuit, valido in zip(cuits, validos) if not valido}
+    cuits = [cuit for cuit, valido in zip(cuits, validos) if valido]
+
+    resultados = {}
+    if not forzar:
+        limite = timezone.now() - timedelta(seconds=ttl)
+        for consulta in ConsultaPadron.objects.filter(cuit__in=cuits, consultado__gte=limite):
+            resultados[consulta.cuit] = consulta
+    contar_cache('padron', True, len(resultados))
+    contar_cache('padron', False, len(cuits) - len(resultados))
+
+    pendientes = [cuit for cuit in cuits if cuit not in resultados]
+    return pendientes, resultados, errores
+
+
+def _consultor(url, concurrencia):
+    ticket = obtener_ticket(CUIT_REPRESENTADA, SERVICIO_PADRON)
+    return ConsultorPadron(
+        ticket.token, ticket.sign, CUIT_REPRESENTADA.replace('-', ''),
+        url=url, concurrencia=concurrencia,
+    )
+
+
+def _guardar(lote, resultados, errores):
+    """
+    Guarda en bloque las respuestas (cuit, datos, error) del padrón.
+    """
+    ahora = timezone.now()
+    nuevas = []
+    for cuit, datos, error in lote:
+        if error:
+            errores[cuit] = error
+            continue
+        consulta = ConsultaPadron(
+            cuit=cuit, encontrado=datos is not None, datos=datos or {}, consultado=ahora
+        )
+        nuevas.append(consulta)
+        resultados[cuit] = consulta
+
+    ConsultaPadron.objects.bulk_create(
+        nuevas,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['cuit'],
+        update_fields=['encontrado', 'datos', 'consultado'],
+    )
+
+
+def _resumen(inicio, pendientes, resultados, errores, invalidos, desde_cache):
+    segundos = time.perf_counter() - inicio
+    consultados = len(pendientes) - (len(errores) - invalidos)
+    return {
+        'resultados': resultados,
+        'errores': errores,
+        'invalidos': invalidos,
+        'desde_cache': desde_cache,
+        'consultados': consultados,
+        'segundos': segundos,
+        'por_segundo': consultados / segundos if segundos else 0,
+    }
+
+
+def consultar_padron(cuits, url=None, concurrencia=CONCURRENCIA, ttl=TTL, forzar=False):
+    """
+    Consulta el padrón para una lista de CUIT (con o sin guiones).
+
+    Retorna un diccionario con `resultados` ({cuit: ConsultaPadron}),
+    `errores` ({cuit: mensaje}) y las métricas de la corrida. Corre su
+    propio event loop: desde código asíncrono se usa `aconsultar_padron`.
+    """
+    inicio = time.perf_counter()
+    pendientes, resultados, errores = _desde_cache(cuits, ttl, forzar)
+    invalidos, desde_cache = len(errores), len(resultados)
+    if pendientes:
+        consultor = _consultor(url, concurrencia)
+        _guardar(asyncio.run(consultor.consultar_lote(pendientes)), resultados, errores)
+    return _resumen(inicio, pendientes, resultados, errores, invalidos, desde_cache)
+
+
+async def aconsultar_padron(cuits, url=None, concurrencia=CONCURRENCIA, ttl=TTL, forzar=False):
+    """
+    Versión asíncrona de `consultar_padron`, para usar dentro de un event
+    loop (vistas asíncronas, ASGI).
+    """
+    inicio = time.perf_counter()
+    pendientes, resultados, errores = await sync_to_async(_desde_cache)(cuits, ttl, forzar)
+    invalidos, desde_cache = len(errores), len(resultados)
+    if pendientes:
+        consultor = await sync_to_async(_consultor)(url, concurrencia)
+        lote = await consultor.consultar_lote(pendientes)
+        await sync_to_async(_guardar)(lote, resultados, errores)
+    return _resumen(inicio, pendientes, resultados, errores, invalidos, desde_cache)
@@ -0,0 +1,31 @@
+from procesos.cola import tarea
+
+from .padron import consultar_padron
+from .wsfe import procesar_colas
+
+
+@tarea('afip.emitir_comprobantes')
+def emitir_comprobantes():
+    """Autoriza en WSFE los comprobantes pendientes de todas las colas"""
+    total = procesar_colas()
+    return {clave: valor for clave, valor in total.items() if clave != 'segundos'}
+
+
+@tarea('afip.verificar_padron')
+def verificar_padron(cuits, forzar=False):
+    """Consulta el padrón para los CUIT indicados"""
+    resultado = consultar_padron(cuits, forzar=forzar)
+    return {
+        'consultados': resultado['consultados'],
+        'desde_cache': resultado['desde_cache'],
+        'errores': resultado['errores'],
+    }
+
+
+@tarea('afip.verificar_padron_cliente')
+def verificar_padron_cliente(cliente_id, periodo):
+    """Verifica en el padrón el CUIT de un cliente (para programaciones por cliente)"""
+    from clientes.models import Cliente
+
+    cuit = Cliente.objects.values_list('cuit', flat=True).get(pk=cliente_id)
+    return verificar_padron([cuit])
@@ -1,3 +1,579 @@
-from django.test import TestCase
+import http.server
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from xml.sax.saxutils import escape
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from clientes.cuit import digito_verificador
+from clientes.models import Cliente
+
+from . import padron, wsaa, wsfe
+from .models import ColaComprobantes, Comprobante, ConsultaPadron, TicketAcceso
+
+
+CUIT = '20111111112'
+
+
+class WSAAFalso(http.server.BaseHTTPRequestHandler):
+    """
+    WSAA local que entrega un ticket nuevo en cada loginCms y cuenta los
+    pedidos.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    latencia = 0
+    pedidos = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        with self.lock:
+            WSAAFalso.pedidos += 1
+            numero = WSAAFalso.pedidos
+        time.sleep(self.latencia)
+
+        if '<wsaa:loginCms>' not in cuerpo:
+            self.send_error(500)
+            return
+        ahora = timezone.now()
+        ticket = (
+            '<?xml version="1.0" encoding="UTF-8"?><loginTicketResponse version="1.0"><header>'
+            f'<generationTime>{ahora.isoformat()}</generationTime>'
+            f'<expirationTime>{(ahora + timedelta(hours=12)).isoformat()}</expirationTime>'
+            f'</header><credentials><token>token-{numero}</token><sign>sign-{numero}</sign></credentials>'
+            '</loginTicketResponse>'
+        )
+        respuesta = (
+            '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"><soapenv:Body>'
+            '<loginCmsResponse xmlns="http://wsaa.view.sua.dvadac.desein.afip.gov">'
+            f'<loginCmsReturn>{escape(ticket)}</loginCmsReturn></loginCmsResponse>'
+            '</soapenv:Body></soapenv:Envelope>'
+        ).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(respuesta)))
+        self.end_headers()
+        self.wfile.write(respuesta)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorWSAA:
+    """
+    Levanta `WSAAFalso` y apunta el cliente del WSAA a él. Los certificados
+    se generan con openssl si está disponible; si no, no se firma.
+    """
+
+    @classmethod
+    def iniciar(cls, prueba):
+        WSAAFalso.pedidos = 0
+        WSAAFalso.latencia = 0
+        servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), WSAAFalso)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        prueba.addCleanup(servidor.server_close)
+        prueba.addCleanup(servidor.shutdown)
+
+        parches = [mock.patch.object(wsaa, 'WSAA_URL', f'http://127.0.0.1:{servidor.server_port}/')]
+        if shutil.which('openssl'):
+            directorio = tempfile.mkdtemp()
+            prueba.addCleanup(shutil.rmtree, directorio)
+            subprocess.run(
+                ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                 '-subj', '/CN=prueba', '-keyout', os.path.join(directorio, f'{CUIT}.key'),
+                 '-out', os.path.join(directorio, f'{CUIT}.crt')],
+                check=True, capture_output=True,
+            )
+            parches.append(mock.patch.object(wsaa, 'CERTIFICADOS_DIR', directorio))
+        else:
+            parches.append(mock.patch.object(wsaa, 'firmar_tra', lambda tra, cuit: 'cms'))
+        for parche in parches:
+            parche.start()
+            prueba.addCleanup(parche.stop)
+
+
+class ObtenerTicketTests(TestCase):
+
+    def setUp(self):
+        ServidorWSAA.iniciar(self)
+
+    def test_sin_ticket_pide_uno_al_wsaa(self):
+        ticket = wsaa.obtener_ticket(CUIT, 'wsfe')
+
+        self.assertEqual(WSAAFalso.pedidos, 1)
+        self.assertEqual(ticket.token, 'token-1')
+        self.assertTrue(TicketAcceso.objects.get(cuit=CUIT, servicio='wsfe').vigente())
+
+    def test_ticket_vigente_sale_de_la_cache(self):
+        wsaa.obtener_ticket(CUIT, 'wsfe')
+        ticket = wsaa.obtener_ticket(CUIT, 'wsfe')
+
+        self.assertEqual(WSAAFalso.pedidos, 1)
+        self.assertEqual(ticket.token, 'token-1')
+
+    def test_renueva_antes_de_vencer(self):
+        TicketAcceso.objects.create(
+            cuit=CUIT, servicio='wsfe', token='viejo', sign='viejo',
+            expira=timezone.now() + timedelta(seconds=wsaa.MARGEN_RENOVACION - 60),
+        )
+
+        ticket = wsaa.obtener_ticket(CUIT, 'wsfe')
+
+        self.assertEqual(WSAAFalso.pedidos, 1)
+        self.assertEqual(ticket.token, 'token-1')
+
+    def test_renovacion_anticipada_en_curso_usa_el_ticket_actual(self):
+        TicketAcceso.objects.create(
+            cuit=CUIT, servicio='wsfe', token='viejo', sign='viejo',
+            expira=timezone.now() + timedelta(seconds=wsaa.MARGEN_RENOVACION - 60),
+        )
+
+        # Otro hilo del proceso está renovando el ticket
+        with wsaa._bloqueo_local('default', CUIT, 'wsfe', False):
+            ticket = wsaa.obtener_ticket(CUIT, 'wsfe')
+
+        self.assertEqual(WSAAFalso.pedidos, 0)
+        self.assertEqual(ticket.token, 'viejo')
+
+    def test_ticket_por_servicio(self):
+        wsaa.obtener_ticket(CUIT, 'wsfe')
+        wsaa.obtener_ticket(CUIT, 'ws_sr_padron_a5')
+
+        self.assertEqual(WSAAFalso.pedidos, 2)
+
+    def test_error_si_openssl_no_termina(self):
+        with mock.patch.object(wsaa, 'rutas_certificado', return_value=('crt', 'key')), \
+                mock.patch.object(wsaa.subprocess, 'run', side_effect=subprocess.TimeoutExpired('openssl', 1)):
+            with self.assertRaises(wsaa.ErrorWSAA):
+                wsaa.firmar_tra('<tra/>', CUIT)
+
+
+class ObtenerTicketConcurrenteTests(TransactionTestCase):
+
+    def setUp(self):
+        ServidorWSAA.iniciar(self)
+        # Más lento que la llegada de los hilos, para que se superpongan
+        WSAAFalso.latencia = 0.3
+
+    def test_un_solo_pedido_con_llamadas_concurrentes(self):
+        hilos = 8
+        barrera = threading.Barrier(hilos)
+        tokens = []
+        errores = []
+
+        def pedir():
+            try:
+                barrera.wait()
+                tokens.append(wsaa.obtener_ticket(CUIT, 'wsfe').token)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connection.close()
+
+        trabajadores = [threading.Thread(target=pedir) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(WSAAFalso.pedidos, 1)
+        self.assertEqual(tokens, ['token-1'] * hilos)
+
+
+def cuits_validos(cantidad):
+    """
+    Retorna `cantidad` CUIT válidos, sin guiones.
+    """
+    cuits = []
+    numero = 10000000
+    while len(cuits) < cantidad:
+        base = f'20{numero}'
+        digito = digito_verificador(base)
+        if digito < 10:
+            cuits.append(f'{base}{digito}')
+        numero += 1
+    return cuits
+
+
+class PadronFalso(http.server.BaseHTTPRequestHandler):
+    """
+    Padrón local: responde getPersona con una persona por CUIT, una falla
+    SOAP para los `inexistentes` y un 503 mientras queden `fallas` de ese
+    CUIT. Cuenta los pedidos por CUIT y las conexiones.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    pedidos = {}
+    conexiones = set()
+    fallas = {}
+    inexistentes = set()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        cuit = re.search(r'<idPersona>(\d+)</idPersona>', cuerpo).group(1)
+        with self.lock:
+            PadronFalso.pedidos[cuit] = PadronFalso.pedidos.get(cuit, 0) + 1
+            PadronFalso.conexiones.add(self.client_address)
+            falla = PadronFalso.fallas.get(cuit, 0)
+            if falla:
+                PadronFalso.fallas[cuit] = falla - 1
+
+        if falla:
+            self._responder(503, b'no disponible')
+        elif cuit in self.inexistentes:
+            self._responder(500, (
+                '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+                '<soap:Fault><faultcode>soap:Server</faultcode>'
+                '<faultstring>No existe persona con ese Id</faultstring></soap:Fault>'
+                '</soap:Body></soap:Envelope>'
+            ).encode())
+        else:
+            self._responder(200, (
+                '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+                '<ns2:getPersonaResponse xmlns:ns2="http://a5.soap.ws.server.puc.sr/"><personaReturn>'
+                f'<datosGenerales><idPersona>{cuit}</idPersona><razonSocial>Persona {cuit}</razonSocial>'
+                '<tipoPersona>JURIDICA</tipoPersona><estadoClave>ACTIVO</estadoClave></datosGenerales>'
+                '</personaReturn></ns2:getPersonaResponse></soap:Body></soap:Envelope>'
+            ).encode())
+
+    def _responder(self, status, contenido):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def log_message(self, *args):
+        pass
+
+
+class ConsultarPadronTests(TestCase):
+
+    def setUp(self):
+        PadronFalso.pedidos = {}
+        PadronFalso.conexiones = set()
+        PadronFalso.fallas = {}
+        PadronFalso.inexistentes = set()
+        servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), PadronFalso)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        self.url = f'http://127.0.0.1:{servidor.server_port}/padron'
+
+        ticket = TicketAcceso(cuit='', servicio=padron.SERVICIO_PADRON, token='token', sign='sign')
+        for parche in (
+            mock.patch.object(padron, 'obtener_ticket', return_value=ticket),
+            # Sin las esperas del backoff
+            mock.patch.object(padron.asyncio, 'sleep', mock.AsyncMock()),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def test_lote_concurrente(self):
+        cuits = cuits_validos(20)
+        PadronFalso.inexistentes = {cuits[0]}
+
+        resultado = padron.consultar_padron(cuits + ['20-12345678-0'], url=self.url, concurrencia=4)
+
+        self.assertEqual(resultado['errores'], {'20123456780': 'CUIT inválido'})
+        self.assertEqual(resultado['consultados'], 20)
+        self.assertEqual(PadronFalso.pedidos, {cuit: 1 for cuit in cuits})
+        # Las conexiones keep-alive se reutilizan: una por consulta en paralelo
+        self.assertLessEqual(len(PadronFalso.conexiones), 4)
+        self.assertFalse(resultado['resultados'][cuits[0]].encontrado)
+        self.assertEqual(resultado['resultados'][cuits[1]].datos['razon_social'], f'Persona {cuits[1]}')
+        self.assertEqual(ConsultaPadron.objects.count(), 20)
+
+    def test_reintenta_errores_transitorios(self):
+        recuperado, caido = cuits_validos(2)
+        PadronFalso.fallas = {recuperado: 2, caido: padron.REINTENTOS + 1}
+
+        resultado = padron.consultar_padron([recuperado, caido], url=self.url)
+
+        self.assertEqual(PadronFalso.pedidos, {recuperado: 3, caido: padron.REINTENTOS + 1})
+        self.assertTrue(resultado['resultados'][recuperado].encontrado)
+        self.assertIn('503', resultado['errores'][caido])
+        self.assertFalse(ConsultaPadron.objects.filter(cuit=caido).exists())
+
+    def test_reutiliza_consultas_dentro_del_ttl(self):
+        vigente, vencido = cuits_validos(2)
+        padron.consultar_padron([vigente, vencido], url=self.url)
+        ConsultaPadron.objects.filter(cuit=vencido).update(
+            consultado=timezone.now() - timedelta(seconds=padron.TTL + 1)
+        )
+
+        resultado = padron.consultar_padron([vigente, vencido], url=self.url)
+
+        self.assertEqual(resultado['desde_cache'], 1)
+        self.assertEqual(PadronFalso.pedidos, {vigente: 1, vencido: 2})
+
+        padron.consultar_padron([vigente], url=self.url, forzar=True)
+        self.assertEqual(PadronFalso.pedidos[vigente], 2)
+
+    async def test_version_asincronica(self):
+        cuits = cuits_validos(3)
+
+        resultado = await padron.aconsultar_padron(cuits, url=self.url)
+
+        self.assertEqual(resultado['consultados'], 3)
+        self.assertEqual(await ConsultaPadron.objects.acount(), 3)
+
+
+VENCIMIENTO_CAE = timezone.localdate() + timedelta(days=10)
+
+
+class WSFEFalso:
+    """
+    WSFE en memoria con la interfaz de `ClienteWSFE`. Numera en forma
+    correlativa, rechaza los importes de `rechazar` y todo lo que viene
+    detrás en el mismo lote, y con `cortar` autoriza el lote pero no
+    responde, como un timeout de lectura.
+    """
+
+    def __init__(self, autorizados=None, max_lote=250):
+        self.autorizados = dict(autorizados or {})
+        self.rechazar = set()
+        self.cortar = False
+        self.error = None
+        self.al_enviar = None
+        self.lotes = []
+        self._max_lote = max_lote
+
+    def max_lote(self):
+        return self._max_lote
+
+    def ultimo_autorizado(self, punto_venta, tipo_cbte):
+        return max(self.autorizados, default=0)
+
+    def consultar(self, punto_venta, tipo_cbte, numero):
+        if numero not in self.autorizados:
+            raise wsfe.ErrorWSFE(f'602: No existe el comprobante {numero}')
+        return 'A', f'CAE{numero:011d}', VENCIMIENTO_CAE, self.autorizados[numero]
+
+    def solicitar_cae(self, punto_venta, tipo_cbte, comprobantes):
+        if self.al_enviar:
+            self.al_enviar()
+        if self.error:
+            raise self.error
+        self.lotes.append([cbte.numero for cbte in comprobantes])
+
+        respuestas = {}
+        rechazo = False
+        for cbte in comprobantes:
+            rechazo = rechazo or cbte.importe_total in self.rechazar
+            if rechazo:
+                respuestas[cbte.numero] = ('R', '', None, '10016: Número no correlativo')
+            else:
+                self.autorizados[cbte.numero] = cbte.importe_total
+                respuestas[cbte.numero] = ('A', f'CAE{cbte.numero:011d}', VENCIMIENTO_CAE, '')
+
+        if self.cortar:
+            self.cortar = False
+            raise wsfe.ErrorComunicacionWSFE('Error de comunicación con WSFE: timed out')
+        return respuestas
+
+
+class ColaWSFETests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente', cuit='20-11111111-2', ptovta='3')
+
+    def _encolar(self, *importes):
+        return [
+            wsfe.encolar_comprobante(self.cliente, 11, importe_neto=Decimal(importe))
+            for importe in importes
+        ]
+
+    def _estados(self, comprobantes):
+        for cbte in comprobantes:
+            cbte.refresh_from_db()
+        return [(cbte.estado, cbte.numero) for cbte in comprobantes]
+
+    def test_encolar_sin_punto_de_venta(self):
+        self.cliente.ptovta = ''
+
+        with self.assertRaises(wsfe.ErrorWSFE):
+            wsfe.encolar_comprobante(self.cliente, 11, importe_neto=Decimal('100'))
+
+    def test_lease(self):
+        cola = self._encolar('100')[0].cola
+
+        lease = wsfe.tomar_cola(cola)
+        self.assertIsNotNone(lease)
+        self.assertIsNone(wsfe.tomar_cola(cola))
+
+        # Solo el dueño del lease lo renueva
+        self.assertIsNone(wsfe.renovar_cola(cola, lease - timedelta(seconds=1)))
+        lease = wsfe.renovar_cola(cola, lease)
+        self.assertIsNotNone(lease)
+
+        # Un lease vencido se puede volver a tomar
+        ColaComprobantes.objects.filter(pk=cola.pk).update(
+            procesando_desde=timezone.now() - timedelta(seconds=wsfe.DURACION_LEASE + 1)
+        )
+        self.assertIsNotNone(wsfe.tomar_cola(cola))
+
+        wsfe.liberar_cola(cola)
+        cola.refresh_from_db()
+        self.assertIsNone(cola.procesando_desde)
+
+    def test_cola_tomada_no_se_procesa(self):
+        comprobante, = self._encolar('100')
+        wsfe.tomar_cola(comprobante.cola)
+        servicio = WSFEFalso()
+
+        resumen = wsfe.procesar_cola(comprobante.cola, servicio)
+
+        self.assertEqual(resumen['lotes'], 0)
+        self.assertEqual(servicio.lotes, [])
+
+    def test_lotes_por_max_lote(self):
+        comprobantes = self._encolar('100', '200', '300', '400', '500')
+        servicio = WSFEFalso(autorizados={7: Decimal('1')}, max_lote=2)
+
+        resumen = wsfe.procesar_cola(comprobantes[0].cola, servicio)
+
+        self.assertEqual(resumen, {'autorizados': 5, 'rechazados': 0, 'reencolados': 0, 'lotes': 3})
+        self.assertEqual(servicio.lotes, [[8, 9], [10, 11], [12]])
+        self.assertEqual(
+            self._estados(comprobantes),
+            [(Comprobante.AUTORIZADO, numero) for numero in range(8, 13)],
+        )
+        self.assertEqual(comprobantes[0].cae, 'CAE00000000008')
+        self.assertEqual(comprobantes[0].cae_vencimiento, VENCIMIENTO_CAE)
+        comprobantes[0].cola.refresh_from_db()
+        self.assertIsNone(comprobantes[0].cola.procesando_desde)
+
+    def test_rechazo_reencola_los_siguientes(self):
+        comprobantes = self._encolar('100', '200', '300', '400')
+        servicio = WSFEFalso()
+        servicio.rechazar = {Decimal('200')}
+
+        resumen = wsfe.procesar_cola(comprobantes[0].cola, servicio)
+
+        self.assertEqual(resumen, {'autorizados': 3, 'rechazados': 1, 'reencolados': 2, 'lotes': 2})
+        # Los que quedaron detrás del rechazo se renumeran sin dejar huecos
+        self.assertEqual(servicio.lotes, [[1, 2, 3, 4], [2, 3]])
+        self.assertEqual(self._estados(comprobantes), [
+            (Comprobante.AUTORIZADO, 1),
+            (Comprobante.RECHAZADO, None),
+            (Comprobante.AUTORIZADO, 2),
+            (Comprobante.AUTORIZADO, 3),
+        ])
+        self.assertIn('10016', comprobantes[1].observaciones)
+        self.assertEqual(comprobantes[3].intentos, 2)
+
+    def test_reencolado_sin_intentos_se_rechaza(self):
+        comprobantes = self._encolar('100', '200')
+        Comprobante.objects.filter(pk=comprobantes[1].pk).update(intentos=wsfe.MAX_INTENTOS - 1)
+        servicio = WSFEFalso()
+        servicio.rechazar = {Decimal('100')}
+
+        resumen = wsfe.procesar_cola(comprobantes[0].cola, servicio)
+
+        self.assertEqual(resumen['rechazados'], 2)
+        self.assertEqual(
+            self._estados(comprobantes),
+            [(Comprobante.RECHAZADO, None), (Comprobante.RECHAZADO, None)],
+        )
+
+    def test_error_de_wsfe_devuelve_el_lote_a_la_cola(self):
+        comprobantes = self._encolar('100', '200')
+        servicio = WSFEFalso()
+        servicio.error = wsfe.ErrorWSFE('No se pudo conectar con WSFE')
+
+        with self.assertRaises(wsfe.ErrorWSFE):
+            wsfe.procesar_cola(comprobantes[0].cola, servicio)
+
+        self.assertEqual(
+            self._estados(comprobantes),
+            [(Comprobante.PENDIENTE, None), (Comprobante.PENDIENTE, None)],
+        )
+        comprobantes[0].cola.refresh_from_db()
+        self.assertIsNone(comprobantes[0].cola.procesando_desde)
+
+    def test_envio_sin_respuesta_queda_enviado_y_se_concilia(self):
+        comprobantes = self._encolar('100', '200')
+        cola = comprobantes[0].cola
+        servicio = WSFEFalso()
+        servicio.cortar = True
+
+        with self.assertRaises(wsfe.ErrorComunicacionWSFE):
+            wsfe.procesar_cola(cola, servicio)
+
+        self.assertEqual(
+            self._estados(comprobantes),
+            [(Comprobante.ENVIADO, 1), (Comprobante.ENVIADO, 2)],
+        )
+
+        resumen = wsfe.procesar_cola(cola, servicio)
+
+        # Se concilian con FECompConsultar, sin volver a enviarlos
+        self.assertEqual(resumen['lotes'], 0)
+        self.assertEqual(servicio.lotes, [[1, 2]])
+        self.assertEqual(
+            self._estados(comprobantes),
+            [(Comprobante.AUTORIZADO, 1), (Comprobante.AUTORIZADO, 2)],
+        )
+        self.assertEqual(comprobantes[1].cae, 'CAE00000000002')
+
+    def test_recuperar_enviados(self):
+        comprobantes = self._encolar('100', '200', '300', '400')
+        for cbte, numero in zip(comprobantes, (1, 2, 3, 5)):
+            Comprobante.objects.filter(pk=cbte.pk).update(estado=Comprobante.ENVIADO, numero=numero)
+        # El 2 figura con otro importe y el 3 no se puede consultar
+        servicio = WSFEFalso(autorizados={1: Decimal('100'), 2: Decimal('999'), 4: Decimal('1')})
+
+        wsfe.procesar_cola(comprobantes[0].cola, servicio)
+
+        self.assertEqual(self._estados(comprobantes), [
+            (Comprobante.AUTORIZADO, 1),
+            (Comprobante.ENVIADO, 2),
+            (Comprobante.ENVIADO, 3),
+            # Por encima del último autorizado: nunca llegó y se renumera
+            (Comprobante.AUTORIZADO, 5),
+        ])
+        self.assertIn('verificar manualmente', comprobantes[1].observaciones)
+        self.assertIn('no se pudo consultar', comprobantes[2].observaciones)
+        self.assertEqual(servicio.lotes, [[5]])
+
+    def test_lease_tomado_por_otro_proceso_corta(self):
+        comprobantes = self._encolar('100', '200')
+        cola = comprobantes[0].cola
+        otro = timezone.now() + timedelta(minutes=1)
+        servicio = WSFEFalso(max_lote=1)
+        servicio.al_enviar = lambda: ColaComprobantes.objects.filter(pk=cola.pk).update(procesando_desde=otro)
+
+        with self.assertRaisesMessage(wsfe.ErrorWSFE, 'Otro proceso tomó la cola'):
+            wsfe.procesar_cola(cola, servicio)
+
+        self.assertEqual(servicio.lotes, [[1]])
+        self.assertEqual(self._estados(comprobantes)[1], (Comprobante.PENDIENTE, None))
+        # El lease del otro proceso no se libera
+        cola.refresh_from_db()
+        self.assertEqual(cola.procesando_desde, otro)
+
+    def test_conexion_rechazada_no_es_error_de_comunicacion(self):
+        with socket.socket() as libre:
+            libre.bind(('127.0.0.1', 0))
+            puerto = libre.getsockname()[1]
+        servicio = wsfe.ClienteWSFE(CUIT, 'token', 'sign', url=f'http://127.0.0.1:{puerto}/wsfe')
+
+        with self.assertRaises(wsfe.ErrorWSFE) as contexto:
+            servicio.ultimo_autorizado(3, 11)
+
+        self.assertNotIsInstance(contexto.exception, wsfe.ErrorComunicacionWSFE)
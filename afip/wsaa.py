@@ -0,0 +1,257 @@
+"""
+Cliente del WSAA (Web Service de Autenticación y Autorización) de AFIP.
+
+Obtener un ticket de acceso requiere firmar un TRA en CMS con el certificado
+del representado y hacer un round-trip SOAP al WSAA, y AFIP rechaza pedidos
+repetidos mientras haya un ticket vigente. Por eso los tickets se guardan en
+`TicketAcceso` y se comparten entre todos los workers:
+
+- Si el ticket está vigente y lejos de expirar se devuelve sin más.
+- Si está cerca de expirar, un solo proceso lo renueva; el resto sigue
+  usando el ticket actual mientras tanto.
+- Si venció, los procesos esperan al que lo está renovando y usan el nuevo.
+
+La exclusión entre procesos usa `SELECT ... FOR UPDATE` sobre la fila del
+ticket en PostgreSQL y un archivo de bloqueo en las bases que no lo soportan
+(SQLite).
+"""
+
+import base64
+import os
+import subprocess
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from datetime import timedelta
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db import connections, router, transaction, IntegrityError, OperationalError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import TicketAcceso
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+WSAA_URL = getattr(settings, 'AFIP_WSAA_URL', 'https://wsaahomo.afip.gov.ar/ws/services/LoginCms')
+
+# Directorio con los certificados de cada CUIT ({cuit}.crt y {cuit}.key)
+CERTIFICADOS_DIR = getattr(settings, 'AFIP_CERTIFICADOS_DIR', None)
+
+# Segundos antes del vencimiento en que se renueva el ticket
+MARGEN_RENOVACION = getattr(settings, 'AFIP_WSAA_MARGEN_RENOVACION', 600)
+
+# Duración solicitada para cada ticket (AFIP otorga hasta 12 horas)
+DURACION_TICKET = getattr(settings, 'AFIP_WSAA_DURACION', 12 * 3600)
+
+TIMEOUT = getattr(settings, 'AFIP_TIMEOUT', 30)
+
+# Segundos máximos para firmar el TRA con openssl
+TIMEOUT_FIRMA = 30
+
+SOAP_LOGIN = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:wsaa="http://wsaa.view.sua.dvadac.desein.afip.gov">
+<soapenv:Header/>
+<soapenv:Body>
+<wsaa:loginCms><wsaa:in0>{cms}</wsaa:in0></wsaa:loginCms>
+</soapenv:Body>
+</soapenv:Envelope>"""
+
+_bloqueos_locales = {}
+_bloqueos_locales_lock = threading.Lock()
+
+
+class ErrorWSAA(Exception):
+    """Error al obtener un ticket de acceso del WSAA"""
+
+
+def crear_tra(servicio, ahora=None):
+    """
+    Arma el XML del ticket de requerimiento de acceso (TRA).
+    """
+    ahora = ahora or timezone.now()
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<loginTicketRequest version="1.0"><header>'
+        f'<uniqueId>{int(ahora.timestamp())}</uniqueId>'
+        f'<generationTime>{(ahora - timedelta(minutes=10)).isoformat()}</generationTime>'
+        f'<expirationTime>{(ahora + timedelta(seconds=DURACION_TICKET)).isoformat()}</expirationTime>'
+        f'</header><service>{escape(servicio)}</service></loginTicketRequest>'
+    )
+
+
+def rutas_certificado(cuit):
+    """
+    Retorna las rutas (certificado, clave privada) configuradas para el CUIT.
+    """
+    if not CERTIFICADOS_DIR:
+        raise ErrorWSAA('AFIP_CERTIFICADOS_DIR no está configurado')
+    certificado = os.path.join(CERTIFICADOS_DIR, f'{cuit}.crt')
+    clave = os.path.join(CERTIFICADOS_DIR, f'{cuit}.key')
+    if not (os.path.exists(certificado) and os.path.exists(clave)):
+        raise ErrorWSAA(f'No hay certificado configurado para el CUIT {cuit}')
+    return certificado, clave
+
+
+def firmar_tra(tra, cuit):
+    """
+    Firma el TRA en formato CMS con el certificado del CUIT usando openssl.
+    Retorna el CMS codificado en base64.
+    """
+    certificado, clave = rutas_certificado(cuit)
+    try:
+        # Con timeout: se firma con el bloqueo del ticket tomado
+        resultado = subprocess.run(
+            ['openssl', 'smime', '-sign', '-signer', certificado, '-inkey', clave,
+             '-outform', 'DER', '-nodetach'],
+            input=tra.encode('utf-8'),
+            capture_output=True,
+            timeout=TIMEOUT_FIRMA,
+        )
+    except subprocess.TimeoutExpired:
+        raise ErrorWSAA(f'openssl no terminó de firmar el TRA en {TIMEOUT_FIRMA} segundos')
+    except OSError as e:
+        raise ErrorWSAA(f'No se pudo ejecutar openssl: {e}') from e
+    if resultado.returncode != 0:
+        raise ErrorWSAA(f'Error al firmar el TRA: {resultado.stderr.decode(errors="replace")}')
+    return base64.b64encode(resultado.stdout).decode('ascii')
+
+
+def login_cms(cms, url=None):
+    """
+    Llama a `loginCms` del WSAA y retorna un diccionario con token, sign,
+    generado y expira.
+    """
+    pedido = urllib.request.Request(
+        url or WSAA_URL,
+        data=SOAP_LOGIN.format(cms=cms).encode('utf-8'),
+        headers={'Content-Type': 'text/xml; charset=utf-8', 'SOAPAction': '""'},
+    )
+    try:
+        with urllib.request.urlopen(pedido, timeout=TIMEOUT) as respuesta:
+            cuerpo = respuesta.read()
+    except urllib.error.HTTPError as e:
+        cuerpo = e.read()
+        raise ErrorWSAA(f'El WSAA respondió {e.code}: {_falla_soap(cuerpo)}') from e
+    except OSError as e:
+        raise ErrorWSAA(f'No se pudo conectar con el WSAA: {e}') from e
+
+    retorno = _buscar(ElementTree.fromstring(cuerpo), 'loginCmsReturn')
+    if retorno is None or not retorno.text:
+        raise ErrorWSAA('Respuesta del WSAA sin loginCmsReturn')
+
+    ticket = ElementTree.fromstring(retorno.text.encode('utf-8'))
+    return {
+        'token': ticket.findtext('credentials/token'),
+        'sign': ticket.findtext('credentials/sign'),
+        'generado': parse_datetime(ticket.findtext('header/generationTime')),
+        'expira': parse_datetime(ticket.findtext('header/expirationTime')),
+    }
+
+
+def _buscar(elemento, nombre):
+    for hijo in elemento.iter():
+        if hijo.tag.rsplit('}', 1)[-1] == nombre:
+            return hijo
+    return None
+
+
+def _falla_soap(cuerpo):
+    try:
+        falla = _buscar(ElementTree.fromstring(cuerpo), 'faultstring')
+    except ElementTree.ParseError:
+        return cuerpo[:200].decode(errors='replace')
+    return falla.text if falla is not None else ''
+
+
+def obtener_ticket(cuit, servicio):
+    """
+    Retorna un `TicketAcceso` vigente para el CUIT y servicio, renovándolo en
+    el WSAA si hace falta.
+    """
+    cuit = cuit.replace('-', '')
+    ticket = TicketAcceso.objects.filter(cuit=cuit, servicio=servicio).first()
+    if ticket and ticket.vigente(MARGEN_RENOVACION):
+        return ticket
+
+    # Con un ticket todavía válido no vale la pena esperar a otro hilo o
+    # proceso que lo esté renovando
+    anticipada = bool(ticket and ticket.vigente())
+    # El estudio en curso puede tener los tickets en su propia base
+    base = router.db_for_write(TicketAcceso)
+    with _bloqueo_local(base, cuit, servicio, anticipada) as tomado:
+        if not tomado:
+            return ticket
+        return _renovar(base, cuit, servicio, ticket, anticipada)
+
+
+def _renovar(base, cuit, servicio, ticket_actual, anticipada):
+    try:
+        with _bloqueo_compartido(base, cuit, servicio, anticipada):
+            # La fila se crea en una transacción corta, para no retener la
+            # escritura durante el pedido al WSAA
+            try:
+                TicketAcceso.objects.using(base).get_or_create(cuit=cuit, servicio=servicio)
+            except IntegrityError:
+                # Otro proceso la creó a la vez: el FOR UPDATE la encuentra
+                pass
+            with transaction.atomic(using=base):
+                ticket = TicketAcceso.objects.using(base).select_for_update(nowait=anticipada).get(
+                    cuit=cuit, servicio=servicio
+                )
+                if ticket.vigente(MARGEN_RENOVACION):
+                    # Otro proceso lo renovó mientras esperábamos
+                    return ticket
+
+                datos = login_cms(firmar_tra(crear_tra(servicio), cuit))
+                for campo, valor in datos.items():
+                    setattr(ticket, campo, valor)
+                ticket.save(using=base)
+                return ticket
+    except (OperationalError, BlockingIOError):
+        # Otro proceso ya está renovando el ticket
+        if anticipada:
+            return ticket_actual
+        raise
+
+
+@contextmanager
+def _bloqueo_local(base, cuit, servicio, sin_espera):
+    """
+    Exclusión entre los hilos del proceso. Indica si se tomó el bloqueo:
+    con `sin_espera` no se espera al hilo que ya lo tiene.
+    """
+    with _bloqueos_locales_lock:
+        bloqueo = _bloqueos_locales.setdefault((base, cuit, servicio), threading.Lock())
+    tomado = bloqueo.acquire(blocking=not sin_espera)
+    try:
+        yield tomado
+    finally:
+        if tomado:
+            bloqueo.release()
+
+
+@contextmanager
+def _bloqueo_compartido(base, cuit, servicio, sin_espera):
+    """
+    Exclusión entre procesos para las bases sin `SELECT ... FOR UPDATE`.
+    """
+    if connections[base].features.has_select_for_update or fcntl is None:
+        yield
+        return
+
+    ruta = os.path.join(tempfile.gettempdir(), f'afip_wsaa_{base}_{cuit}_{servicio}.lock')
+    with open(ruta, 'w') as archivo:
+        fcntl.flock(archivo, fcntl.LOCK_EX | (fcntl.LOCK_NB if sin_espera else 0))
+        try:
+            yield
+        finally:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
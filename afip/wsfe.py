@@ -0,0 +1,433 @@
+"""
+Autorización de comprobantes electrónicos por WSFE (FECAESolicitar).
+
+Los comprobantes se encolan por (cliente, punto de venta, tipo) y se envían
+en lotes: `FECAESolicitar` acepta hasta `FECompTotXRequest` comprobantes por
+llamada, así que procesar la cola de a uno desperdicia round-trips y
+consume el límite de pedidos de AFIP.
+
+Para cada lote se toma el lease de la cola, se consulta el último número
+autorizado, se numeran los pendientes en orden de alta y se envían juntos.
+Los rechazados quedan con sus observaciones y los que venían después de un
+rechazo vuelven a la cola para renumerarse en el lote siguiente, de modo que
+la numeración nunca tiene huecos.
+
+Si el envío se corta sin respuesta (por ejemplo por un timeout de lectura)
+AFIP pudo haber autorizado el lote, así que los comprobantes quedan ENVIADO
+hasta la próxima corrida, que los concilia con FECompUltimoAutorizado y
+FECompConsultar en lugar de renumerarlos.
+"""
+
+import socket
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from decimal import Decimal
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from estudios.contexto import alcances, usar_estudio
+
+from .models import ColaComprobantes, Comprobante
+from .wsaa import obtener_ticket
+
+
+WSFE_URL = getattr(settings, 'AFIP_WSFE_URL', 'https://wswhomo.afip.gov.ar/wsfev1/service.asmx')
+
+SERVICIO_WSFE = 'wsfe'
+
+NAMESPACE = 'http://ar.gov.afip.dif.FEV1/'
+
+# Máximo de comprobantes por FECAESolicitar si AFIP no informa otro valor
+MAX_LOTE = getattr(settings, 'AFIP_WSFE_MAX_LOTE', 250)
+
+# Segundos tras los cuales se considera abandonado el lease de una cola
+DURACION_LEASE = 300
+
+# Veces que se reintenta un comprobante que quedó detrás de un rechazo
+MAX_INTENTOS = 5
+
+TIMEOUT = getattr(settings, 'AFIP_TIMEOUT', 30)
+
+SOAP = """<?xml version="1.0" encoding="UTF-8"?>
+<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" xmlns:ar="{ns}">
+<soap:Header/>
+<soap:Body><ar:{metodo}>{auth}{cuerpo}</ar:{metodo}></soap:Body>
+</soap:Envelope>"""
+
+
+class ErrorWSFE(Exception):
+    """Error devuelto por WSFE o de comunicación con el servicio"""
+
+
+class ErrorComunicacionWSFE(ErrorWSFE):
+    """Error de comunicación después del cual no se sabe si WSFE procesó el pedido"""
+
+
+class ClienteWSFE:
+    """
+    Cliente SOAP mínimo para los métodos de WSFE que usa la cola.
+    """
+
+    def __init__(self, cuit, token, sign, url=None):
+        self.cuit = cuit
+        self.token = token
+        self.sign = sign
+        self.url = url or WSFE_URL
+
+    def _llamar(self, metodo, cuerpo=''):
+        auth = (
+            f'<ar:Auth><ar:Token>{escape(self.token)}</ar:Token>'
+            f'<ar:Sign>{escape(self.sign)}</ar:Sign><ar:Cuit>{self.cuit}</ar:Cuit></ar:Auth>'
+        )
+        pedido = urllib.request.Request(
+            self.url,
+            data=SOAP.format(ns=NAMESPACE, metodo=metodo, auth=auth, cuerpo=cuerpo).encode('utf-8'),
+            headers={
+                'Content-Type': 'text/xml; charset=utf-8',
+                'SOAPAction': f'"{NAMESPACE}{metodo}"',
+            },
+        )
+        try:
+            with urllib.request.urlopen(pedido, timeout=TIMEOUT) as respuesta:
+                raiz = ElementTree.fromstring(respuesta.read())
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, (ConnectionRefusedError, socket.gaierror)):
+                # No se llegó a conectar: el pedido no se envió
+                raise ErrorWSFE(f'No se pudo conectar con WSFE: {e}') from e
+            raise ErrorComunicacionWSFE(f'Error de comunicación con WSFE: {e}') from e
+        except (OSError, ElementTree.ParseError) as e:
+            raise ErrorComunicacionWSFE(f'Error de comunicación con WSFE: {e}') from e
+
+        resultado = raiz.find(f'.//{{{NAMESPACE}}}{metodo}Result')
+        if resultado is None:
+            raise ErrorComunicacionWSFE(f'Respuesta de WSFE sin {metodo}Result')
+        return resultado
+
+    @staticmethod
+    def _mensajes(elemento, contenedor):
+        return '; '.join(
+            f'{item.findtext(f"{{{NAMESPACE}}}Code")}: {item.findtext(f"{{{NAMESPACE}}}Msg")}'
+            for item in elemento.findall(f'{{{NAMESPACE}}}{contenedor}/*')
+        )
+
+    def max_lote(self):
+        """Cantidad máxima de comprobantes por FECAESolicitar"""
+        resultado = self._llamar('FECompTotXRequest')
+        return int(resultado.findtext(f'{{{NAMESPACE}}}RegXReq') or MAX_LOTE)
+
+    def ultimo_autorizado(self, punto_venta, tipo_cbte):
+        """Último número autorizado para el punto de venta y tipo"""
+        resultado = self._llamar(
+            'FECompUltimoAutorizado',
+            f'<ar:PtoVta>{punto_venta}</ar:PtoVta><ar:CbteTipo>{tipo_cbte}</ar:CbteTipo>'
+        )
+        errores = self._mensajes(resultado, 'Errors')
+        if errores:
+            raise ErrorWSFE(errores)
+        return int(resultado.findtext(f'{{{NAMESPACE}}}CbteNro') or 0)
+
+    def consultar(self, punto_venta, tipo_cbte, numero):
+        """
+        Consulta un comprobante emitido con FECompConsultar.
+
+        Retorna (resultado, cae, vencimiento, importe_total).
+        """
+        resultado = self._llamar('FECompConsultar', (
+            f'<ar:FeCompConsReq><ar:CbteTipo>{tipo_cbte}</ar:CbteTipo>'
+            f'<ar:CbteNro>{numero}</ar:CbteNro><ar:PtoVta>{punto_venta}</ar:PtoVta></ar:FeCompConsReq>'
+        ))
+        comprobante = resultado.find(f'{{{NAMESPACE}}}ResultGet')
+        if comprobante is None:
+            raise ErrorWSFE(self._mensajes(resultado, 'Errors') or f'WSFE no devolvió el comprobante {numero}')
+        vencimiento = comprobante.findtext(f'{{{NAMESPACE}}}FchVto')
+        importe = comprobante.findtext(f'{{{NAMESPACE}}}ImpTotal')
+        return (
+            comprobante.findtext(f'{{{NAMESPACE}}}Resultado'),
+            comprobante.findtext(f'{{{NAMESPACE}}}CodAutorizacion') or '',
+            datetime.strptime(vencimiento, '%Y%m%d').date() if vencimiento else None,
+            Decimal(importe) if importe else None,
+        )
+
+    def solicitar_cae(self, punto_venta, tipo_cbte, comprobantes):
+        """
+        Envía los comprobantes ya numerados en un solo FECAESolicitar.
+
+        Retorna un diccionario {numero: (resultado, cae, vencimiento, obs)}.
+        """
+        detalles = ''.join(self._detalle(cbte) for cbte in comprobantes)
+        resultado = self._llamar('FECAESolicitar', (
+            '<ar:FeCAEReq><ar:FeCabReq>'
+            f'<ar:CantReg>{len(comprobantes)}</ar:CantReg>'
+            f'<ar:PtoVta>{punto_venta}</ar:PtoVta><ar:CbteTipo>{tipo_cbte}</ar:CbteTipo>'
+            f'</ar:FeCabReq><ar:FeDetReq>{detalles}</ar:FeDetReq></ar:FeCAEReq>'
+        ))
+
+        respuestas = {}
+        for detalle in resultado.findall(f'.//{{{NAMESPACE}}}FECAEDetResponse'):
+            vencimiento = detalle.findtext(f'{{{NAMESPACE}}}CAEFchVto')
+            respuestas[int(detalle.findtext(f'{{{NAMESPACE}}}CbteDesde'))] = (
+                detalle.findtext(f'{{{NAMESPACE}}}Resultado'),
+                detalle.findtext(f'{{{NAMESPACE}}}CAE') or '',
+                datetime.strptime(vencimiento, '%Y%m%d').date() if vencimiento else None,
+                self._mensajes(detalle, 'Observaciones'),
+            )
+
+        if not respuestas:
+            raise ErrorWSFE(self._mensajes(resultado, 'Errors') or 'WSFE no devolvió resultados')
+        return respuestas
+
+    @staticmethod
+    def _detalle(cbte):
+        iva = ''
+        if cbte.importe_iva:
+            iva = (
+                f'<ar:Iva><ar:AlicIva><ar:Id>{cbte.alicuota_iva}</ar:Id>'
+                f'<ar:BaseImp>{cbte.importe_neto}</ar:BaseImp>'
+                f'<ar:Importe>{cbte.importe_iva}</ar:Importe></ar:AlicIva></ar:Iva>'
+            )
+        return (
+            '<ar:FECAEDetRequest>'
+            f'<ar:Concepto>{cbte.concepto}</ar:Concepto>'
+            f'<ar:DocTipo>{cbte.doc_tipo}</ar:DocTipo><ar:DocNro>{cbte.doc_nro}</ar:DocNro>'
+            f'<ar:CbteDesde>{cbte.numero}</ar:CbteDesde><ar:CbteHasta>{cbte.numero}</ar:CbteHasta>'
+            f'<ar:CbteFch>{cbte.fecha:%Y%m%d}</ar:CbteFch>'
+            f'<ar:ImpTotal>{cbte.importe_total}</ar:ImpTotal><ar:ImpTotConc>0</ar:ImpTotConc>'
+            f'<ar:ImpNeto>{cbte.importe_neto}</ar:ImpNeto><ar:ImpOpEx>0</ar:ImpOpEx>'
+            f'<ar:ImpTrib>0</ar:ImpTrib><ar:ImpIVA>{cbte.importe_iva}</ar:ImpIVA>'
+            '<ar:MonId>PES</ar:MonId><ar:MonCotiz>1</ar:MonCotiz>'
+            f'{iva}</ar:FECAEDetRequest>'
+        )
+
+
+def encolar_comprobante(cliente, tipo_cbte, **datos):
+    """
+    Crea un comprobante pendiente en la cola del punto de venta del cliente.
+    """
+    if not cliente.ptovta:
+        raise ErrorWSFE(f'El cliente {cliente.nombre} no tiene punto de venta asignado')
+    cola, _ = ColaComprobantes.objects.get_or_create(
+        cliente=cliente, punto_venta=int(cliente.ptovta), tipo_cbte=tipo_cbte
+    )
+    datos.setdefault('fecha', timezone.localdate())
+    datos.setdefault('importe_iva', Decimal('0'))
+    datos.setdefault('importe_total', datos['importe_neto'] + datos['importe_iva'])
+    return Comprobante.objects.create(cola=cola, **datos)
+
+
+def tomar_cola(cola):
+    """
+    Toma el lease de la cola. Retorna el momento en que se tomó, que
+    identifica al dueño del lease, o None si otro proceso la está usando.
+    """
+    ahora = timezone.now()
+    tomada = ColaComprobantes.objects.filter(pk=cola.pk).filter(
+        Q(procesando_desde__isnull=True) |
+        Q(procesando_desde__lt=ahora - timedelta(seconds=DURACION_LEASE))
+    ).update(procesando_desde=ahora)
+    return ahora if tomada else None
+
+
+def renovar_cola(cola, lease):
+    """
+    Extiende el lease si sigue siendo de este proceso. Retorna el nuevo
+    lease o None si otro proceso lo tomó al vencer.
+    """
+    ahora = timezone.now()
+    renovada = ColaComprobantes.objects.filter(pk=cola.pk, procesando_desde=lease).update(procesando_desde=ahora)
+    return ahora if renovada else None
+
+
+def liberar_cola(cola, lease=None):
+    cola_qs = ColaComprobantes.objects.filter(pk=cola.pk)
+    if lease is not None:
+        cola_qs = cola_qs.filter(procesando_desde=lease)
+    cola_qs.update(procesando_desde=None)
+
+
+def procesar_cola(cola, servicio=None, max_lote=None):
+    """
+    Autoriza todos los comprobantes pendientes de la cola en lotes.
+
+    `servicio` permite inyectar un `ClienteWSFE` (por ejemplo apuntando a un
+    WSFE local). Retorna un diccionario con las cantidades procesadas.
+    """
+    resumen = {'autorizados': 0, 'rechazados': 0, 'reencolados': 0, 'lotes': 0}
+    lease = tomar_cola(cola)
+    if lease is None:
+        return resumen
+
+    try:
+        if servicio is None:
+            cuit = cola.cliente.cuit_sin_guiones
+            ticket = obtener_ticket(cuit, SERVICIO_WSFE)
+            servicio = ClienteWSFE(cuit, ticket.token, ticket.sign)
+        max_lote = max_lote or servicio.max_lote()
+
+        _recuperar_enviados(cola, servicio)
+
+        while True:
+            # Un lote puede tardar lo que el timeout de WSFE: se renueva el
+            # lease antes de cada uno para que no venza con la cola larga
+            lease = renovar_cola(cola, lease)
+            if lease is None:
+                raise ErrorWSFE(f'Otro proceso tomó la cola {cola} al vencer el lease')
+            lote = list(
+                cola.comprobantes.filter(estado=Comprobante.PENDIENTE).order_by('pk')[:max_lote]
+            )
+            if not lote:
+                break
+            _enviar_lote(cola, servicio, lote, resumen)
+            resumen['lotes'] += 1
+    finally:
+        if lease is not None:
+            liberar_cola(cola, lease)
+
+    return resumen
+
+
+def _recuperar_enviados(cola, servicio):
+    """
+    Resuelve comprobantes que quedaron ENVIADO por una corrida interrumpida
+    o un envío sin respuesta.
+
+    Los numerados por encima del último autorizado nunca llegaron a AFIP y
+    vuelven a la cola. Los demás se consultan con FECompConsultar: si el
+    número está autorizado por el mismo importe se guarda el CAE; si no,
+    quedan ENVIADO para conciliar manualmente.
+    """
+    enviados = list(cola.comprobantes.filter(estado=Comprobante.ENVIADO).order_by('numero'))
+    if not enviados:
+        return
+    ultimo = servicio.ultimo_autorizado(cola.punto_venta, cola.tipo_cbte)
+    try:
+        for cbte in enviados:
+            if cbte.numero > ultimo:
+                cbte.estado = Comprobante.PENDIENTE
+                cbte.numero = None
+                continue
+            try:
+                resultado, cae, vencimiento, importe = servicio.consultar(
+                    cola.punto_venta, cola.tipo_cbte, cbte.numero
+                )
+            except ErrorComunicacionWSFE:
+                raise
+            except ErrorWSFE as e:
+                cbte.observaciones = f'Enviado sin respuesta y no se pudo consultar: {e}'
+                continue
+            if resultado == 'A' and importe == cbte.importe_total:
+                cbte.estado = Comprobante.AUTORIZADO
+                cbte.cae = cae
+                cbte.cae_vencimiento = vencimiento
+                cbte.observaciones = ''
+            else:
+                cbte.observaciones = (
+                    f'Enviado sin respuesta: el número {cbte.numero} figura en AFIP con resultado '
+                    f'{resultado} e importe {importe}, verificar manualmente'
+                )
+    finally:
+        # Lo conciliado se guarda aunque una consulta se corte
+        Comprobante.objects.bulk_update(
+            enviados, ['estado', 'numero', 'cae', 'cae_vencimiento', 'observaciones']
+        )
+
+
+def _enviar_lote(cola, servicio, lote, resumen):
+    ultimo = servicio.ultimo_autorizado(cola.punto_venta, cola.tipo_cbte)
+    for desplazamiento, cbte in enumerate(lote, start=1):
+        cbte.numero = ultimo + desplazamiento
+        cbte.estado = Comprobante.ENVIADO
+        cbte.intentos += 1
+    # La numeración queda persistida antes del envío para poder recuperarse
+    Comprobante.objects.bulk_update(lote, ['numero', 'estado', 'intentos'])
+
+    try:
+        respuestas = servicio.solicitar_cae(cola.punto_venta, cola.tipo_cbte, lote)
+    except ErrorComunicacionWSFE:
+        # AFIP pudo haber autorizado el lote: queda ENVIADO para que
+        # `_recuperar_enviados` lo concilie en vez de renumerarlo
+        raise
+    except ErrorWSFE:
+        # WSFE rechazó el pedido completo o no se llegó a enviar
+        for cbte in lote:
+            cbte.estado = Comprobante.PENDIENTE
+            cbte.numero = None
+        Comprobante.objects.bulk_update(lote, ['numero', 'estado'])
+        raise
+
+    hubo_rechazo = False
+    for cbte in lote:
+        resultado, cae, vencimiento, observaciones = respuestas.get(
+            cbte.numero, (None, '', None, 'Sin respuesta de WSFE')
+        )
+        cbte.observaciones = observaciones
+        if resultado == 'A':
+            cbte.estado = Comprobante.AUTORIZADO
+            cbte.cae = cae
+            cbte.cae_vencimiento = vencimiento
+            resumen['autorizados'] += 1
+            continue
+
+        cbte.numero = None
+        if resultado == 'R' and not hubo_rechazo:
+            hubo_rechazo = True
+            cbte.estado = Comprobante.RECHAZADO
+            resumen['rechazados'] += 1
+        elif cbte.intentos < MAX_INTENTOS:
+            # Sin respuesta o rechazado por quedar detrás de un rechazo:
+            # vuelve a la cola y se renumera en el próximo lote
+            cbte.estado = Comprobante.PENDIENTE
+            resumen['reencolados'] += 1
+        else:
+            cbte.estado = Comprobante.RECHAZADO
+            resumen['rechazados'] += 1
+
+    Comprobante.objects.bulk_update(
+        lote, ['numero', 'estado', 'cae', 'cae_vencimiento', 'observaciones'], batch_size=500
+    )
+
+
+def procesar_colas(colas=None, url=None):
+    """
+    Procesa las colas indicadas o, si no, todas las colas con comprobantes
+    pendientes de todas las bases, y mide el throughput.
+    """
+    inicio = time.perf_counter()
+    total = {'autorizados': 0, 'rechazados': 0, 'reencolados': 0, 'lotes': 0, 'errores': {}}
+    if colas is not None:
+        _procesar_colas(colas, url, total)
+    else:
+        for estudio in alcances():
+            with usar_estudio(estudio):
+                _procesar_colas(
+                    ColaComprobantes.objects.filter(
+                        comprobantes__estado__in=[Comprobante.PENDIENTE, Comprobante.ENVIADO]
+                    ).distinct().select_related('cliente'),
+                    url,
+                    total,
+                )
+
+    total['segundos'] = time.perf_counter() - inicio
+    total['por_segundo'] = total['autorizados'] / total['segundos'] if total['segundos'] else 0
+    return total
+
+
+def _procesar_colas(colas, url, total):
+    for cola in colas:
+        try:
+            servicio = None
+            if url:
+                cuit = cola.cliente.cuit_sin_guiones
+                ticket = obtener_ticket(cuit, SERVICIO_WSFE)
+                servicio = ClienteWSFE(cuit, ticket.token, ticket.sign, url=url)
+            resumen = procesar_cola(cola, servicio)
+        except Exception as e:
+            total['errores'][str(cola)] = str(e)
+            continue
+        for clave, valor in resumen.items():
+            total[clave] += valor
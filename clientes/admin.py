@@ -1,5 +1,21 @@
-from django.contrib import admin
-from .models import Cliente
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from estudios.contexto import SIN_ESTUDIO, estudio_actual, filtrar_por_estudio
+from procesos.cola import encolar
+from procesos.models import Tarea
+
+from .archivo import restaurar
+from .auditoria import historial
+from .duplicados import UMBRAL
+from .models import CambioCliente, Cliente, ClienteArchivado, EstadoBackup
+
+
+# Cantidad de cambios que muestra el historial de un cliente
+LIMITE_HISTORIAL = 50
 
 
 @admin.register(Cliente)
@@ -17,6 +33,7 @@ class ClienteAdmin(admin.ModelAdmin):
     ]
     
     list_filter = [
+        'estudio',
         'activo', 
         'fecha_creacion', 
         'fecha_modificacion'
@@ -30,6 +47,10 @@ class ClienteAdmin(admin.ModelAdmin):
     
     list_editable = ['activo']
     
+    change_list_template = 'admin/clientes/cliente/change_list.html'
+    
+    object_history_template = 'admin/clientes/cliente/object_history.html'
+    
     fieldsets = (
         ('Información Básica', {
             'fields': ('nombre', 'cuit', 'domicilio', 'activo')
@@ -82,3 +103,163 @@ class ClienteAdmin(admin.ModelAdmin):
         if obj:  # Editando un objeto existente
             return list(self.readonly_fields) + ['fecha_creacion']
         return self.readonly_fields
+    
+    def history_view(self, request, object_id, extra_context=None):
+        """
+        Agrega al historial del admin los cambios de campos del cliente.
+        """
+        cambios = []
+        if object_id.isdigit():
+            guardados = CambioCliente.objects.filter(cliente_id=object_id)[:LIMITE_HISTORIAL]
+            cambios = historial(int(object_id), guardados, guardados.db)[:LIMITE_HISTORIAL]
+        extra_context = {**(extra_context or {}), 'cambios': cambios}
+        return super().history_view(request, object_id, extra_context)
+    
+    def get_urls(self):
+        """
+        Agrega el reporte de posibles duplicados.
+        """
+        urls = [
+            path(
+                'duplicados/',
+                self.admin_site.admin_view(self.reporte_duplicados),
+                name='clientes_cliente_duplicados'
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def reporte_duplicados(self, request):
+        """
+        Muestra el último reporte de clientes con nombres similares. El cálculo
+        se hace en una tarea en segundo plano, que se encola con POST.
+        """
+        estudio = estudio_actual()
+        if estudio is SIN_ESTUDIO:
+            raise PermissionDenied
+        tareas = Tarea.objects.filter(nombre='clientes.detectar_duplicados', estudio=estudio)
+        en_curso = tareas.filter(estado__in=[Tarea.PENDIENTE, Tarea.EN_CURSO]).first()
+        
+        if request.method == 'POST':
+            try:
+                umbral = min(max(float(request.POST.get('umbral', UMBRAL)), 0.5), 1.0)
+            except ValueError:
+                umbral = UMBRAL
+            if en_curso:
+                self.message_user(request, 'Ya hay un cálculo de duplicados en curso.', messages.WARNING)
+            else:
+                encolar('clientes.detectar_duplicados', {'umbral': umbral}, timeout=3600)
+                self.message_user(request, 'Se encoló el cálculo de duplicados; el reporte se actualiza al terminar.')
+            return redirect(request.path)
+        
+        ultima = tareas.filter(
+            estado__in=[Tarea.COMPLETADA, Tarea.FALLIDA]
+        ).order_by('-finalizada').first()
+        completada = ultima if ultima and ultima.estado == Tarea.COMPLETADA else (
+            tareas.filter(estado=Tarea.COMPLETADA).order_by('-finalizada').first()
+        )
+        resultado = completada.resultado if completada else {}
+        mostrados = resultado.get('pares', [])
+        ids = {par['cliente_a'] for par in mostrados} | {par['cliente_b'] for par in mostrados}
+        clientes = Cliente.objects.in_bulk(ids)
+        
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Posibles clientes duplicados',
+            'umbral': resultado.get('umbral', UMBRAL),
+            'completada': completada,
+            'fallida': ultima if ultima and ultima.estado == Tarea.FALLIDA else None,
+            'en_curso': en_curso,
+            'total': resultado.get('total', 0),
+            'segundos': resultado.get('segundos'),
+            # Los clientes borrados o archivados desde el cálculo no se muestran
+            'pares': [
+                {**par, 'a': clientes[par['cliente_a']], 'b': clientes[par['cliente_b']]}
+                for par in mostrados
+                if par['cliente_a'] in clientes and par['cliente_b'] in clientes
+            ],
+        }
+        return TemplateResponse(request, 'admin/clientes/cliente/duplicados.html', context)
+
+
+@admin.register(ClienteArchivado)
+class ClienteArchivadoAdmin(admin.ModelAdmin):
+    """
+    Clientes archivados, de solo lectura; se pueden restaurar.
+    """
+    
+    list_display = ['nombre', 'cuit', 'id', 'fecha_archivado']
+    
+    list_filter = ['fecha_archivado']
+    
+    search_fields = ['nombre', 'cuit']
+    
+    actions = ['restaurar_seleccionados']
+    
+    @admin.action(description='Restaurar los clientes seleccionados')
+    def restaurar_seleccionados(self, request, queryset):
+        restaurados = 0
+        for archivado in queryset:
+            try:
+                restaurar(archivado)
+            except ValidationError as error:
+                self.message_user(request, f'{archivado}: {"; ".join(error.messages)}', messages.ERROR)
+            else:
+                restaurados += 1
+        self.message_user(request, f'{restaurados} clientes restaurados.', messages.SUCCESS)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EstadoBackup)
+class EstadoBackupAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para el modelo EstadoBackup.
+    """
+    
+    list_display = ['cliente', 'estado', 'fecha_backup', 'fecha_base', 'coincide', 'verificado']
+    
+    list_filter = ['estado', 'coincide']
+    
+    search_fields = ['cliente__nombre', 'cliente__cuit']
+    
+    readonly_fields = ['verificado']
+    
+    def get_queryset(self, request):
+        return filtrar_por_estudio(super().get_queryset(request), 'cliente__estudio')
+
+
+@admin.register(CambioCliente)
+class CambioClienteAdmin(admin.ModelAdmin):
+    """
+    Historial de cambios de clientes, de solo lectura.
+    """
+    
+    # Por id: el historial se conserva aunque el cliente se haya eliminado
+    list_display = ['fecha', 'cliente_id', 'accion', 'usuario', 'campos']
+    
+    list_filter = ['accion', 'fecha']
+    
+    search_fields = ['usuario', 'cliente__nombre', 'cliente__cuit']
+    
+    date_hierarchy = 'fecha'
+    
+    def get_queryset(self, request):
+        return filtrar_por_estudio(super().get_queryset(request), 'cliente__estudio')
+    
+    @admin.display(description='Campos')
+    def campos(self, obj):
+        return ', '.join(str(nombre) for nombre, anterior, nuevo in obj.detalle())
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
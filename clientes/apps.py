@@ -7,6 +7,19 @@ class ClientesConfig(AppConfig):
     name = 'clientes'
 
     def ready(self):
+        from django.db.models.signals import post_init, post_save, post_delete
+        from . import auditoria, autocompletado
+        from .models import Cliente
+
+        # Mantener actualizado el índice de autocompletado del proceso
+        post_save.connect(autocompletado.actualizar_cliente, sender=Cliente)
+        post_delete.connect(autocompletado.quitar_cliente, sender=Cliente)
+
+        # Registrar los cambios de cada cliente en el historial
+        post_init.connect(auditoria.recordar_valores, sender=Cliente)
+        post_save.connect(auditoria.registrar_guardado, sender=Cliente)
+        post_delete.connect(auditoria.registrar_eliminacion, sender=Cliente)
+
         # Solo ejecutar en producción y una vez
         import os
         if not os.environ.get('DEBUG', 'True').lower() == 'true':
@@ -17,7 +30,7 @@ class ClientesConfig(AppConfig):
                         clientes_prueba = [
                             {
                                 'nombre': 'EMPRESA EJEMPLO S.A.',
-                                'cuit': '30-12345678-9',
+                                'cuit': '30-12345678-1',
                                 'domicilio': 'Av. Corrientes 1234, CABA',
                                 'clave_fiscal': 'clave123',
                                 'activo': True
@@ -32,14 +45,14 @@ class ClientesConfig(AppConfig):
                             },
                             {
                                 'nombre': 'SERVICIOS INTEGRALES DEL SUR',
-                                'cuit': '27-98765432-1',
+                                'cuit': '27-98765432-0',
                                 'domicilio': 'Belgrano 890, La Plata',
                                 'clave_arba': 'arbaclave789',
                                 'activo': True
                             },
                             {
                                 'nombre': 'IMPORTADORA NORTE',
-                                'cuit': '30-11223344-5',
+                                'cuit': '30-11223344-6',
                                 'domicilio': 'Rivadavia 2345, Rosario',
                                 'clave_fiscal': 'fiscal789',
                                 'activo': False
@@ -0,0 +1,207 @@
+"""
+Archivo de los clientes inactivos desde hace tiempo.
+
+Los clientes inactivos cuya última modificación tiene más de
+`ARCHIVO_DIAS_INACTIVO` días se pasan a `ClienteArchivado` y se borran de
+la tabla de clientes, así la tabla y sus índices solo tienen los clientes en
+uso. Con el cliente se borran los datos que se vuelven a generar (archivos
+indexados, estado del backup); un cliente con otros datos relacionados (por
+ejemplo colas de comprobantes) no se archiva. El historial de cambios se
+conserva.
+
+Un cliente archivado se sigue encontrando por id y por CUIT con
+`obtener_cliente`, y al reactivarlo se restaura con el mismo id.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .auditoria import auditor
+from .models import CambioCliente, Cliente, ClienteArchivado
+
+
+DIAS_INACTIVO = getattr(settings, 'ARCHIVO_DIAS_INACTIVO', 365)
+
+TAMANIO_LOTE = 500
+
+# Relaciones que se borran con el cliente: se regeneran o, el historial, se
+# conserva sin restricción en la base
+RELACIONES_DERIVADAS = {'archivos', 'directorios_indexados', 'estado_backup', 'cambios'}
+
+
+def candidatos(dias=DIAS_INACTIVO):
+    """
+    Retorna los clientes (del estudio en curso) que se pueden archivar.
+    """
+    limite = timezone.now() - timedelta(days=dias)
+    clientes = Cliente.objects.filter(activo=False, fecha_modificacion__lt=limite)
+    for relacion in Cliente._meta.related_objects:
+        if relacion.get_accessor_name() not in RELACIONES_DERIVADAS:
+            clientes = clientes.exclude(**{f'{relacion.field.related_query_name()}__isnull': False})
+    return clientes
+
+
+def _valor(cliente, campo):
+    valor = getattr(cliente, campo.attname)
+    # DjangoJSONEncoder recorta las fechas a milisegundos
+    return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+
+def _archivado(cliente):
+    return ClienteArchivado(
+        id=cliente.pk,
+        estudio_id=cliente.estudio_id,
+        nombre=cliente.nombre,
+        cuit=cliente.cuit,
+        datos={campo.attname: _valor(cliente, campo) for campo in Cliente._meta.concrete_fields},
+    )
+
+
+def archivar(clientes, lote=TAMANIO_LOTE, informar=None):
+    """
+    Archiva los clientes del queryset en transacciones de `lote` clientes.
+    `informar(archivados)` se llama después de cada lote. Retorna la
+    cantidad archivada.
+    """
+    base = clientes.db
+    ids = list(clientes.order_by('pk').values_list('pk', flat=True))
+    archivados = 0
+    for inicio in range(0, len(ids), lote):
+        with transaction.atomic(using=base):
+            # El filtro se vuelve a aplicar: el cliente pudo reactivarse
+            bloque = list(clientes.filter(pk__in=ids[inicio:inicio + lote]).select_for_update())
+            ClienteArchivado.todos.using(base).bulk_create([_archivado(cliente) for cliente in bloque])
+            for cliente in bloque:
+                cliente._accion_auditoria = CambioCliente.ARCHIVO
+                cliente.delete()
+        # Las bajas del lote se insertan ahora y no durante el lote siguiente
+        auditor.volcar()
+        archivados += len(bloque)
+        if informar:
+            informar(archivados)
+    return archivados
+
+
+def restaurar(archivado):
+    """
+    Vuelve a pasar un cliente archivado a la tabla de clientes, con el mismo
+    id. Retorna el `Cliente`.
+    """
+    base = archivado._state.db
+    with transaction.atomic(using=base):
+        archivado = ClienteArchivado.todos.using(base).select_for_update().get(pk=archivado.pk)
+        cliente = archivado.como_cliente()
+        if Cliente.todos.using(base).filter(estudio_id=cliente.estudio_id, cuit=cliente.cuit).exists():
+            raise ValidationError({'cuit': 'Ya existe otro cliente con este CUIT.'})
+
+        fecha_creacion = cliente.fecha_creacion
+        del cliente.fecha_archivado
+        cliente._accion_auditoria = CambioCliente.RESTAURACION
+        cliente.save(force_insert=True, using=base)
+        del cliente._accion_auditoria
+        # `auto_now_add` reemplazó la fecha de alta original
+        Cliente.todos.using(base).filter(pk=cliente.pk).update(fecha_creacion=fecha_creacion)
+        cliente.fecha_creacion = fecha_creacion
+        archivado.delete()
+    return cliente
+
+
+def _unico(clientes, filtros):
+    if not clientes:
+        raise Cliente.DoesNotExist(f'No existe un cliente con {filtros}')
+    if len(clientes) > 1:
+        # El CUIT es único por estudio: sin estudio en curso puede repetirse
+        raise Cliente.MultipleObjectsReturned(f'Hay clientes de varios estudios con {filtros}')
+    return clientes[0]
+
+
+def obtener_cliente(**filtros):
+    """
+    Retorna el cliente (del estudio en curso) que cumple los filtros, por id
+    o CUIT; si está archivado, un `Cliente` de solo lectura con
+    `fecha_archivado`. Lanza `Cliente.DoesNotExist` si no existe y
+    `Cliente.MultipleObjectsReturned` si hay varios (ver `coincidencias`).
+    """
+    clientes = list(Cliente.objects.filter(**filtros)[:2])
+    if not clientes:
+        clientes = [archivado.como_cliente() for archivado in ClienteArchivado.objects.filter(**filtros)[:2]]
+    return _unico(clientes, filtros)
+
+
+async def aobtener_cliente(**filtros):
+    """
+    Versión asíncrona de `obtener_cliente`.
+    """
+    clientes = [cliente async for cliente in Cliente.objects.filter(**filtros)[:2]]
+    if not clientes:
+        clientes = [
+            archivado.como_cliente() async for archivado in ClienteArchivado.objects.filter(**filtros)[:2]
+        ]
+    return _unico(clientes, filtros)
+
+
+def coincidencias(**filtros):
+    """
+    Retorna [{id, nombre, estudio_id}] de los clientes, activos o
+    archivados, que cumplen los filtros.
+    """
+    campos = ('id', 'nombre', 'estudio_id')
+    return (
+        list(Cliente.objects.filter(**filtros).values(*campos)) +
+        list(ClienteArchivado.objects.filter(**filtros).values(*campos))
+    )
+
+
+async def acoincidencias(**filtros):
+    """
+    Versión asíncrona de `coincidencias`.
+    """
+    campos = ('id', 'nombre', 'estudio_id')
+    return (
+        [fila async for fila in Cliente.objects.filter(**filtros).values(*campos)] +
+        [fila async for fila in ClienteArchivado.objects.filter(**filtros).values(*campos)]
+    )
+
+
+def tamanio_indices(conexion, tabla):
+    """
+    Retorna {índice: bytes} de los índices de la tabla, o None si la base no
+    lo informa (SQLite sin la tabla virtual `dbstat`).
+    """
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes WHERE relname = %s',
+                [tabla],
+            )
+            return dict(cursor.fetchall())
+        if conexion.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN "
+                    "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s) GROUP BY name",
+                    [tabla],
+                )
+            except DatabaseError:
+                return None
+            return dict(cursor.fetchall())
+    return None
+
+
+def reindexar(conexion, tabla):
+    """
+    Reconstruye los índices de la tabla, que después de borrar muchas filas
+    conservan el espacio hasta rearmarse.
+    """
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql' and conexion.pg_version >= 120000:
+            # Sin bloquear las escrituras mientras se reconstruyen
+            cursor.execute(f'REINDEX TABLE CONCURRENTLY {conexion.ops.quote_name(tabla)}')
+        elif conexion.vendor == 'postgresql':
+            cursor.execute(f'REINDEX TABLE {conexion.ops.quote_name(tabla)}')
+        else:
+            cursor.execute(f'REINDEX {conexion.ops.quote_name(tabla)}')
@@ -0,0 +1,300 @@
+"""
+Auditoría de los cambios de los clientes.
+
+Cada instancia de `Cliente` recuerda al cargarse los valores de sus campos
+(`post_init`) y al guardarse (`post_save`) se comparan con los nuevos: los
+campos que cambiaron, el usuario de la solicitud en curso y el momento se
+encolan en memoria cuando la transacción se confirma. Un hilo por proceso
+inserta lo acumulado cada `AUDITORIA_INTERVALO` segundos en un solo
+`bulk_create`, así el guardado no espera ningún INSERT extra.
+
+La cola está acotada a `AUDITORIA_MAX_PENDIENTES` cambios: si se llena
+porque la base no da abasto, quien agrega el cambio inserta el lote él
+mismo. Si el lote no se puede insertar, o al terminar el proceso, los
+cambios pendientes se escriben en `AUDITORIA_DIR` y se insertan más tarde
+(al menos una vez). Solo se pierden los cambios del último intervalo si el
+proceso muere sin llegar a terminar de forma ordenada.
+
+Las operaciones masivas (`QuerySet.update`, `bulk_create`) no emiten señales
+y no quedan registradas.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from estudios.middleware import solicitud_actual
+
+from .models import CambioCliente, Cliente
+
+
+DIRECTORIO = getattr(settings, 'AUDITORIA_DIR', os.path.join(settings.BASE_DIR, 'auditoria'))
+
+INTERVALO = getattr(settings, 'AUDITORIA_INTERVALO', 1)
+
+MAX_PENDIENTES = getattr(settings, 'AUDITORIA_MAX_PENDIENTES', 5000)
+
+TAMANIO_LOTE = 500
+
+# Segundos entre intentos de insertar los cambios guardados en disco
+INTERVALO_RECUPERACION = 60
+
+# Campos que no se auditan: los mantiene el propio modelo
+CAMPOS_EXCLUIDOS = {'id', 'fecha_creacion', 'fecha_modificacion'}
+
+# Valor con el que se registran las claves de acceso
+OCULTO = '********'
+
+
+def campos_auditados():
+    return [campo for campo in Cliente._meta.concrete_fields if campo.attname not in CAMPOS_EXCLUIDOS]
+
+
+def valores(instance):
+    """
+    Valores de los campos auditados cargados en la instancia; los diferidos
+    (`only`/`defer`) se omiten.
+    """
+    return {
+        campo.attname: instance.__dict__[campo.attname]
+        for campo in campos_auditados() if campo.attname in instance.__dict__
+    }
+
+
+def _mostrar(campo, valor):
+    if campo.startswith('clave_') and valor:
+        return OCULTO
+    return valor
+
+
+def usuario_actual():
+    usuario = getattr(solicitud_actual.get(), 'user', None)
+    if usuario is not None and usuario.is_authenticated:
+        return usuario.get_username()
+    return ''
+
+
+class Auditor:
+    """
+    Cola acotada de cambios del proceso, insertada en lotes por un hilo.
+    """
+
+    def __init__(self, directorio=DIRECTORIO, intervalo=INTERVALO, max_pendientes=MAX_PENDIENTES):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        self._lock = threading.Lock()
+        # Tomado mientras se inserta un lote, para que el cierre lo espere
+        self._escritura = threading.Lock()
+        self._pendientes = []
+        self._hay_pendientes = threading.Event()
+        self._hilo = None
+        self._ultima_recuperacion = 0.0
+
+    def agregar(self, fila):
+        with self._lock:
+            self._pendientes.append(fila)
+            lleno = len(self._pendientes) >= self.max_pendientes
+            if self._hilo is None or not self._hilo.is_alive():
+                # Después de un fork el hilo del proceso padre no existe
+                self._hilo = threading.Thread(target=self._ejecutar, name='auditoria', daemon=True)
+                self._hilo.start()
+        if lleno:
+            self.volcar()
+        else:
+            self._hay_pendientes.set()
+
+    def pendientes(self, cliente_id, base='default'):
+        """
+        Cambios del cliente todavía no insertados, del más nuevo al más viejo.
+        """
+        with self._lock:
+            return [
+                fila for fila in reversed(self._pendientes)
+                if fila['cliente_id'] == cliente_id and fila.get('base', 'default') == base
+            ]
+
+    def volcar(self):
+        """
+        Inserta los cambios pendientes; si la base falla, los guarda en disco.
+        """
+        with self._escritura:
+            self._volcar()
+
+    def cerrar(self, espera=10):
+        """
+        Receptor de `atexit`: espera el lote en curso y vuelca el resto.
+        """
+        if self._escritura.acquire(timeout=espera):
+            try:
+                self._volcar()
+            finally:
+                self._escritura.release()
+            return
+        # El lote en curso no terminó: lo que queda va directo a disco
+        filas = self._tomar()
+        if filas:
+            self._guardar(filas)
+
+    def _tomar(self):
+        with self._lock:
+            filas, self._pendientes = self._pendientes, []
+            self._hay_pendientes.clear()
+        return filas
+
+    def _volcar(self):
+        filas = self._tomar()
+        if not filas:
+            return
+        try:
+            self._insertar(filas)
+        except DatabaseError:
+            self._guardar(filas)
+
+    def _insertar(self, filas):
+        # Cada cambio va a la base del estudio del cliente
+        por_base = {}
+        for fila in filas:
+            fila = dict(fila)
+            por_base.setdefault(fila.pop('base', 'default'), []).append(CambioCliente(**fila))
+        for base, cambios in por_base.items():
+            # En una transacción, para no dejar la mitad de un lote que se reintenta
+            with transaction.atomic(using=base):
+                CambioCliente.objects.using(base).bulk_create(cambios, batch_size=TAMANIO_LOTE)
+
+    def _ejecutar(self):
+        while True:
+            self._hay_pendientes.wait()
+            # Esperar el intervalo junta en un solo lote los cambios que llegan
+            time.sleep(self.intervalo)
+            try:
+                self.volcar()
+                if time.monotonic() - self._ultima_recuperacion >= INTERVALO_RECUPERACION:
+                    self.recuperar()
+            finally:
+                # El hilo no atiende solicitudes: nadie más cierra su conexión
+                close_old_connections()
+
+    def _guardar(self, filas):
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = os.path.join(self.directorio, f'pendientes-{os.getpid()}-{time.time_ns()}.ndjson')
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w') as archivo:
+            for fila in filas:
+                archivo.write(json.dumps(fila, cls=DjangoJSONEncoder) + '\n')
+        os.replace(temporal, ruta)
+
+    def recuperar(self):
+        """
+        Inserta los cambios guardados en disco por este u otros procesos.
+        Retorna la cantidad insertada.
+        """
+        self._ultima_recuperacion = time.monotonic()
+        cantidad = 0
+        for ruta in sorted(glob.glob(os.path.join(self.directorio, 'pendientes-*.ndjson'))):
+            tomado = f'{ruta}.{os.getpid()}'
+            try:
+                # Solo un proceso logra renombrar el archivo
+                os.rename(ruta, tomado)
+            except FileNotFoundError:
+                continue
+            with open(tomado) as archivo:
+                filas = [json.loads(linea) for linea in archivo if linea.strip()]
+            for fila in filas:
+                fila['fecha'] = parse_datetime(fila['fecha'])
+            try:
+                self._insertar(filas)
+            except DatabaseError:
+                os.rename(tomado, ruta)
+                break
+            os.remove(tomado)
+            cantidad += len(filas)
+        return cantidad
+
+
+auditor = Auditor()
+
+
+def historial(cliente_id, guardados, base='default'):
+    """
+    Retorna los cambios del cliente (de la base `base`) del más nuevo al más
+    viejo: primero los que este proceso todavía no insertó y después
+    `guardados`.
+    """
+    pendientes = [
+        CambioCliente(**{campo: valor for campo, valor in fila.items() if campo != 'base'})
+        for fila in auditor.pendientes(cliente_id, base)
+    ]
+    return pendientes + list(guardados)
+
+atexit.register(auditor.cerrar)
+
+
+def _encolar(cliente_id, accion, cambios, using):
+    fila = {
+        'cliente_id': cliente_id,
+        'accion': accion,
+        'usuario': usuario_actual(),
+        'cambios': cambios,
+        'fecha': timezone.now(),
+        'base': using or 'default',
+    }
+    # Si la transacción se revierte el cambio no ocurrió
+    transaction.on_commit(lambda: auditor.agregar(fila), using=using)
+
+
+def recordar_valores(sender, instance, **kwargs):
+    """
+    Receptor de `post_init`: guarda los valores con los que se cargó.
+    """
+    instance._valores_auditados = valores(instance)
+
+
+def registrar_guardado(sender, instance, created, update_fields=None, using=None, raw=False, **kwargs):
+    """
+    Receptor de `post_save`: encola los campos que cambiaron.
+    """
+    if raw:
+        return
+    nuevos = valores(instance)
+    if update_fields is not None:
+        nuevos = {campo: valor for campo, valor in nuevos.items() if campo in update_fields}
+
+    if created:
+        cambios = {
+            campo: [None, _mostrar(campo, valor)]
+            for campo, valor in nuevos.items() if valor not in (None, '')
+        }
+    else:
+        anteriores = getattr(instance, '_valores_auditados', {})
+        cambios = {
+            campo: [_mostrar(campo, anteriores[campo]), _mostrar(campo, valor)]
+            for campo, valor in nuevos.items()
+            if campo in anteriores and anteriores[campo] != valor
+        }
+    instance._valores_auditados = {**getattr(instance, '_valores_auditados', {}), **nuevos}
+    # `clientes.archivo` indica la acción al restaurar un cliente archivado
+    accion = getattr(instance, '_accion_auditoria', None)
+    if cambios or created:
+        _encolar(instance.pk, accion or (CambioCliente.ALTA if created else CambioCliente.MODIFICACION), cambios, using)
+
+
+def registrar_eliminacion(sender, instance, using=None, **kwargs):
+    """
+    Receptor de `post_delete`: encola la baja (o el archivado) con el
+    nombre y el CUIT.
+    """
+    cambios = {
+        campo: [valor, None]
+        for campo, valor in valores(instance).items() if campo in ('nombre', 'cuit')
+    }
+    _encolar(instance.pk, getattr(instance, '_accion_auditoria', CambioCliente.BAJA), cambios, using)
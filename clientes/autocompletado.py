@@ -0,0 +1,229 @@
+"""
+Índice de prefijos en memoria para el autocompletado de clientes.
+
+Mantiene, por proceso, un arreglo ordenado de claves normalizadas (nombre,
+palabras del nombre y dígitos del CUIT) de los clientes activos, de modo que
+cada tecla se resuelve con una búsqueda binaria sin ir a la base de datos.
+
+El índice se construye de forma perezosa en la primera consulta y se
+actualiza incrementalmente con las señales de guardado y borrado de
+`Cliente`. Como las señales solo llegan al proceso que hizo el cambio, el
+índice se reconstruye completo cada `AUTOCOMPLETADO_TTL` segundos para
+recoger los cambios hechos por otros workers.
+
+Cada estudio tiene su propio índice, así las sugerencias no mezclan clientes
+de otros estudios.
+"""
+
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from monitoreo.metricas import contar_cache
+
+
+# Cantidad máxima de clientes que se indexan por proceso
+MAX_CLIENTES = getattr(settings, 'AUTOCOMPLETADO_MAX_CLIENTES', 50000)
+
+# Segundos tras los cuales se reconstruye el índice completo
+TTL = getattr(settings, 'AUTOCOMPLETADO_TTL', 300)
+
+# Largo máximo de cada clave, para acotar la memoria por cliente
+LARGO_CLAVE = 40
+
+
+def normalizar(texto):
+    """
+    Pasa el texto a minúsculas sin acentos ni signos de puntuación.
+    """
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = ''.join(c if c.isalnum() else ' ' for c in texto.lower())
+    return ' '.join(texto.split())
+
+
+def claves_cliente(nombre, cuit):
+    """
+    Retorna las claves bajo las que se indexa un cliente: el nombre completo,
+    el nombre desde cada una de sus palabras y los dígitos del CUIT.
+    """
+    palabras = normalizar(nombre).split()
+    claves = {' '.join(palabras[i:])[:LARGO_CLAVE] for i in range(len(palabras))}
+    digitos = (cuit or '').replace('-', '')
+    if digitos:
+        claves.add(digitos)
+    return claves
+
+
+class IndicePrefijos:
+    """
+    Arreglo ordenado de (clave, pk) con búsqueda por prefijo.
+    """
+
+    def __init__(self, max_clientes=MAX_CLIENTES):
+        self.max_clientes = max_clientes
+        self._lock = threading.Lock()
+        self._entradas = []
+        self._claves_por_pk = {}
+        self._datos = {}
+        self._construido_en = None
+
+    def __len__(self):
+        return len(self._datos)
+
+    @property
+    def vencido(self):
+        return self._construido_en is None or time.monotonic() - self._construido_en > TTL
+
+    def construir(self, filas):
+        """
+        Reconstruye el índice a partir de tuplas (pk, nombre, cuit).
+        """
+        entradas = []
+        claves_por_pk = {}
+        datos = {}
+        for pk, nombre, cuit in filas:
+            if len(datos) >= self.max_clientes:
+                break
+            claves = claves_cliente(nombre, cuit)
+            entradas.extend((clave, pk) for clave in claves)
+            claves_por_pk[pk] = claves
+            datos[pk] = (nombre, cuit)
+        entradas.sort()
+
+        with self._lock:
+            self._entradas = entradas
+            self._claves_por_pk = claves_por_pk
+            self._datos = datos
+            self._construido_en = time.monotonic()
+
+    def agregar(self, pk, nombre, cuit):
+        """
+        Agrega o actualiza un cliente en el índice.
+        """
+        with self._lock:
+            self._quitar(pk)
+            if len(self._datos) >= self.max_clientes:
+                return
+            claves = claves_cliente(nombre, cuit)
+            for clave in claves:
+                insort(self._entradas, (clave, pk))
+            self._claves_por_pk[pk] = claves
+            self._datos[pk] = (nombre, cuit)
+
+    def quitar(self, pk):
+        """
+        Quita un cliente del índice si estaba presente.
+        """
+        with self._lock:
+            self._quitar(pk)
+
+    def _quitar(self, pk):
+        for clave in self._claves_por_pk.pop(pk, ()):
+            posicion = bisect_left(self._entradas, (clave, pk))
+            if posicion < len(self._entradas) and self._entradas[posicion] == (clave, pk):
+                del self._entradas[posicion]
+        self._datos.pop(pk, None)
+
+    def buscar(self, texto, limite=10):
+        """
+        Retorna hasta `limite` tuplas (pk, nombre, cuit) cuyo nombre, alguna
+        palabra del nombre o CUIT comienzan con `texto`, ordenadas por nombre.
+        """
+        prefijo = normalizar(texto)
+        digitos = texto.replace('-', '').strip()
+        if digitos.isdigit():
+            prefijo = digitos
+        if not prefijo:
+            return []
+
+        encontrados = []
+        vistos = set()
+        with self._lock:
+            entradas = self._entradas
+            posicion = bisect_left(entradas, (prefijo,))
+            while posicion < len(entradas) and len(encontrados) < limite:
+                clave, pk = entradas[posicion]
+                if not clave.startswith(prefijo):
+                    break
+                if pk not in vistos:
+                    vistos.add(pk)
+                    encontrados.append((pk,) + self._datos[pk])
+                posicion += 1
+
+        return sorted(encontrados, key=lambda fila: fila[1])
+
+
+# Un índice por estudio; la clave None es el de todos los clientes de la
+# base `default` (superusuarios y procesos sin estudio)
+indices = {}
+
+_lock_indices = threading.Lock()
+
+# Índice vacío para los usuarios sin acceso a ningún estudio
+_vacio = IndicePrefijos(max_clientes=0)
+
+
+def obtener_indice():
+    """
+    Retorna el índice del estudio en curso, construyéndolo si todavía no
+    existe o si venció su TTL.
+    """
+    from estudios.contexto import SIN_ESTUDIO, estudio_actual
+
+    estudio = estudio_actual()
+    if estudio is SIN_ESTUDIO:
+        return _vacio
+    clave = estudio.pk if estudio is not None else None
+    with _lock_indices:
+        indice = indices.setdefault(clave, IndicePrefijos())
+
+    vencido = indice.vencido
+    contar_cache('autocompletado', not vencido)
+    if vencido:
+        from .models import Cliente
+
+        # El manager ya restringe las filas al estudio en curso
+        filas = (
+            Cliente.objects.filter(activo=True)
+            .order_by()
+            .values_list('pk', 'nombre', 'cuit')[:indice.max_clientes]
+        )
+        indice.construir(filas.iterator(chunk_size=2000))
+    return indice
+
+
+def _indices_de(instance):
+    """
+    Retorna [(índice, incluye)] de los índices construidos, indicando si el
+    cliente pertenece a cada uno.
+    """
+    with _lock_indices:
+        construidos = list(indices.items())
+    return [
+        (indice, clave == instance.estudio_id or (clave is None and instance._state.db == 'default'))
+        for clave, indice in construidos if not indice.vencido
+    ]
+
+
+def actualizar_cliente(sender, instance, **kwargs):
+    """
+    Receptor de `post_save`: refleja el cambio en los índices ya construidos.
+    """
+    for indice, incluye in _indices_de(instance):
+        if incluye and instance.activo:
+            indice.agregar(instance.pk, instance.nombre, instance.cuit)
+        elif incluye:
+            indice.quitar(instance.pk)
+
+
+def quitar_cliente(sender, instance, **kwargs):
+    """
+    Receptor de `post_delete`: quita el cliente de los índices ya construidos.
+    """
+    for indice, incluye in _indices_de(instance):
+        if incluye:
+            indice.quitar(instance.pk)
@@ -0,0 +1,181 @@
+"""
+Verificación de los backups de las bases locales de los clientes.
+
+Para cada cliente se compara el archivo de `ruta_base` con el backup más
+reciente de `rutabackup` (un archivo, o el archivo más nuevo si es un
+directorio) y se guarda el resultado en `EstadoBackup`.
+
+Hashear bases de varios GB es lo costoso, así que:
+
+- Los digestos se cachean en `DigestoArchivo` por (ruta, tamaño, mtime) y
+  un archivo sin cambios no se vuelve a leer.
+- Los archivos pendientes se hashean en un pool de procesos, leyéndolos con
+  mmap en bloques para no copiarlos enteros a memoria.
+"""
+
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from monitoreo.metricas import contar_cache
+
+from .models import DigestoArchivo, EstadoBackup
+
+
+# Días tras los cuales un backup se considera desactualizado
+MAX_DIAS_BACKUP = getattr(settings, 'BACKUP_MAX_DIAS', 2)
+
+TAMANIO_BLOQUE = 8 * 1024 * 1024
+
+
+def hashear(ruta):
+    """
+    Calcula el SHA-256 de un archivo leyéndolo con mmap en bloques.
+    Retorna (ruta, digesto) o (ruta, None) si no se pudo leer.
+    """
+    digesto = hashlib.sha256()
+    try:
+        with open(ruta, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_size == 0:
+                return ruta, digesto.hexdigest()
+            with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                vista = memoryview(mapa)
+                try:
+                    for inicio in range(0, len(mapa), TAMANIO_BLOQUE):
+                        digesto.update(vista[inicio:inicio + TAMANIO_BLOQUE])
+                finally:
+                    vista.release()
+    except (OSError, ValueError):
+        return ruta, None
+    return ruta, digesto.hexdigest()
+
+
+def _ultimo_backup(ruta):
+    """
+    Retorna la ruta del backup más reciente: el propio archivo o el archivo
+    más nuevo del directorio. Propaga el OSError si el directorio no se
+    puede leer.
+    """
+    if os.path.isfile(ruta):
+        return ruta
+    if os.path.isdir(ruta):
+        with os.scandir(ruta) as entradas:
+            archivos = [entrada for entrada in entradas if entrada.is_file()]
+        if archivos:
+            return max(archivos, key=lambda entrada: entrada.stat().st_mtime_ns).path
+    return None
+
+
+def _fecha(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns / 1e9, tz=dt_timezone.utc)
+
+
+def digestos(rutas, procesos=4):
+    """
+    Retorna {ruta: sha256} para los archivos indicados, hasheando en
+    paralelo solo los que no tienen un digesto válido en caché.
+    """
+    estados = {}
+    for ruta in rutas:
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        estados[ruta] = (estado.st_size, estado.st_mtime_ns)
+
+    resultado = {}
+    for digesto in DigestoArchivo.objects.filter(ruta__in=list(estados)):
+        if (digesto.tamanio, digesto.mtime_ns) == estados[digesto.ruta]:
+            resultado[digesto.ruta] = digesto.sha256
+
+    pendientes = [ruta for ruta in estados if ruta not in resultado]
+    contar_cache('digestos_backup', True, len(resultado))
+    contar_cache('digestos_backup', False, len(pendientes))
+    if pendientes:
+        # Los procesos hijos no deben heredar conexiones abiertas a la base
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            calculados = [
+                (ruta, sha256) for ruta, sha256 in ejecutor.map(hashear, pendientes) if sha256
+            ]
+        DigestoArchivo.objects.bulk_create(
+            [
+                DigestoArchivo(ruta=ruta, tamanio=estados[ruta][0], mtime_ns=estados[ruta][1], sha256=sha256)
+                for ruta, sha256 in calculados
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['ruta'],
+            update_fields=['tamanio', 'mtime_ns', 'sha256', 'calculado'],
+        )
+        resultado.update(calculados)
+
+    return resultado
+
+
+def verificar_backups(clientes, procesos=4):
+    """
+    Verifica los backups de los clientes y actualiza su `EstadoBackup`.
+    Retorna {estado: cantidad}.
+    """
+    limite = timezone.now() - timedelta(days=MAX_DIAS_BACKUP)
+    revisiones = []
+    for cliente in clientes:
+        revision = {'cliente': cliente, 'base': None, 'backup': None, 'error': None}
+        if cliente.ruta_base and cliente.rutabackup:
+            revision['base'] = cliente.ruta_base if os.path.isfile(cliente.ruta_base) else None
+            try:
+                revision['backup'] = _ultimo_backup(cliente.rutabackup)
+            except OSError as e:
+                revision['error'] = str(e)
+        revisiones.append(revision)
+
+    rutas = {ruta for revision in revisiones for ruta in (revision['base'], revision['backup']) if ruta}
+    hashes = digestos(rutas, procesos=procesos)
+
+    resumen = {}
+    for revision in revisiones:
+        cliente = revision['cliente']
+        datos = {'archivo_backup': revision['backup'] or '', 'fecha_backup': None,
+                 'fecha_base': None, 'coincide': False, 'detalle': ''}
+
+        if not (cliente.ruta_base and cliente.rutabackup):
+            datos['estado'] = EstadoBackup.SIN_CONFIGURAR
+        elif revision['error']:
+            datos['estado'] = EstadoBackup.ERROR
+            datos['detalle'] = revision['error']
+        elif not revision['backup']:
+            datos['estado'] = EstadoBackup.FALTANTE
+            datos['detalle'] = f'No hay backups en {cliente.rutabackup}'
+        else:
+            try:
+                datos['fecha_backup'] = _fecha(os.stat(revision['backup']).st_mtime_ns)
+                if revision['base']:
+                    datos['fecha_base'] = _fecha(os.stat(revision['base']).st_mtime_ns)
+            except OSError as e:
+                datos['estado'] = EstadoBackup.ERROR
+                datos['detalle'] = str(e)
+            else:
+                digesto_backup = hashes.get(revision['backup'])
+                datos['coincide'] = bool(digesto_backup and digesto_backup == hashes.get(revision['base']))
+                if digesto_backup is None:
+                    datos['estado'] = EstadoBackup.ERROR
+                    datos['detalle'] = f'No se pudo leer {revision["backup"]}'
+                elif datos['coincide'] or datos['fecha_backup'] >= limite:
+                    datos['estado'] = EstadoBackup.OK
+                else:
+                    datos['estado'] = EstadoBackup.DESACTUALIZADO
+                    datos['detalle'] = f'Último backup hace más de {MAX_DIAS_BACKUP} días'
+                if not revision['base']:
+                    datos['detalle'] = f'No se encontró la base {cliente.ruta_base}'
+
+        EstadoBackup.objects.update_or_create(cliente=cliente, defaults=datos)
+        resumen[datos['estado']] = resumen.get(datos['estado'], 0) + 1
+
+    return resumen
@@ -0,0 +1,105 @@
+"""
+Validación del dígito verificador del CUIT (módulo 11).
+
+Los diez primeros dígitos se multiplican por los pesos 5-4-3-2-7-6-5-4-3-2;
+el verificador es `11 - (suma % 11)`, con 11 → 0. Un resultado de 10 no
+corresponde a ningún CUIT válido.
+
+`es_valido` valida un CUIT suelto y es la que usan el modelo y los
+serializers. `validar_lote` valida una lista completa de una vez: con NumPy
+convierte el lote en una matriz de códigos de carácter y resuelve formato,
+suma ponderada y verificador con operaciones sobre la matriz entera; sin
+NumPy recorre el lote con la validación escalar.
+"""
+
+from django.core.exceptions import ValidationError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+PESOS = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+
+# Posiciones de los 11 dígitos en 'XX-XXXXXXXX-X'
+POSICIONES_CON_GUIONES = [0, 1, 3, 4, 5, 6, 7, 8, 9, 10, 12]
+
+# Un carácter más que el formato con guiones, para detectar textos largos
+ANCHO = 14
+
+
+def digito_verificador(digitos):
+    """
+    Retorna el dígito verificador de los diez primeros dígitos, o 10 si no
+    existe un verificador válido.
+    """
+    suma = sum(int(digito) * peso for digito, peso in zip(digitos, PESOS))
+    return (11 - suma % 11) % 11
+
+
+def es_valido(cuit):
+    """
+    Indica si el CUIT (con o sin guiones) tiene formato y verificador válidos.
+    """
+    if not isinstance(cuit, str):
+        return False
+    if len(cuit) == 13 and cuit[2] == '-' and cuit[11] == '-':
+        cuit = cuit[:2] + cuit[3:11] + cuit[12]
+    if len(cuit) != 11 or not cuit.isascii() or not cuit.isdigit():
+        return False
+    return digito_verificador(cuit) == int(cuit[10])
+
+
+def validar_cuit(valor):
+    """
+    Validador de Django para campos de CUIT.
+    """
+    if not es_valido(valor):
+        raise ValidationError(
+            'El CUIT %(valor)s no es válido: el dígito verificador no coincide',
+            code='cuit_invalido',
+            params={'valor': valor},
+        )
+
+
+def validar_lote(cuits):
+    """
+    Valida una secuencia de CUIT (con o sin guiones).
+    Retorna una lista de booleanos en el mismo orden.
+    """
+    cuits = list(cuits)
+    if numpy is None or not cuits:
+        return [es_valido(cuit) for cuit in cuits]
+    return _validar_lote_numpy(cuits).tolist()
+
+
+def _validar_lote_numpy(cuits):
+    textos = numpy.array([cuit if isinstance(cuit, str) else '' for cuit in cuits], dtype=f'<U{ANCHO}')
+    codigos = textos.view(numpy.uint32).reshape(len(cuits), ANCHO).astype(numpy.int64)
+
+    # Formato 'XXXXXXXXXXX': 11 caracteres y el resto vacío
+    sin_guiones = codigos[:, :11] - ord('0')
+    formato_sin_guiones = (codigos[:, 11:] == 0).all(axis=1)
+
+    # Formato 'XX-XXXXXXXX-X': guiones en su lugar y el resto vacío
+    con_guiones = codigos[:, POSICIONES_CON_GUIONES] - ord('0')
+    formato_con_guiones = (
+        (codigos[:, 2] == ord('-')) & (codigos[:, 11] == ord('-')) & (codigos[:, 13] == 0)
+    )
+
+    digitos = numpy.where(formato_con_guiones[:, None], con_guiones, sin_guiones)
+    son_digitos = ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+
+    suma = digitos[:, :10] @ numpy.array(PESOS, dtype=numpy.int64)
+    verificador = (11 - suma % 11) % 11
+
+    return (formato_con_guiones | formato_sin_guiones) & son_digitos & (verificador == digitos[:, 10])
+
+
+def invalidos(cuits):
+    """
+    Retorna los CUIT inválidos de la secuencia, en su orden original.
+    """
+    cuits = list(cuits)
+    return [cuit for cuit, valido in zip(cuits, validar_lote(cuits)) if not valido]
@@ -0,0 +1,179 @@
+"""
+Escritura de documentos PDF y XLSX simples sin dependencias externas.
+
+Alcanza para fichas de texto: el PDF usa las fuentes estándar Helvetica y
+Helvetica-Bold (codificación WinAnsi, que cubre los acentos del castellano)
+con páginas A4 y cortes de línea automáticos, y el XLSX es una sola hoja con
+celdas de texto.
+"""
+
+import io
+import textwrap
+import zipfile
+import zlib
+from xml.sax.saxutils import escape
+
+
+ANCHO_PAGINA = 595
+ALTO_PAGINA = 842
+MARGEN = 50
+
+# Tamaño de letra e interlineado por estilo
+ESTILOS = {
+    'titulo': ('F2', 16, 24),
+    'subtitulo': ('F1', 10, 18),
+    'seccion': ('F2', 12, 22),
+    'normal': ('F1', 10, 14),
+}
+
+ANCHO_ETIQUETA = 170
+
+# Caracteres por línea del valor: Helvetica de 10 pt promedia unos 5 pt por
+# carácter
+CARACTERES_VALOR = (ANCHO_PAGINA - 2 * MARGEN - ANCHO_ETIQUETA) // 5
+
+
+def _texto_pdf(texto):
+    texto = texto.encode('cp1252', errors='replace').decode('latin-1')
+    return texto.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _lineas(bloques):
+    """
+    Convierte los bloques en líneas (estilo, etiqueta, texto) ya cortadas.
+    """
+    for bloque in bloques:
+        if bloque[0] == 'campo':
+            _, etiqueta, valor = bloque
+            partes = []
+            for renglon in str(valor).splitlines() or ['']:
+                partes.extend(textwrap.wrap(renglon, CARACTERES_VALOR) or [''])
+            for indice, parte in enumerate(partes):
+                yield 'normal', etiqueta if indice == 0 else '', parte
+        else:
+            estilo, texto = bloque
+            yield estilo, '', texto
+
+
+def pdf(bloques, titulo=''):
+    """
+    Retorna los bytes de un PDF con los bloques indicados, en orden:
+    ('titulo', texto), ('subtitulo', texto), ('seccion', texto) o
+    ('campo', etiqueta, valor).
+    """
+    paginas = [[]]
+    y = ALTO_PAGINA - MARGEN
+    for estilo, etiqueta, texto in _lineas(bloques):
+        fuente, tamanio, alto = ESTILOS[estilo]
+        if y - alto < MARGEN:
+            paginas.append([])
+            y = ALTO_PAGINA - MARGEN
+        y -= alto
+        if etiqueta:
+            paginas[-1].append(f'BT /F2 {tamanio} Tf {MARGEN} {y} Td ({_texto_pdf(etiqueta)}) Tj ET')
+        x = MARGEN + ANCHO_ETIQUETA if estilo == 'normal' else MARGEN
+        paginas[-1].append(f'BT /{fuente} {tamanio} Tf {x} {y} Td ({_texto_pdf(texto)}) Tj ET')
+
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # El árbol de páginas se completa al final
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+        f'<< /Title ({_texto_pdf(titulo)}) /Producer (Estudio Web) >>'.encode('latin-1'),
+    ]
+    hojas = []
+    for comandos in paginas:
+        contenido = zlib.compress('\n'.join(comandos).encode('latin-1'))
+        objetos.append(
+            f'<< /Length {len(contenido)} /Filter /FlateDecode >>\nstream\n'.encode()
+            + contenido + b'\nendstream'
+        )
+        objetos.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ANCHO_PAGINA} {ALTO_PAGINA}] '
+            f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {len(objetos)} 0 R >>'.encode()
+        )
+        hojas.append(f'{len(objetos)} 0 R')
+    objetos[1] = f'<< /Type /Pages /Kids [{" ".join(hojas)}] /Count {len(hojas)} >>'.encode()
+
+    salida = io.BytesIO()
+    salida.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    posiciones = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posiciones.append(salida.tell())
+        salida.write(f'{numero} 0 obj\n'.encode() + objeto + b'\nendobj\n')
+    inicio_xref = salida.tell()
+    salida.write(f'xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n'.encode())
+    for posicion in posiciones:
+        salida.write(f'{posicion:010d} 00000 n \n'.encode())
+    salida.write(
+        f'trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R /Info 5 0 R >>\n'
+        f'startxref\n{inicio_xref}\n%%EOF\n'.encode()
+    )
+    return salida.getvalue()
+
+
+def _celda(columna, fila, valor):
+    referencia = f'{"AB"[columna]}{fila}'
+    if valor in (None, ''):
+        return ''
+    return f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+
+def xlsx(filas, hoja='Datos'):
+    """
+    Retorna los bytes de un XLSX con una hoja de dos columnas a partir de
+    tuplas (etiqueta, valor).
+    """
+    celdas = ''.join(
+        f'<row r="{numero}">{_celda(0, numero, etiqueta)}{_celda(1, numero, valor)}</row>'
+        for numero, (etiqueta, valor) in enumerate(filas, start=1)
+    )
+    archivos = {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(hoja[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/worksheets/sheet1.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<cols><col min="1" max="1" width="32" customWidth="1"/>'
+            '<col min="2" max="2" width="60" customWidth="1"/></cols>'
+            f'<sheetData>{celdas}</sheetData>'
+            '</worksheet>'
+        ),
+    }
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, 'w', zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in archivos.items():
+            libro.writestr(nombre, contenido)
+    return salida.getvalue()
@@ -0,0 +1,174 @@
+"""
+Detección de clientes duplicados por similitud de nombre.
+
+Los nombres se normalizan (sin acentos, puntuación, formas societarias ni
+palabras vacías, con las siglas "S. A." unidas) y se comparan por el índice
+de Jaccard de sus trigramas. Comparar todos los pares es O(n²), así que los
+candidatos se generan con un índice invertido de trigramas y filtrado por
+prefijo:
+
+- Los trigramas de cada nombre se ordenan del menos al más frecuente.
+- Dos nombres con Jaccard >= umbral comparten necesariamente algún trigrama
+  entre los primeros `len - ceil(umbral * len) + 1` de cada uno, así que
+  solo esos prefijos se indexan y se consultan.
+- Los pares cuya diferencia de tamaño, o la posición de sus trigramas en
+  común, ya impide alcanzar el umbral se descartan antes de calcular la
+  similitud.
+
+El resultado es exacto para el umbral pedido y solo se puntúan los pares
+que comparten trigramas poco frecuentes.
+"""
+
+import math
+from collections import Counter, defaultdict
+
+from .autocompletado import normalizar
+
+
+UMBRAL = 0.8
+
+# Palabras que no distinguen a un cliente de otro
+PALABRAS_IGNORADAS = {
+    'sa', 'srl', 'sas', 'sca', 'scs', 'sh', 'se', 'saic', 'saci', 'sacif', 'sacifi',
+    'ltda', 'limitada', 'sociedad', 'anonima', 'responsabilidad', 'comandita',
+    'hecho', 'simple', 'por', 'acciones', 'cia', 'compania',
+    'de', 'del', 'la', 'las', 'los', 'el', 'y', 'e',
+}
+
+
+def normalizar_nombre(nombre):
+    """
+    Normaliza un nombre o razón social para compararlo.
+    """
+    palabras = []
+    sigla = ''
+    for palabra in normalizar(nombre).split():
+        # 'S. A.' se normaliza como 's a': las letras sueltas forman una sigla
+        if len(palabra) == 1 and palabra.isalpha():
+            sigla += palabra
+            continue
+        if sigla:
+            palabras.append(sigla)
+            sigla = ''
+        palabras.append(palabra)
+    if sigla:
+        palabras.append(sigla)
+
+    significativas = [palabra for palabra in palabras if palabra not in PALABRAS_IGNORADAS]
+    return ' '.join(significativas or palabras)
+
+
+def trigramas(texto):
+    texto = f' {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    comunes = len(a & b)
+    return comunes / (len(a) + len(b) - comunes)
+
+
+def buscar_duplicados(filas, umbral=UMBRAL):
+    """
+    Busca pares de clientes cuyos nombres normalizados tienen una similitud
+    de Jaccard >= umbral.
+
+    `filas` es un iterable de (pk, nombre, domicilio). Retorna una lista de
+    diccionarios con los dos pk, la similitud del nombre, la del domicilio
+    (None si falta en alguno) y un puntaje combinado, de mayor a menor.
+    """
+    pks = []
+    conjuntos = []
+    domicilios = []
+    for pk, nombre, domicilio in filas:
+        pks.append(pk)
+        conjuntos.append(trigramas(normalizar_nombre(nombre)))
+        domicilios.append(domicilio)
+
+    frecuencias = Counter(trigrama for conjunto in conjuntos for trigrama in conjunto)
+    ordenados = [
+        sorted(conjunto, key=lambda trigrama: (frecuencias[trigrama], trigrama))
+        for conjunto in conjuntos
+    ]
+
+    # Procesar de menor a mayor tamaño: cada nombre solo se compara con los
+    # ya indexados, que nunca son más grandes
+    orden = sorted(range(len(pks)), key=lambda i: len(ordenados[i]))
+    indice = defaultdict(list)
+    # Inicio vigente de cada lista del índice: como el tamaño mínimo de los
+    # candidatos solo crece, las entradas más chicas se saltean para siempre
+    inicios = defaultdict(int)
+    pares = []
+    for i in orden:
+        tamanio = len(ordenados[i])
+        if not tamanio:
+            continue
+        prefijo = tamanio - math.ceil(umbral * tamanio - 1e-9) + 1
+        minimo = umbral * tamanio
+
+        # Coincidencias acumuladas por candidato; se descarta el candidato
+        # cuando ni coincidiendo en todo lo que resta alcanzaría el umbral
+        necesarias = [
+            math.ceil(umbral / (1 + umbral) * (tamanio + tamanio_j) - 1e-9)
+            for tamanio_j in range(tamanio + 1)
+        ]
+        coincidencias = {}
+        for posicion, trigrama in enumerate(ordenados[i][:prefijo]):
+            entradas = indice[trigrama]
+            inicio = inicios[trigrama]
+            while inicio < len(entradas) and entradas[inicio][2] < minimo:
+                inicio += 1
+            inicios[trigrama] = inicio
+            restantes_i = tamanio - posicion
+            for j, posicion_j, tamanio_j in entradas[inicio:]:
+                previas = coincidencias.get(j, 0)
+                if previas < 0:
+                    continue
+                restantes = tamanio_j - posicion_j
+                if restantes > restantes_i:
+                    restantes = restantes_i
+                coincidencias[j] = previas + 1 if previas + restantes >= necesarias[tamanio_j] else -1
+
+        # Los nombres que se procesen después son más grandes, así que alcanza
+        # con indexar un prefijo más corto
+        indexado = tamanio - math.ceil(2 * umbral / (1 + umbral) * tamanio - 1e-9) + 1
+        for posicion, trigrama in enumerate(ordenados[i][:indexado]):
+            indice[trigrama].append((i, posicion, tamanio))
+
+        conjunto = conjuntos[i]
+        for j, previas in coincidencias.items():
+            if previas <= 0:
+                continue
+            comunes = len(conjunto & conjuntos[j])
+            similitud = comunes / (tamanio + len(conjuntos[j]) - comunes)
+            if similitud >= umbral:
+                pares.append(_par(pks[j], pks[i], similitud, domicilios[j], domicilios[i]))
+
+    pares.sort(key=lambda par: par['puntaje'], reverse=True)
+    return pares
+
+
+def _par(pk_a, pk_b, similitud, domicilio_a, domicilio_b):
+    puntaje = similitud
+    similitud_domicilio = None
+    if domicilio_a and domicilio_b:
+        similitud_domicilio = jaccard(trigramas(normalizar(domicilio_a)), trigramas(normalizar(domicilio_b)))
+        puntaje = 0.75 * similitud + 0.25 * similitud_domicilio
+        similitud_domicilio = round(similitud_domicilio, 3)
+    return {
+        'cliente_a': min(pk_a, pk_b),
+        'cliente_b': max(pk_a, pk_b),
+        'nombre': round(similitud, 3),
+        'domicilio': similitud_domicilio,
+        'puntaje': round(puntaje, 3),
+    }
+
+
+def duplicados_clientes(clientes, umbral=UMBRAL):
+    """
+    Busca duplicados en un queryset de clientes.
+    """
+    filas = clientes.order_by().values_list('pk', 'nombre', 'domicilio')
+    return buscar_duplicados(filas.iterator(chunk_size=2000), umbral=umbral)
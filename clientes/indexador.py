@@ -0,0 +1,189 @@
+"""
+Indexador incremental de las carpetas de los clientes.
+
+Recorre la `carpeta` de cada cliente y guarda sus archivos en
+`ArchivoCliente`. Para no volver a listar todo el árbol en cada corrida, se
+guarda el mtime de cada directorio en `DirectorioIndexado`: un directorio
+cuyo mtime no cambió no tuvo altas, bajas ni renombres, así que no se lista
+y solo se desciende a sus subdirectorios conocidos.
+
+El mtime de un directorio no cambia cuando se modifica el contenido de un
+archivo que ya existía; esos cambios se recogen con una corrida completa
+(`completo=True`).
+
+Los árboles de los clientes se recorren en paralelo en hilos (el recorrido
+es casi todo espera de E/S); las escrituras a la base se hacen desde el
+hilo principal.
+"""
+
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from .models import ArchivoCliente, DirectorioIndexado
+
+
+TAMANIO_LOTE = 1000
+
+
+EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+UN_MICROSEGUNDO = timedelta(microseconds=1)
+
+
+# La base guarda las fechas con precisión de microsegundos, así que las
+# comparaciones de mtime se hacen en microsegundos enteros
+def _a_fecha(microsegundos):
+    return EPOCA + microsegundos * UN_MICROSEGUNDO
+
+
+def _a_microsegundos(fecha):
+    return (fecha - EPOCA) // UN_MICROSEGUNDO
+
+
+def recorrer(base, directorios_previos, archivos_previos, completo=False):
+    """
+    Recorre la carpeta `base` comparando contra el índice anterior.
+
+    `directorios_previos` es {ruta: mtime} y `archivos_previos` es
+    {ruta: (tamaño, mtime en microsegundos)}. Retorna un diccionario con los
+    directorios actuales, los archivos nuevos o modificados y las rutas
+    eliminadas.
+    """
+    subdirectorios = defaultdict(list)
+    for ruta in directorios_previos:
+        if ruta:
+            subdirectorios[os.path.dirname(ruta)].append(ruta)
+    archivos_por_directorio = defaultdict(set)
+    for ruta in archivos_previos:
+        archivos_por_directorio[os.path.dirname(ruta)].add(ruta)
+
+    directorios = {}
+    cambiados = []
+    eliminados = []
+    listados = 0
+    pendientes = ['']
+
+    while pendientes:
+        relativa = pendientes.pop()
+        try:
+            mtime = os.stat(os.path.join(base, relativa)).st_mtime
+        except OSError:
+            continue
+        directorios[relativa] = mtime
+
+        if not completo and directorios_previos.get(relativa) == mtime:
+            pendientes.extend(subdirectorios[relativa])
+            continue
+
+        listados += 1
+        vistos = set()
+        try:
+            entradas = list(os.scandir(os.path.join(base, relativa)))
+        except OSError:
+            continue
+        for entrada in entradas:
+            ruta = os.path.join(relativa, entrada.name) if relativa else entrada.name
+            try:
+                if entrada.is_dir(follow_symlinks=False):
+                    pendientes.append(ruta)
+                elif entrada.is_file(follow_symlinks=False):
+                    estado = entrada.stat(follow_symlinks=False)
+                    vistos.add(ruta)
+                    mtime = estado.st_mtime_ns // 1000
+                    if archivos_previos.get(ruta) != (estado.st_size, mtime):
+                        cambiados.append((ruta, entrada.name, estado.st_size, mtime))
+            except OSError:
+                continue
+        eliminados.extend(archivos_por_directorio[relativa] - vistos)
+
+    # Archivos de directorios que ya no existen
+    for relativa in set(directorios_previos) - set(directorios):
+        eliminados.extend(archivos_por_directorio[relativa])
+
+    return {
+        'directorios': directorios,
+        'cambiados': cambiados,
+        'eliminados': eliminados,
+        'listados': listados,
+    }
+
+
+def _estado_previo(cliente):
+    directorios = dict(cliente.directorios_indexados.values_list('ruta', 'mtime'))
+    archivos = {
+        ruta: (tamanio, _a_microsegundos(modificado))
+        for ruta, tamanio, modificado in cliente.archivos.values_list('ruta', 'tamanio', 'modificado')
+    }
+    return directorios, archivos
+
+
+def _guardar(cliente, directorios_previos, archivos_previos, resultado):
+    cambiados = resultado['cambiados']
+    nuevos = [
+        ArchivoCliente(
+            cliente=cliente, ruta=ruta, nombre=nombre[:255],
+            tipo=os.path.splitext(nombre)[1][1:].lower()[:20],
+            tamanio=tamanio, modificado=_a_fecha(mtime),
+        )
+        for ruta, nombre, tamanio, mtime in cambiados if ruta not in archivos_previos
+    ]
+    ArchivoCliente.objects.bulk_create(nuevos, batch_size=TAMANIO_LOTE)
+
+    modificados = {ruta: (tamanio, mtime) for ruta, _, tamanio, mtime in cambiados if ruta in archivos_previos}
+    if modificados:
+        existentes = list(cliente.archivos.filter(ruta__in=modificados))
+        for archivo in existentes:
+            archivo.tamanio, mtime = modificados[archivo.ruta]
+            archivo.modificado = _a_fecha(mtime)
+        ArchivoCliente.objects.bulk_update(existentes, ['tamanio', 'modificado'], batch_size=TAMANIO_LOTE)
+
+    eliminados = resultado['eliminados']
+    for inicio in range(0, len(eliminados), TAMANIO_LOTE):
+        cliente.archivos.filter(ruta__in=eliminados[inicio:inicio + TAMANIO_LOTE]).delete()
+
+    directorios = resultado['directorios']
+    borrados = [ruta for ruta in directorios_previos if ruta not in directorios]
+    for inicio in range(0, len(borrados), TAMANIO_LOTE):
+        cliente.directorios_indexados.filter(ruta__in=borrados[inicio:inicio + TAMANIO_LOTE]).delete()
+    DirectorioIndexado.objects.bulk_create(
+        [DirectorioIndexado(cliente=cliente, ruta=ruta, mtime=mtime) for ruta, mtime in directorios.items()
+         if directorios_previos.get(ruta) != mtime],
+        batch_size=TAMANIO_LOTE,
+        update_conflicts=True,
+        unique_fields=['cliente', 'ruta'],
+        update_fields=['mtime'],
+    )
+
+    return {
+        'nuevos': len(nuevos),
+        'modificados': len(modificados),
+        'eliminados': len(eliminados),
+        'listados': resultado['listados'],
+        'directorios': len(directorios),
+    }
+
+
+def indexar_clientes(clientes, hilos=8, completo=False):
+    """
+    Indexa las carpetas de los clientes en paralelo.
+
+    Retorna un diccionario {cliente: resumen} y la duración total.
+    """
+    inicio = time.perf_counter()
+    clientes = [cliente for cliente in clientes if cliente.carpeta and os.path.isdir(cliente.carpeta)]
+    previos = {cliente.pk: _estado_previo(cliente) for cliente in clientes}
+
+    resumenes = {}
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        futuros = {
+            ejecutor.submit(recorrer, cliente.carpeta, *previos[cliente.pk], completo=completo): cliente
+            for cliente in clientes
+        }
+        for futuro in as_completed(futuros):
+            cliente = futuros[futuro]
+            resumenes[cliente] = _guardar(cliente, *previos.pop(cliente.pk), futuro.result())
+
+    return resumenes, time.perf_counter() - inicio
@@ -0,0 +1,154 @@
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from clientes.planes import (
+    capturar,
+    escribir_migracion,
+    explicar,
+    medir,
+    probar,
+    proponer,
+    reproducciones,
+)
+from estudios.contexto import usar_estudio
+from estudios.models import Estudio
+
+
+# Mejora mínima del tiempo total (proporción y milisegundos) para aceptar un
+# índice que no evita ningún recorrido ni ordenamiento
+MEJORA_MINIMA = 0.10
+MEJORA_MINIMA_MS = 0.5
+
+
+class Command(BaseCommand):
+    help = 'Analizar los planes de las consultas frecuentes de clientes y proponer índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudio',
+                            help='Slug del estudio con el que se reproducen las consultas (por omisión, el primer estudio activo)')
+        parser.add_argument('--sin-estudio', action='store_true',
+                            help='Reproducir las consultas sin estudio, sin el filtro que tienen las de los usuarios')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por medición')
+        parser.add_argument('--probar', action='store_true',
+                            help='Crear cada índice propuesto, medir de nuevo y eliminarlo')
+        parser.add_argument('--permitir-bloqueo', action='store_true',
+                            help='Permitir --probar fuera de PostgreSQL, donde crear el índice bloquea la tabla')
+        parser.add_argument('--generar-migraciones', action='store_true',
+                            help='Escribir migraciones con los índices que mejoran las consultas (implica --probar)')
+        parser.add_argument('--sql-completo', action='store_true', help='Mostrar el SQL sin recortar')
+
+    def handle(self, *args, **options):
+        if options['estudio'] and options['sin_estudio']:
+            raise CommandError('--estudio y --sin-estudio no pueden usarse juntos')
+        estudio = None
+        if options['estudio']:
+            try:
+                estudio = Estudio.objects.get(slug=options['estudio'])
+            except Estudio.DoesNotExist:
+                raise CommandError(f'No existe el estudio "{options["estudio"]}"')
+        elif not options['sin_estudio']:
+            estudio = Estudio.objects.filter(activo=True).first()
+        if estudio:
+            self.stdout.write(f'Consultas del estudio {estudio.nombre}')
+        else:
+            self.stdout.write(self.style.WARNING(
+                'Consultas sin estudio: no filtran por estudio como las de los usuarios '
+                'y sus planes pueden no ser los mismos'
+            ))
+        conexion = connections[estudio.base_datos if estudio else 'default']
+        repeticiones = options['repeticiones']
+        probar_indices = options['probar'] or options['generar_migraciones']
+        if probar_indices and conexion.vendor != 'postgresql' and not options['permitir_bloqueo']:
+            raise CommandError(
+                f'En {conexion.vendor} el índice de prueba se crea sin CONCURRENTLY y bloquea la tabla; '
+                'usar --permitir-bloqueo para probarlo igual'
+            )
+
+        total = 0
+        con_problemas = 0
+        propuestas = {}
+        with usar_estudio(estudio) if estudio else nullcontext():
+            for nombre, funcion in reproducciones():
+                self.stdout.write(f'\n== {nombre} ==')
+                for sql in capturar(funcion, conexion):
+                    total += 1
+                    lineas, problemas = explicar(conexion, sql)
+                    self.stdout.write(sql if options['sql_completo'] or len(sql) <= 200 else f'{sql[:200]}...')
+                    for linea in lineas:
+                        self.stdout.write(f'    {linea}')
+                    self.stdout.write(f'    {medir(conexion, sql, repeticiones):.2f} ms')
+                    if not problemas:
+                        continue
+
+                    con_problemas += 1
+                    for tipo, tabla in problemas:
+                        texto = f'recorrido completo de {tabla}' if tipo == 'recorrido' else 'ordenamiento aparte'
+                        self.stdout.write(self.style.WARNING(f'    ! {texto}'))
+                    modelo, indice, motivo = proponer(conexion, sql, problemas)
+                    if indice is None:
+                        self.stdout.write(f'    sin índice propuesto: {motivo}')
+                        continue
+                    self.stdout.write(self.style.WARNING(
+                        f'    propuesta: {modelo.__name__} {indice.fields} ({motivo})'
+                    ))
+                    clave = (modelo, tuple(indice.fields))
+                    propuestas.setdefault(clave, {'modelo': modelo, 'indice': indice, 'consultas': []})
+                    propuestas[clave]['consultas'].append(sql)
+
+            aceptadas = []
+            if probar_indices:
+                for propuesta in propuestas.values():
+                    aceptada = self._probar(conexion, propuesta, repeticiones)
+                    if aceptada:
+                        aceptadas.append(propuesta)
+
+        if options['generar_migraciones']:
+            self._generar(aceptadas)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {total} consultas analizadas, {con_problemas} con recorridos '
+            f'u ordenamientos, {len(propuestas)} índices propuestos.'
+        ))
+
+    def _probar(self, conexion, propuesta, repeticiones):
+        """
+        Mide las consultas de la propuesta con y sin el índice. Retorna si
+        el índice evita algún problema o mejora el tiempo total.
+        """
+        modelo, indice = propuesta['modelo'], propuesta['indice']
+        self.stdout.write(f'\n== Prueba de {modelo.__name__} {indice.fields} ==')
+        resultados = probar(conexion, modelo, indice, propuesta['consultas'], repeticiones)
+        for resultado in resultados:
+            self.stdout.write(
+                f'{resultado["sql"][:120]}...\n'
+                f'    {resultado["antes"]:.2f} ms -> {resultado["despues"]:.2f} ms, '
+                f'problemas {len(resultado["problemas_antes"])} -> {len(resultado["problemas_despues"])}'
+            )
+        antes = sum(resultado['antes'] for resultado in resultados)
+        despues = sum(resultado['despues'] for resultado in resultados)
+        resuelve = any(
+            len(resultado['problemas_despues']) < len(resultado['problemas_antes']) for resultado in resultados
+        )
+        mejora = (antes - despues) / antes if antes else 0
+        if resuelve or (mejora >= MEJORA_MINIMA and antes - despues >= MEJORA_MINIMA_MS):
+            self.stdout.write(self.style.SUCCESS(f'Índice útil: {mejora:+.0%} en el tiempo total'))
+            return True
+        self.stdout.write(self.style.WARNING(f'El índice no cambia el plan ({mejora:+.0%} en el tiempo total)'))
+        return False
+
+    def _generar(self, aceptadas):
+        por_app = {}
+        for propuesta in aceptadas:
+            por_app.setdefault(propuesta['modelo']._meta.app_label, []).append(
+                (propuesta['modelo'], propuesta['indice'])
+            )
+        for app_label, indices in por_app.items():
+            ruta = escribir_migracion(app_label, indices)
+            self.stdout.write(self.style.SUCCESS(f'\nMigración generada: {ruta}'))
+            self.stdout.write('Agregar a Meta.indexes, para que makemigrations no la revierta:')
+            for modelo, indice in indices:
+                self.stdout.write(f'    {modelo.__name__}: models.Index(fields={indice.fields!r}, name={indice.name!r}),')
+        if not por_app:
+            self.stdout.write('\nNingún índice mejora las consultas: no se generan migraciones.')
@@ -0,0 +1,96 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from clientes.archivo import DIAS_INACTIVO, archivar, candidatos, reindexar, restaurar, tamanio_indices
+from clientes.models import Cliente, ClienteArchivado
+from estudios.contexto import alcances, usar_estudio
+from estudios.models import Estudio
+
+
+class Command(BaseCommand):
+    help = 'Archivar los clientes inactivos desde hace tiempo o restaurar clientes archivados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_INACTIVO,
+                            help='Días sin modificaciones de un cliente inactivo antes de archivarlo')
+        parser.add_argument('--estudio', help='Slug del estudio (por defecto todos, en todas las bases)')
+        parser.add_argument('--simular', action='store_true', help='Solo mostrar los clientes que se archivarían')
+        parser.add_argument('--reindexar', action='store_true',
+                            help='Reconstruir los índices de clientes después de archivar')
+        parser.add_argument('--restaurar', type=int, action='append', metavar='ID',
+                            help='Restaurar el cliente archivado con este ID (repetible)')
+
+    def handle(self, *args, **options):
+        estudio = None
+        if options['estudio']:
+            try:
+                estudio = Estudio.objects.get(slug=options['estudio'])
+            except Estudio.DoesNotExist:
+                raise CommandError(f'No existe el estudio "{options["estudio"]}"')
+
+        # Los estudios con base propia se archivan en su base
+        restaurados = 0
+        for alcance in [estudio] if estudio else alcances():
+            with usar_estudio(alcance):
+                if options['restaurar']:
+                    restaurados += self._restaurar(options['restaurar'])
+                else:
+                    if alcance is not None and not estudio:
+                        self.stdout.write(f'\n== {alcance.nombre} (base {alcance.base_datos}) ==')
+                    self._archivar(options, connections[alcance.base_datos if alcance else 'default'])
+
+        if options['restaurar']:
+            pedidos = len(set(options['restaurar']))
+            if restaurados < pedidos:
+                self.stdout.write(self.style.WARNING(f'{pedidos - restaurados} clientes no se restauraron.'))
+            self.stdout.write(self.style.SUCCESS(f'\nProceso completado. {restaurados} clientes restaurados.'))
+
+    def _archivar(self, options, conexion):
+        clientes = candidatos(options['dias'])
+        cantidad = clientes.count()
+        if options['simular']:
+            for cliente in clientes.order_by('nombre')[:50]:
+                self.stdout.write(f'{cliente.nombre} ({cliente.cuit}), sin cambios desde {cliente.fecha_modificacion:%d/%m/%Y}')
+            if cantidad > 50:
+                self.stdout.write(f'... y {cantidad - 50} clientes más')
+            self.stdout.write(self.style.SUCCESS(f'\nProceso completado. Se archivarían {cantidad} clientes.'))
+            return
+
+        tabla = Cliente._meta.db_table
+        antes = tamanio_indices(conexion, tabla)
+        archivados = archivar(
+            clientes,
+            informar=lambda archivados: self.stdout.write(f'{archivados}/{cantidad} clientes archivados'),
+        )
+        if options['reindexar']:
+            reindexar(conexion, tabla)
+        despues = tamanio_indices(conexion, tabla)
+
+        if antes is None:
+            self.stdout.write(self.style.WARNING('La base no informa el tamaño de los índices.'))
+        else:
+            self.stdout.write('\nTamaño de los índices de clientes:')
+            for nombre in sorted(antes):
+                self.stdout.write(
+                    f'  {nombre}: {antes[nombre] / 1024:,.0f} KB -> {despues.get(nombre, 0) / 1024:,.0f} KB'
+                )
+            if not options['reindexar']:
+                self.stdout.write('El espacio liberado se recupera al reconstruir los índices (--reindexar).')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {archivados} clientes archivados, '
+            f'{ClienteArchivado.objects.count()} en total en el archivo.'
+        ))
+
+    def _restaurar(self, ids):
+        restaurados = 0
+        for archivado in ClienteArchivado.objects.filter(pk__in=ids):
+            try:
+                cliente = restaurar(archivado)
+            except ValidationError as error:
+                self.stdout.write(self.style.ERROR(f'{archivado}: {"; ".join(error.messages)}'))
+                continue
+            restaurados += 1
+            self.stdout.write(f'Restaurado: {cliente.nombre} ({cliente.cuit})')
+        return restaurados
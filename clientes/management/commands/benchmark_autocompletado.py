@@ -0,0 +1,65 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from clientes.autocompletado import IndicePrefijos
+
+
+PALABRAS = [
+    'EMPRESA', 'CONSULTORA', 'SERVICIOS', 'INTEGRALES', 'DISTRIBUIDORA',
+    'TECNOLOGÍA', 'DESARROLLO', 'IMPORTADORA', 'NORTE', 'SUR', 'ESTE',
+    'OESTE', 'ALIMENTOS', 'CONSTRUCCIONES', 'TRANSPORTES', 'AGROPECUARIA',
+    'LOGÍSTICA', 'COMERCIAL', 'INDUSTRIAL', 'PATAGONIA', 'ANDINA',
+]
+
+SOCIEDADES = ['S.A.', 'S.R.L.', 'S.A.S.', 'LTDA.', '']
+
+
+class Command(BaseCommand):
+    help = 'Medir construcción, memoria y latencia del índice de autocompletado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=10000)
+        parser.add_argument('--consultas', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cantidad = options['clientes']
+        consultas = options['consultas']
+        azar = random.Random(0)
+
+        filas = []
+        for pk in range(1, cantidad + 1):
+            nombre = ' '.join(azar.sample(PALABRAS, 3) + [azar.choice(SOCIEDADES)]).strip()
+            cuit = f'30-{azar.randrange(10**8):08d}-{azar.randrange(10)}'
+            filas.append((pk, nombre, cuit))
+
+        indice = IndicePrefijos(max_clientes=cantidad)
+
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        indice.construir(filas)
+        construccion = time.perf_counter() - inicio
+        memoria, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        prefijos = [
+            azar.choice(PALABRAS).lower()[:azar.randint(1, 5)] if azar.random() < 0.7
+            else filas[azar.randrange(cantidad)][2].replace('-', '')[:azar.randint(2, 8)]
+            for _ in range(consultas)
+        ]
+        latencias = []
+        for prefijo in prefijos:
+            inicio = time.perf_counter()
+            indice.buscar(prefijo, 10)
+            latencias.append(time.perf_counter() - inicio)
+        latencias.sort()
+
+        self.stdout.write(f'Clientes indexados: {len(indice)}')
+        self.stdout.write(f'Construcción: {construccion * 1000:.1f} ms')
+        self.stdout.write(f'Memoria por cliente: {memoria / cantidad:.0f} bytes')
+        self.stdout.write(
+            f'Latencia p50: {latencias[len(latencias) // 2] * 1e6:.1f} µs - '
+            f'p99: {latencias[int(len(latencias) * 0.99)] * 1e6:.1f} µs'
+        )
@@ -0,0 +1,47 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from clientes import cuit
+
+
+class Command(BaseCommand):
+    help = 'Medir la validación de CUIT escalar contra la validación por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cuits', type=int, default=1000000)
+
+    def handle(self, *args, **options):
+        cantidad = options['cuits']
+        azar = random.Random(0)
+
+        cuits = []
+        for _ in range(cantidad):
+            digitos = f'{azar.choice((20, 23, 27, 30, 33))}{azar.randrange(10**8):08d}'
+            verificador = cuit.digito_verificador(digitos)
+            if azar.random() < 0.1 or verificador == 10:
+                verificador = azar.randrange(10)
+            cuits.append(f'{digitos[:2]}-{digitos[2:]}-{verificador}')
+
+        inicio = time.perf_counter()
+        escalar = [cuit.es_valido(valor) for valor in cuits]
+        segundos_escalar = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        lote = cuit.validar_lote(cuits)
+        segundos_lote = time.perf_counter() - inicio
+
+        if escalar != lote:
+            self.stdout.write(self.style.ERROR('La validación por lotes no coincide con la escalar'))
+            return
+
+        self.stdout.write(f'CUIT validados: {cantidad} ({sum(lote)} válidos)')
+        self.stdout.write(f'Escalar: {cantidad / segundos_escalar:,.0f} CUIT/s')
+        self.stdout.write(
+            f'Por lotes ({"NumPy" if cuit.numpy is not None else "sin NumPy"}): '
+            f'{cantidad / segundos_lote:,.0f} CUIT/s'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. Mejora: {segundos_escalar / segundos_lote:.1f}x'
+        ))
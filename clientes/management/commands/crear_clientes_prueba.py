@@ -10,7 +10,7 @@ class Command(BaseCommand):
         clientes_prueba = [
             {
                 'nombre': 'EMPRESA EJEMPLO S.A.',
-                'cuit': '30-12345678-9',
+                'cuit': '30-12345678-1',
                 'domicilio': 'Av. Corrientes 1234, CABA',
                 'clave_fiscal': 'clave123',
                 'activo': True
@@ -25,14 +25,14 @@ class Command(BaseCommand):
             },
             {
                 'nombre': 'SERVICIOS INTEGRALES DEL SUR',
-                'cuit': '27-98765432-1',
+                'cuit': '27-98765432-0',
                 'domicilio': 'Belgrano 890, La Plata',
                 'clave_arba': 'arbaclave789',
                 'activo': False
             },
             {
                 'nombre': 'DISTRIBUIDORA NORTE LTDA.',
-                'cuit': '30-11223344-5',
+                'cuit': '30-11223344-6',
                 'domicilio': 'Mitre 456, San Isidro',
                 'clave_fiscal': 'fiscal999',
                 'clave_sec': 'sec123',
@@ -41,7 +41,7 @@ class Command(BaseCommand):
             },
             {
                 'nombre': 'TECNOLOGÍA Y DESARROLLO S.A.S.',
-                'cuit': '30-55667788-9',
+                'cuit': '30-55667789-8',
                 'domicilio': 'Av. Santa Fe 2100, CABA',
                 'clave_fiscal': 'tech2024',
                 'clave_ciudad': 'ciudad456',
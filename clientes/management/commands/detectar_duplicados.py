@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clientes.duplicados import UMBRAL, duplicados_clientes
+from clientes.models import Cliente
+from estudios.contexto import alcances, usar_estudio
+from estudios.models import Estudio
+
+
+class Command(BaseCommand):
+    help = 'Detectar clientes posiblemente duplicados por similitud de nombre'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--umbral', type=float, default=UMBRAL, help='Similitud mínima del nombre (0 a 1)')
+        parser.add_argument('--solo-activos', action='store_true', help='Considerar solo clientes activos')
+        parser.add_argument('--limite', type=int, default=100, help='Cantidad máxima de pares a mostrar por estudio')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total = 0
+        nombres_estudios = dict(Estudio.objects.values_list('pk', 'nombre'))
+        # Los clientes de los estudios con base propia se comparan en su base
+        for estudio in alcances():
+            with usar_estudio(estudio):
+                clientes = Cliente.objects.all()
+                if options['solo_activos']:
+                    clientes = clientes.filter(activo=True)
+                # Dos clientes de estudios distintos no son duplicados aunque
+                # compartan la base
+                estudios = clientes.order_by('estudio_id').values_list('estudio_id', flat=True).distinct()
+                for estudio_id in list(estudios):
+                    total += self._detectar(
+                        clientes.filter(estudio_id=estudio_id),
+                        nombres_estudios.get(estudio_id, 'Sin estudio'),
+                        options,
+                    )
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {total} posibles duplicados en {segundos:.1f} s.'
+        ))
+
+    def _detectar(self, clientes, estudio, options):
+        pares = duplicados_clientes(clientes, umbral=options['umbral'])
+        if not pares:
+            return 0
+
+        self.stdout.write(f'\n{estudio}: {len(pares)} posibles duplicados')
+        mostrados = pares[:options['limite']]
+        ids = {par['cliente_a'] for par in mostrados} | {par['cliente_b'] for par in mostrados}
+        nombres = dict(clientes.filter(pk__in=ids).values_list('pk', 'nombre'))
+        for par in mostrados:
+            domicilio = f', domicilio {par["domicilio"]:.2f}' if par['domicilio'] is not None else ''
+            self.stdout.write(self.style.WARNING(
+                f'{nombres[par["cliente_a"]]} (#{par["cliente_a"]}) ~ '
+                f'{nombres[par["cliente_b"]]} (#{par["cliente_b"]}): nombre {par["nombre"]:.2f}{domicilio}'
+            ))
+        if len(pares) > len(mostrados):
+            self.stdout.write(f'... y {len(pares) - len(mostrados)} pares más')
+        return len(pares)
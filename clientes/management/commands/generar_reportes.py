@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from clientes.models import Cliente
+from clientes.reportes import FORMATOS, generar_reportes, ruta_zip
+from estudios.contexto import alcances, usar_estudio
+
+
+class Command(BaseCommand):
+    help = 'Generar las fichas PDF/XLSX de los clientes en un ZIP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', help='Ruta del ZIP (por defecto en REPORTES_DIR)')
+        parser.add_argument('--formato', choices=['ambos', *FORMATOS], default='ambos')
+        parser.add_argument('--con-credenciales', action='store_true',
+                            help='Incluir las claves de acceso en las fichas')
+        parser.add_argument('--cliente', type=int, action='append', help='ID de cliente (repetible)')
+        parser.add_argument('--inactivos', action='store_true', help='Incluir los clientes inactivos')
+        parser.add_argument('--procesos', type=int, default=4, help='Procesos que generan las fichas')
+
+    def handle(self, *args, **options):
+        formatos = FORMATOS if options['formato'] == 'ambos' else (options['formato'],)
+        # Un ZIP por base: los clientes de un estudio con base propia van en el suyo
+        for estudio in alcances():
+            with usar_estudio(estudio):
+                clientes = Cliente.objects.all() if options['inactivos'] else Cliente.objects.filter(activo=True)
+                if options['cliente']:
+                    clientes = Cliente.objects.filter(pk__in=options['cliente'])
+                salida = options['salida'] or ruta_zip(options['con_credenciales'], estudio)
+                if options['salida'] and estudio is not None:
+                    salida = f'{options["salida"].removesuffix(".zip")}-{estudio.slug}.zip'
+
+                resultado = generar_reportes(
+                    clientes,
+                    salida,
+                    formatos=formatos,
+                    con_credenciales=options['con_credenciales'],
+                    procesos=options['procesos'],
+                    informar=self._informar,
+                )
+
+            self.stdout.write(self.style.SUCCESS(
+                f'\nProceso completado. {resultado["listos"]} fichas ({resultado["generados"]} generadas, '
+                f'{resultado["reutilizados"]} sin cambios) en {resultado["salida"]} '
+                f'({resultado["tamanio"] / 1024:,.0f} KB).'
+            ))
+
+    def _informar(self, progreso):
+        self.stdout.write(
+            f'{progreso["listos"]}/{progreso["total"]} fichas '
+            f'({progreso["generados"]} generadas, {progreso["reutilizados"]} sin cambios)'
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from clientes.snapshots import generar_snapshot, ruta_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Generar los snapshots SQLite de solo lectura de los clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sin-credenciales', action='store_true',
+                            help='Generar solo la variante sin claves')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Regenerar aunque los clientes no hayan cambiado')
+
+    def handle(self, *args, **options):
+        variantes = [False] if options['sin_credenciales'] else [False, True]
+        for con_credenciales in variantes:
+            actual = generar_snapshot(con_credenciales, forzar=options['forzar'])
+            nombre = 'con credenciales' if con_credenciales else 'sin credenciales'
+            self.stdout.write(
+                f'{nombre}: versión {actual["version"]}, {actual["filas"]} clientes, '
+                f'{actual["tamanio"] / 1024:.1f} KB ({ruta_snapshot(actual["version"], con_credenciales)})'
+            )
+
+        self.stdout.write(self.style.SUCCESS('\nProceso completado.'))
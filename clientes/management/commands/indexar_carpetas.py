@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from clientes.indexador import indexar_clientes
+from clientes.models import Cliente
+from estudios.contexto import alcances, usar_estudio
+
+
+class Command(BaseCommand):
+    help = 'Indexar los archivos de las carpetas de los clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cliente', type=int, action='append', help='ID de cliente a indexar (repetible)')
+        parser.add_argument('--hilos', type=int, default=8, help='Clientes recorridos en paralelo')
+        parser.add_argument(
+            '--completo', action='store_true',
+            help='Listar todos los directorios aunque su mtime no haya cambiado'
+        )
+
+    def handle(self, *args, **options):
+        # Lista y no diccionario: los ids se repiten entre las bases de los estudios
+        resumenes = []
+        segundos = 0
+        for estudio in alcances():
+            with usar_estudio(estudio):
+                clientes = Cliente.objects.exclude(carpeta__isnull=True).exclude(carpeta='')
+                if options['cliente']:
+                    clientes = clientes.filter(pk__in=options['cliente'])
+
+                por_cliente, duracion = indexar_clientes(
+                    clientes, hilos=options['hilos'], completo=options['completo']
+                )
+            resumenes.extend(por_cliente.items())
+            segundos += duracion
+
+        for cliente, resumen in sorted(resumenes, key=lambda item: item[0].nombre):
+            self.stdout.write(
+                f'{cliente.nombre}: {resumen["nuevos"]} nuevos, {resumen["modificados"]} modificados, '
+                f'{resumen["eliminados"]} eliminados ({resumen["listados"]} de '
+                f'{resumen["directorios"]} directorios listados)'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {len(resumenes)} carpetas indexadas en {segundos:.1f} s.'
+        ))
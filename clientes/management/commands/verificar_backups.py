@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from clientes.backups import verificar_backups
+from clientes.models import Cliente, EstadoBackup
+from estudios.contexto import alcances, usar_estudio
+
+
+class Command(BaseCommand):
+    help = 'Verificar los backups de las bases de los clientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cliente', type=int, action='append', help='ID de cliente a verificar (repetible)')
+        parser.add_argument('--procesos', type=int, default=4, help='Procesos que calculan los hashes')
+
+    def handle(self, *args, **options):
+        resumen = {}
+        # Los clientes de los estudios con base propia se verifican en su base
+        for estudio in alcances():
+            with usar_estudio(estudio):
+                for estado, cantidad in self._verificar(options).items():
+                    resumen[estado] = resumen.get(estado, 0) + cantidad
+
+        detalle = ', '.join(
+            f'{cantidad} {dict(EstadoBackup.ESTADOS)[estado].lower()}' for estado, cantidad in sorted(resumen.items())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {sum(resumen.values())} clientes verificados ({detalle or "ninguno"}).'
+        ))
+
+    def _verificar(self, options):
+        clientes = Cliente.objects.filter(activo=True)
+        if options['cliente']:
+            clientes = Cliente.objects.filter(pk__in=options['cliente'])
+
+        resumen = verificar_backups(clientes, procesos=options['procesos'])
+
+        problemas = EstadoBackup.objects.filter(
+            cliente__in=clientes,
+            estado__in=[EstadoBackup.DESACTUALIZADO, EstadoBackup.FALTANTE, EstadoBackup.ERROR],
+        ).select_related('cliente').order_by('cliente__nombre')
+        for estado in problemas:
+            estilo = self.style.WARNING if estado.estado == EstadoBackup.DESACTUALIZADO else self.style.ERROR
+            self.stdout.write(estilo(f'{estado.cliente.nombre}: {estado.get_estado_display()} - {estado.detalle}'))
+        return resumen
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(help_text='Ruta relativa a la carpeta del cliente', max_length=1000, verbose_name='Ruta')),
+                ('nombre', models.CharField(max_length=255, verbose_name='Nombre')),
+                ('tipo', models.CharField(blank=True, help_text='Extensión del archivo en minúsculas', max_length=20, verbose_name='Tipo')),
+                ('tamanio', models.BigIntegerField(help_text='Tamaño en bytes', verbose_name='Tamaño')),
+                ('modificado', models.DateTimeField(verbose_name='Modificado')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archivos', to='clientes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Archivo de Cliente',
+                'verbose_name_plural': 'Archivos de Clientes',
+                'ordering': ['ruta'],
+                'indexes': [models.Index(fields=['cliente', 'nombre'], name='archivo_cliente_nombre'), models.Index(fields=['cliente', 'tipo'], name='archivo_cliente_tipo')],
+                'constraints': [models.UniqueConstraint(fields=('cliente', 'ruta'), name='archivo_cliente_ruta')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DirectorioIndexado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(help_text='Ruta relativa a la carpeta del cliente', max_length=1000, verbose_name='Ruta')),
+                ('mtime', models.FloatField(verbose_name='Modificación')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='directorios_indexados', to='clientes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Directorio Indexado',
+                'verbose_name_plural': 'Directorios Indexados',
+                'constraints': [models.UniqueConstraint(fields=('cliente', 'ruta'), name='directorio_indexado_cliente_ruta')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0002_archivocliente_directorioindexado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestoArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(max_length=500, unique=True, verbose_name='Ruta')),
+                ('tamanio', models.BigIntegerField(verbose_name='Tamaño')),
+                ('mtime_ns', models.BigIntegerField(verbose_name='Modificación (ns)')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('calculado', models.DateTimeField(auto_now=True, verbose_name='Calculado')),
+            ],
+            options={
+                'verbose_name': 'Digesto de Archivo',
+                'verbose_name_plural': 'Digestos de Archivos',
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadoBackup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('OK', 'OK'), ('DESACTUALIZADO', 'Desactualizado'), ('FALTANTE', 'Faltante'), ('SIN_CONFIGURAR', 'Sin configurar'), ('ERROR', 'Error')], max_length=15, verbose_name='Estado')),
+                ('archivo_backup', models.CharField(blank=True, help_text='Backup más reciente encontrado en la ruta de respaldo', max_length=500, verbose_name='Archivo de Backup')),
+                ('fecha_backup', models.DateTimeField(blank=True, null=True, verbose_name='Fecha del Backup')),
+                ('fecha_base', models.DateTimeField(blank=True, null=True, verbose_name='Modificación de la Base')),
+                ('coincide', models.BooleanField(default=False, help_text='El backup es idéntico a la base actual', verbose_name='Coincide')),
+                ('detalle', models.TextField(blank=True, verbose_name='Detalle')),
+                ('verificado', models.DateTimeField(auto_now=True, verbose_name='Verificado')),
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='estado_backup', to='clientes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Estado de Backup',
+                'verbose_name_plural': 'Estados de Backup',
+                'indexes': [models.Index(fields=['estado'], name='estado_backup_estado')],
+            },
+        ),
+    ]
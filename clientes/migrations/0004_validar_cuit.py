@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:32
+
+import clientes.cuit
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0003_backups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='cuit',
+            field=models.CharField(help_text='CUIT en formato XX-XXXXXXXX-X', max_length=13, unique=True, validators=[django.core.validators.RegexValidator(message='El CUIT debe tener el formato XX-XXXXXXXX-X', regex='^\\d{2}-\\d{8}-\\d{1}$'), clientes.cuit.validar_cuit], verbose_name='CUIT'),
+        ),
+    ]
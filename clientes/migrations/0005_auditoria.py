@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:47
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_validar_cuit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('accion', models.CharField(choices=[('ALTA', 'Alta'), ('MODIFICACION', 'Modificación'), ('BAJA', 'Baja')], max_length=12, verbose_name='Acción')),
+                ('usuario', models.CharField(blank=True, help_text='Usuario que hizo el cambio; vacío si no hubo una solicitud autenticada', max_length=150, verbose_name='Usuario')),
+                ('cambios', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Cambios')),
+                ('fecha', models.DateTimeField(help_text='Momento del cambio, no el de la inserción del lote', verbose_name='Fecha')),
+                ('cliente', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='cambios', to='clientes.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Cambio de Cliente',
+                'verbose_name_plural': 'Cambios de Clientes',
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['cliente', '-fecha'], name='cambio_cliente_fecha')],
+            },
+        ),
+    ]
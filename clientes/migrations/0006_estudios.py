@@ -0,0 +1,80 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:55
+
+import clientes.cuit
+import clientes.models
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def asignar_estudio(apps, schema_editor):
+    """
+    Crea el estudio principal con todos los usuarios existentes y le asigna
+    los clientes existentes.
+    """
+    alias = schema_editor.connection.alias
+    Estudio = apps.get_model('estudios', 'Estudio')
+    Cliente = apps.get_model('clientes', 'Cliente')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    if alias != 'default' and not Cliente.objects.using(alias).exists():
+        # Base nueva de un estudio: los estudios viven en `default`
+        return
+
+    estudio = Estudio.objects.using(alias).order_by('pk').first()
+    if estudio is None:
+        estudio = Estudio.objects.using(alias).create(nombre='Estudio principal', slug='principal')
+        estudio.usuarios.set(User.objects.using(alias).all())
+    Cliente.objects.using(alias).filter(estudio__isnull=True).update(estudio=estudio)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0005_auditoria'),
+        ('estudios', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='estudio',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='clientes', to='estudios.estudio', verbose_name='Estudio'),
+        ),
+        migrations.RunPython(asignar_estudio, migrations.RunPython.noop),
+        # El valor por defecto depende de la solicitud: solo existe en el modelo
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name='cliente',
+                    name='estudio',
+                    field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='clientes', to='estudios.estudio', verbose_name='Estudio'),
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='cliente',
+                    name='estudio',
+                    field=models.ForeignKey(db_constraint=False, default=clientes.models.estudio_predeterminado, on_delete=django.db.models.deletion.PROTECT, related_name='clientes', to='estudios.estudio', verbose_name='Estudio'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='cuit',
+            field=models.CharField(help_text='CUIT en formato XX-XXXXXXXX-X', max_length=13, validators=[django.core.validators.RegexValidator(message='El CUIT debe tener el formato XX-XXXXXXXX-X', regex='^\\d{2}-\\d{8}-\\d{1}$'), clientes.cuit.validar_cuit], verbose_name='CUIT'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['estudio', 'nombre'], name='cliente_estudio_nombre'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['estudio', 'activo'], name='cliente_estudio_activo'),
+        ),
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(fields=('estudio', 'cuit'), name='cliente_estudio_cuit', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
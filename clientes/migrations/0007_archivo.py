@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:05
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0006_estudios'),
+        ('estudios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClienteArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID del Cliente')),
+                ('nombre', models.CharField(max_length=200, verbose_name='Nombre/Razón Social')),
+                ('cuit', models.CharField(max_length=13, verbose_name='CUIT')),
+                ('datos', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Campos del cliente al archivarlo', verbose_name='Datos')),
+                ('fecha_archivado', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Archivo')),
+            ],
+            options={
+                'verbose_name': 'Cliente Archivado',
+                'verbose_name_plural': 'Clientes Archivados',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='cambiocliente',
+            name='accion',
+            field=models.CharField(choices=[('ALTA', 'Alta'), ('MODIFICACION', 'Modificación'), ('BAJA', 'Baja'), ('ARCHIVO', 'Archivado'), ('RESTAURACION', 'Restauración')], max_length=12, verbose_name='Acción'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['estudio', 'nombre'], name='cliente_activos_nombre'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['estudio', 'cuit'], name='cliente_activos_cuit', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('activo', False)), fields=['fecha_modificacion'], name='cliente_inactivos_modif'),
+        ),
+        migrations.AddField(
+            model_name='clientearchivado',
+            name='estudio',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='clientes_archivados', to='estudios.estudio', verbose_name='Estudio'),
+        ),
+        migrations.AddIndex(
+            model_name='clientearchivado',
+            index=models.Index(fields=['estudio', 'cuit'], name='archivado_estudio_cuit'),
+        ),
+    ]
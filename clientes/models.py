@@ -1,12 +1,39 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 
+from estudios.contexto import estudio_para_alta
+from estudios.managers import EstudioClienteManager, EstudioManager
+
+from .cuit import validar_cuit
+
+
+def estudio_predeterminado():
+    """
+    Estudio de los clientes nuevos: el de la solicitud en curso.
+    """
+    return estudio_para_alta().pk
+
 
 class Cliente(models.Model):
     """
     Modelo para gestionar la información de clientes del estudio contable.
+    
+    `objects` ve solo los clientes del estudio en curso (ver
+    `estudios.contexto`); `todos` los de todos los estudios.
     """
     
+    estudio = models.ForeignKey(
+        'estudios.Estudio',
+        on_delete=models.PROTECT,
+        # El estudio puede estar en otra base que sus clientes
+        db_constraint=False,
+        default=estudio_predeterminado,
+        related_name='clientes',
+        verbose_name="Estudio"
+    )
+    
     # Información básica
     nombre = models.CharField(
         max_length=200, 
@@ -20,8 +47,7 @@ class Cliente(models.Model):
     )
     cuit = models.CharField(
         max_length=13, 
-        unique=True,
-        validators=[cuit_validator],
+        validators=[cuit_validator, validar_cuit],
         verbose_name="CUIT",
         help_text="CUIT en formato XX-XXXXXXXX-X"
     )
@@ -180,14 +206,77 @@ class Cliente(models.Model):
         help_text="Indica si el cliente está activo"
     )
 
+    objects = EstudioManager()
+    
+    todos = models.Manager()
+
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['nombre']
+        # Todo índice empieza por el estudio: las consultas de un estudio
+        # recorren solo sus propias filas
+        constraints = [
+            # varchar_pattern_ops permite usar el índice en las búsquedas
+            # por prefijo de CUIT (LIKE '30-12%') en PostgreSQL
+            models.UniqueConstraint(
+                fields=['estudio', 'cuit'],
+                name='cliente_estudio_cuit',
+                opclasses=['int8_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['estudio', 'nombre'], name='cliente_estudio_nombre'),
+            models.Index(fields=['estudio', 'activo'], name='cliente_estudio_activo'),
+            # Parciales: la mayoría de las consultas son de clientes activos y
+            # estos índices no crecen con los inactivos
+            models.Index(
+                fields=['estudio', 'nombre'],
+                condition=models.Q(activo=True),
+                name='cliente_activos_nombre',
+            ),
+            models.Index(
+                fields=['estudio', 'cuit'],
+                condition=models.Q(activo=True),
+                name='cliente_activos_cuit',
+                opclasses=['int8_ops', 'varchar_pattern_ops'],
+            ),
+            # Candidatos a archivar (ver `clientes.archivo`)
+            models.Index(
+                fields=['fecha_modificacion'],
+                condition=models.Q(activo=False),
+                name='cliente_inactivos_modif',
+            ),
+        ]
         
     def __str__(self):
         return f"{self.nombre} - {self.cuit}"
     
+    def clean(self):
+        """
+        Valida que el CUIT no esté repetido en el estudio. La restricción
+        incluye el estudio, que no está en los formularios, así que Django
+        no la valida por su cuenta.
+        """
+        super().clean()
+        if self.cuit and self.estudio_id:
+            repetidos = Cliente.todos.filter(estudio_id=self.estudio_id, cuit=self.cuit).exclude(pk=self.pk)
+            archivados = ClienteArchivado.todos.filter(estudio_id=self.estudio_id, cuit=self.cuit).exclude(pk=self.pk)
+            if repetidos.exists() or archivados.exists():
+                raise ValidationError({'cuit': 'Ya existe un cliente con este CUIT.'})
+    
+    def save(self, *args, **kwargs):
+        # Los clientes de `ClienteArchivado.como_cliente` no tienen fila:
+        # guardarlos la volvería a crear junto a la del archivo
+        if getattr(self, 'fecha_archivado', None) is not None:
+            raise ValueError(f'El cliente {self.pk} está archivado: hay que restaurarlo para guardarlo')
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        if getattr(self, 'fecha_archivado', None) is not None:
+            raise ValueError(f'El cliente {self.pk} está archivado: se elimina desde el archivo')
+        return super().delete(*args, **kwargs)
+    
     def __repr__(self):
         return f"Cliente(pk={self.pk}, nombre='{self.nombre}', cuit='{self.cuit}')"
     
@@ -200,3 +289,380 @@ class Cliente(models.Model):
     def tiene_clave_fiscal(self):
         """Verifica si el cliente tiene clave fiscal configurada"""
         return bool(self.clave_fiscal and self.clave_fiscal.strip())
+
+
+class ClienteArchivado(models.Model):
+    """
+    Cliente inactivo desde hace tiempo, sacado de la tabla de clientes para
+    que sus índices solo tengan los clientes en uso.
+    
+    Conserva el id del cliente y todos sus campos en `datos`; `nombre` y
+    `cuit` se repiten como columnas para buscarlo. Se archiva y se restaura
+    con `clientes.archivo`.
+    """
+    
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="ID del Cliente"
+    )
+    
+    estudio = models.ForeignKey(
+        'estudios.Estudio',
+        on_delete=models.PROTECT,
+        db_constraint=False,
+        related_name='clientes_archivados',
+        verbose_name="Estudio"
+    )
+    
+    nombre = models.CharField(
+        max_length=200,
+        verbose_name="Nombre/Razón Social"
+    )
+    
+    cuit = models.CharField(
+        max_length=13,
+        verbose_name="CUIT"
+    )
+    
+    datos = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        verbose_name="Datos",
+        help_text="Campos del cliente al archivarlo"
+    )
+    
+    fecha_archivado = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Archivo"
+    )
+    
+    objects = EstudioManager()
+    
+    todos = models.Manager()
+    
+    class Meta:
+        verbose_name = "Cliente Archivado"
+        verbose_name_plural = "Clientes Archivados"
+        ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['estudio', 'cuit'], name='archivado_estudio_cuit'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nombre} - {self.cuit} (archivado)"
+    
+    def como_cliente(self):
+        """
+        Retorna un `Cliente` con los datos archivados, para mostrarlo. Tiene
+        `fecha_archivado` y no se puede guardar ni eliminar: su fila no está en
+        la tabla de clientes hasta restaurarlo.
+        """
+        valores = {
+            campo.attname: campo.to_python(self.datos[campo.attname])
+            for campo in Cliente._meta.concrete_fields if campo.attname in self.datos
+        }
+        cliente = Cliente(**valores)
+        cliente._state.adding = False
+        cliente._state.db = self._state.db
+        cliente.fecha_archivado = self.fecha_archivado
+        return cliente
+
+
+class CambioCliente(models.Model):
+    """
+    Cambio de un cliente: quién lo hizo, cuándo y qué campos cambiaron.
+    
+    `cambios` es {campo: [valor anterior, valor nuevo]}; las claves se
+    registran enmascaradas. Las filas se insertan en lotes fuera de la
+    solicitud (ver `clientes.auditoria`) y se conservan aunque el cliente se
+    elimine, por eso la clave foránea no tiene restricción en la base.
+    """
+    
+    ALTA = 'ALTA'
+    MODIFICACION = 'MODIFICACION'
+    BAJA = 'BAJA'
+    ARCHIVO = 'ARCHIVO'
+    RESTAURACION = 'RESTAURACION'
+    ACCIONES = [
+        (ALTA, 'Alta'),
+        (MODIFICACION, 'Modificación'),
+        (BAJA, 'Baja'),
+        (ARCHIVO, 'Archivado'),
+        (RESTAURACION, 'Restauración'),
+    ]
+    
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='cambios',
+        verbose_name="Cliente"
+    )
+    
+    accion = models.CharField(
+        max_length=12,
+        choices=ACCIONES,
+        verbose_name="Acción"
+    )
+    
+    usuario = models.CharField(
+        max_length=150,
+        blank=True,
+        verbose_name="Usuario",
+        help_text="Usuario que hizo el cambio; vacío si no hubo una solicitud autenticada"
+    )
+    
+    cambios = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name="Cambios"
+    )
+    
+    fecha = models.DateTimeField(
+        verbose_name="Fecha",
+        help_text="Momento del cambio, no el de la inserción del lote"
+    )
+    
+    objects = EstudioClienteManager()
+    
+    todos = models.Manager()
+    
+    class Meta:
+        verbose_name = "Cambio de Cliente"
+        verbose_name_plural = "Cambios de Clientes"
+        ordering = ['-fecha', '-id']
+        indexes = [
+            models.Index(fields=['cliente', '-fecha'], name='cambio_cliente_fecha'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_accion_display()} de cliente {self.cliente_id} ({self.fecha:%d/%m/%Y %H:%M})"
+    
+    def detalle(self):
+        """
+        Retorna [(nombre del campo, valor anterior, valor nuevo)].
+        """
+        nombres = {campo.attname: campo.verbose_name for campo in Cliente._meta.concrete_fields}
+        return [
+            (nombres.get(campo, campo), anterior, nuevo)
+            for campo, (anterior, nuevo) in self.cambios.items()
+        ]
+
+
+class DirectorioIndexado(models.Model):
+    """
+    Directorio de la carpeta de un cliente ya recorrido por el indexador.
+
+    Guarda el mtime con el que se listó para no volver a listarlo mientras
+    no cambie su contenido.
+    """
+    
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name='directorios_indexados',
+        verbose_name="Cliente"
+    )
+    
+    ruta = models.CharField(
+        max_length=1000,
+        verbose_name="Ruta",
+        help_text="Ruta relativa a la carpeta del cliente"
+    )
+    
+    mtime = models.FloatField(
+        verbose_name="Modificación"
+    )
+    
+    objects = EstudioClienteManager()
+    
+    todos = models.Manager()
+    
+    class Meta:
+        verbose_name = "Directorio Indexado"
+        verbose_name_plural = "Directorios Indexados"
+        constraints = [
+            models.UniqueConstraint(fields=['cliente', 'ruta'], name='directorio_indexado_cliente_ruta')
+        ]
+    
+    def __str__(self):
+        return f"{self.cliente.nombre}: {self.ruta or '/'}"
+
+
+class ArchivoCliente(models.Model):
+    """
+    Archivo encontrado en la carpeta de un cliente.
+    """
+    
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name='archivos',
+        verbose_name="Cliente"
+    )
+    
+    ruta = models.CharField(
+        max_length=1000,
+        verbose_name="Ruta",
+        help_text="Ruta relativa a la carpeta del cliente"
+    )
+    
+    nombre = models.CharField(
+        max_length=255,
+        verbose_name="Nombre"
+    )
+    
+    tipo = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name="Tipo",
+        help_text="Extensión del archivo en minúsculas"
+    )
+    
+    tamanio = models.BigIntegerField(
+        verbose_name="Tamaño",
+        help_text="Tamaño en bytes"
+    )
+    
+    modificado = models.DateTimeField(
+        verbose_name="Modificado"
+    )
+    
+    objects = EstudioClienteManager()
+    
+    todos = models.Manager()
+    
+    class Meta:
+        verbose_name = "Archivo de Cliente"
+        verbose_name_plural = "Archivos de Clientes"
+        ordering = ['ruta']
+        constraints = [
+            models.UniqueConstraint(fields=['cliente', 'ruta'], name='archivo_cliente_ruta')
+        ]
+        indexes = [
+            models.Index(fields=['cliente', 'nombre'], name='archivo_cliente_nombre'),
+            models.Index(fields=['cliente', 'tipo'], name='archivo_cliente_tipo'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cliente.nombre}: {self.ruta}"
+
+
+class DigestoArchivo(models.Model):
+    """
+    Caché del hash SHA-256 de un archivo.
+    
+    El digesto se reutiliza mientras el tamaño y el mtime del archivo no
+    cambien, para no volver a leer bases de varios GB sin modificaciones.
+    """
+    
+    ruta = models.CharField(
+        max_length=500,
+        unique=True,
+        verbose_name="Ruta"
+    )
+    
+    tamanio = models.BigIntegerField(
+        verbose_name="Tamaño"
+    )
+    
+    mtime_ns = models.BigIntegerField(
+        verbose_name="Modificación (ns)"
+    )
+    
+    sha256 = models.CharField(
+        max_length=64,
+        verbose_name="SHA-256"
+    )
+    
+    calculado = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Calculado"
+    )
+    
+    class Meta:
+        verbose_name = "Digesto de Archivo"
+        verbose_name_plural = "Digestos de Archivos"
+    
+    def __str__(self):
+        return f"{self.ruta} ({self.sha256[:12]})"
+
+
+class EstadoBackup(models.Model):
+    """
+    Resultado de la última verificación del backup de un cliente.
+    """
+    
+    OK = 'OK'
+    DESACTUALIZADO = 'DESACTUALIZADO'
+    FALTANTE = 'FALTANTE'
+    SIN_CONFIGURAR = 'SIN_CONFIGURAR'
+    ERROR = 'ERROR'
+    ESTADOS = [
+        (OK, 'OK'),
+        (DESACTUALIZADO, 'Desactualizado'),
+        (FALTANTE, 'Faltante'),
+        (SIN_CONFIGURAR, 'Sin configurar'),
+        (ERROR, 'Error'),
+    ]
+    
+    cliente = models.OneToOneField(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name='estado_backup',
+        verbose_name="Cliente"
+    )
+    
+    estado = models.CharField(
+        max_length=15,
+        choices=ESTADOS,
+        verbose_name="Estado"
+    )
+    
+    archivo_backup = models.CharField(
+        max_length=500,
+        blank=True,
+        verbose_name="Archivo de Backup",
+        help_text="Backup más reciente encontrado en la ruta de respaldo"
+    )
+    
+    fecha_backup = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fecha del Backup"
+    )
+    
+    fecha_base = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Modificación de la Base"
+    )
+    
+    coincide = models.BooleanField(
+        default=False,
+        verbose_name="Coincide",
+        help_text="El backup es idéntico a la base actual"
+    )
+    
+    detalle = models.TextField(
+        blank=True,
+        verbose_name="Detalle"
+    )
+    
+    verificado = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Verificado"
+    )
+    
+    objects = EstudioClienteManager()
+    
+    todos = models.Manager()
+    
+    class Meta:
+        verbose_name = "Estado de Backup"
+        verbose_name_plural = "Estados de Backup"
+        indexes = [
+            models.Index(fields=['estado'], name='estado_backup_estado'),
+        ]
+    
+    def __str__(self):
+        return f"{self.cliente.nombre}: {self.get_estado_display()}"
@@ -0,0 +1,348 @@
+"""
+Planes de ejecución de las consultas frecuentes de clientes.
+
+Las consultas no se copian: se reproducen las vistas reales (lista de
+clientes, API, estadísticas, inicio y listado del admin) con solicitudes
+armadas a mano y se capturan las SELECT que llegan a la base. Cada una se
+analiza con `EXPLAIN QUERY PLAN` (SQLite) o `EXPLAIN (FORMAT JSON)`
+(PostgreSQL) y se marcan los recorridos completos de una tabla y los
+ordenamientos que no salen de un índice.
+
+Para cada consulta marcada se propone un índice con las columnas que la
+consulta filtra por igualdad, seguidas de las del ORDER BY o, si no ordena,
+de la primera que filtra por rango. Un índice propuesto se puede probar: se
+crea en la base, se vuelven a medir las consultas afectadas y se elimina. En
+PostgreSQL se crea y elimina con CONCURRENTLY para no bloquear las escrituras
+de la tabla mientras tanto.
+"""
+
+import hashlib
+import json
+import re
+import statistics
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+# Comparación de las columnas en el WHERE de las consultas del ORM
+_IGUALDAD = r'"{tabla}"\."(\w+)" (?:= (?!")|IN \()'
+_RANGO = r'"{tabla}"\."(\w+)" (?:>=|<=|>|<|BETWEEN) (?!")'
+_SUBCADENA = r'"{tabla}"\."(\w+)"(?:::text\))? LIKE'
+_ORDEN = r'"{tabla}"\."(\w+)" (ASC|DESC)'
+
+_FIN_WHERE = re.compile(r' (?:GROUP BY|ORDER BY|LIMIT) ')
+
+
+def _usuario():
+    # Superusuario sin guardar: ve todo el admin; los clientes quedan
+    # limitados al estudio en curso, si lo hay
+    return get_user_model()(username='analizar_consultas', is_active=True, is_staff=True, is_superuser=True)
+
+
+def _solicitud(ruta, parametros=None):
+    request = RequestFactory().get(ruta, parametros or {})
+    request.user = _usuario()
+    return request
+
+
+def _lista_clientes(parametros):
+    from .views import lista_clientes
+    return lambda: lista_clientes(_solicitud('/clientes/', parametros))
+
+
+def _api(accion, parametros=None):
+    from .views import ClienteViewSet
+    return lambda: ClienteViewSet.as_view({'get': accion})(_solicitud('/api/clientes/', parametros))
+
+
+def _inicio():
+    from home.views import home_view
+    return lambda: home_view(_solicitud('/'))
+
+
+def _admin_clientes(parametros=None):
+    from .models import Cliente
+
+    def ejecutar():
+        respuesta = admin.site.get_model_admin(Cliente).changelist_view(
+            _solicitud('/admin/clientes/cliente/', parametros)
+        )
+        # El listado se consulta al dibujar la plantilla
+        return respuesta.render()
+    return ejecutar
+
+
+def reproducciones():
+    """
+    Retorna [(nombre, función)] de las solicitudes a reproducir.
+    """
+    hoy = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        ('lista_clientes', _lista_clientes({})),
+        ('lista_clientes búsqueda', _lista_clientes({'search': 'sa', 'activo': 'true'})),
+        ('lista_clientes página 2', _lista_clientes({'page': 2})),
+        ('API lista', _api('list')),
+        ('API lista búsqueda', _api('list', {'search': 'sa', 'activo': 'true'})),
+        ('API estadisticas', _api('estadisticas')),
+        ('home_view', _inicio()),
+        ('admin clientes', _admin_clientes()),
+        ('admin clientes activos', _admin_clientes({'activo__exact': '1'})),
+        ('admin clientes búsqueda', _admin_clientes({'q': 'sa'})),
+        ('admin clientes últimos 7 días', _admin_clientes({
+            'fecha_creacion__gte': str(hoy - timedelta(days=7)),
+            'fecha_creacion__lt': str(hoy + timedelta(days=1)),
+        })),
+        ('admin clientes por fecha de alta', _admin_clientes({'o': '-5'})),
+    ]
+
+
+def tablas_analizadas():
+    """
+    Retorna {tabla: modelo} de las apps con datos de clientes.
+    """
+    tablas = {}
+    for app_label in getattr(settings, 'ESTUDIOS_APPS', ['clientes']):
+        for modelo in apps.get_app_config(app_label).get_models():
+            tablas[modelo._meta.db_table] = modelo
+    return tablas
+
+
+def capturar(funcion, conexion):
+    """
+    Ejecuta la reproducción y retorna las SELECT distintas sobre las tablas
+    analizadas, en orden.
+    """
+    tablas = tablas_analizadas()
+    with CaptureQueriesContext(conexion) as capturadas:
+        funcion()
+    consultas = []
+    for consulta in capturadas.captured_queries:
+        sql = consulta['sql']
+        if sql.lstrip().upper().startswith('SELECT') and sql not in consultas:
+            if any(f'"{tabla}"' in sql for tabla in tablas):
+                consultas.append(sql)
+    return consultas
+
+
+def _nodos_postgresql(nodo):
+    yield nodo
+    for hijo in nodo.get('Plans', []):
+        yield from _nodos_postgresql(hijo)
+
+
+def explicar(conexion, sql):
+    """
+    Retorna (líneas del plan, problemas). Cada problema es (tipo, tabla)
+    con tipo 'recorrido' (toda la tabla) u 'orden' (ordenamiento aparte);
+    la tabla de un ordenamiento en SQLite no se conoce y es None.
+    """
+    lineas = []
+    problemas = []
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            for nodo in _nodos_postgresql(plan[0]['Plan']):
+                tipo = nodo['Node Type']
+                tabla = nodo.get('Relation Name')
+                detalle = ', '.join(nodo.get('Sort Key', [])) or nodo.get('Index Name', '')
+                lineas.append(f'{tipo} {tabla or ""} {detalle}'.strip() + f' (filas: {nodo.get("Plan Rows")})')
+                if tipo == 'Seq Scan':
+                    problemas.append(('recorrido', tabla))
+                elif tipo in ('Sort', 'Incremental Sort'):
+                    problemas.append(('orden', None))
+        elif conexion.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            for fila in cursor.fetchall():
+                detalle = fila[-1]
+                lineas.append(detalle)
+                # Versiones anteriores a 3.36 escriben "SCAN TABLE tabla"
+                partes = [parte for parte in detalle.split() if parte != 'TABLE']
+                if partes[0] == 'SCAN' and 'USING' not in partes and len(partes) > 1:
+                    problemas.append(('recorrido', partes[1]))
+                elif detalle.startswith('USE TEMP B-TREE FOR ORDER BY'):
+                    problemas.append(('orden', None))
+        else:
+            lineas.append(f'EXPLAIN no disponible para {conexion.vendor}')
+    return lineas, problemas
+
+
+def medir(conexion, sql, repeticiones=5):
+    """
+    Retorna la mediana en milisegundos de ejecutar la consulta y leer
+    todas sus filas.
+    """
+    tiempos = []
+    with conexion.cursor() as cursor:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def _tabla_principal(sql, tablas):
+    """
+    Tabla principal de la consulta (la del FROM).
+    """
+    coincidencia = re.search(r' FROM "(\w+)"', sql)
+    if coincidencia and coincidencia.group(1) in tablas:
+        return coincidencia.group(1)
+    return None
+
+
+def _unicas(columnas):
+    vistas = []
+    for columna in columnas:
+        if columna not in vistas:
+            vistas.append(columna)
+    return vistas
+
+
+def columnas_consulta(sql, tabla):
+    """
+    Retorna {igualdad, rango, subcadena, orden} con las columnas de `tabla`
+    que usa la consulta; `orden` es [(columna, descendente)].
+    """
+    desde_where = sql.split(' WHERE ', 1)[1] if ' WHERE ' in sql else ''
+    where = _FIN_WHERE.split(desde_where, 1)[0]
+    orden = sql.rsplit(' ORDER BY ', 1)[1] if ' ORDER BY ' in sql else ''
+    return {
+        'igualdad': _unicas(re.findall(_IGUALDAD.format(tabla=tabla), where)),
+        'rango': _unicas(re.findall(_RANGO.format(tabla=tabla), where)),
+        'subcadena': _unicas(re.findall(_SUBCADENA.format(tabla=tabla), where)),
+        'orden': [(columna, sentido == 'DESC') for columna, sentido in re.findall(_ORDEN.format(tabla=tabla), orden)],
+    }
+
+
+def _nombre_indice(modelo, campos):
+    base = '_'.join([modelo._meta.model_name[:8]] + [campo.lstrip('-')[:8] for campo in campos])
+    resumen = hashlib.sha1(f'{modelo._meta.db_table}:{",".join(campos)}'.encode()).hexdigest()[:4]
+    return f'{base[:21]}_{resumen}_idx'
+
+
+def indices_existentes(conexion, tabla):
+    """
+    Retorna las listas de columnas de los índices de la tabla.
+    """
+    with conexion.cursor() as cursor:
+        restricciones = conexion.introspection.get_constraints(cursor, tabla)
+    return [
+        restriccion['columns'] for restriccion in restricciones.values()
+        if restriccion['index'] or restriccion['unique'] or restriccion['primary_key']
+    ]
+
+
+def proponer(conexion, sql, problemas):
+    """
+    Retorna (modelo, models.Index, motivo) con el índice que evitaría los
+    problemas de la consulta, o (None, None, motivo) si no hay uno útil.
+    """
+    tablas = tablas_analizadas()
+    tabla = next((tabla for tipo, tabla in problemas if tabla in tablas), None)
+    if tabla is None and any(tipo == 'orden' for tipo, _ in problemas):
+        tabla = _tabla_principal(sql, tablas)
+    if tabla is None:
+        return None, None, 'las tablas afectadas no son de clientes'
+
+    modelo = tablas[tabla]
+    por_columna = {campo.column: campo for campo in modelo._meta.concrete_fields}
+    usadas = columnas_consulta(sql, tabla)
+
+    columnas = [(columna, False) for columna in usadas['igualdad']]
+    if usadas['orden']:
+        columnas += [(columna, desc) for columna, desc in usadas['orden'] if columna not in usadas['igualdad']]
+    elif usadas['rango']:
+        columnas.append((usadas['rango'][0], False))
+    columnas = [(columna, desc) for columna, desc in columnas if columna in por_columna]
+
+    if not columnas or columnas == [(modelo._meta.pk.column, False)]:
+        if usadas['subcadena']:
+            return None, None, 'búsqueda por subcadena (LIKE %...%): un índice B-tree no la acelera'
+        return None, None, 'la consulta lee toda la tabla'
+
+    nombres = [columna for columna, _ in columnas]
+    for existente in indices_existentes(conexion, tabla):
+        if existente[:len(nombres)] == nombres:
+            return None, None, f'ya existe un índice sobre ({", ".join(existente)})'
+
+    campos = [('-' if desc else '') + por_columna[columna].name for columna, desc in columnas]
+    partes = []
+    if usadas['igualdad']:
+        partes.append(f'filtra por {", ".join(usadas["igualdad"])}')
+    if usadas['orden']:
+        partes.append(f'ordena por {", ".join(columna for columna, _ in usadas["orden"])}')
+    elif usadas['rango']:
+        partes.append(f'filtra por rango de {usadas["rango"][0]}')
+    if usadas['subcadena']:
+        partes.append('la búsqueda por subcadena sigue recorriendo las filas del índice')
+    motivo = '; '.join(partes)
+    return modelo, models.Index(fields=campos, name=_nombre_indice(modelo, campos)), motivo
+
+
+def probar(conexion, modelo, indice, consultas, repeticiones=5):
+    """
+    Crea el índice, mide las consultas y lo elimina. Retorna
+    [{sql, antes, despues, problemas_antes, problemas_despues}].
+    """
+    resultados = [
+        {'sql': sql, 'antes': medir(conexion, sql, repeticiones), 'problemas_antes': explicar(conexion, sql)[1]}
+        for sql in consultas
+    ]
+    # CONCURRENTLY no puede correr dentro de una transacción
+    concurrente = conexion.vendor == 'postgresql'
+    opciones = {'concurrently': True} if concurrente else {}
+    try:
+        with conexion.schema_editor(atomic=not concurrente) as editor:
+            editor.add_index(modelo, indice, **opciones)
+    except Exception:
+        if concurrente:
+            # Un CREATE INDEX CONCURRENTLY fallido deja el índice inválido
+            with conexion.schema_editor(atomic=False) as editor:
+                editor.remove_index(modelo, indice, **opciones)
+        raise
+    try:
+        with conexion.cursor() as cursor:
+            # Estadísticas para que el planificador considere el índice nuevo
+            cursor.execute(f'ANALYZE {conexion.ops.quote_name(modelo._meta.db_table)}')
+        for resultado in resultados:
+            resultado['despues'] = medir(conexion, resultado['sql'], repeticiones)
+            resultado['problemas_despues'] = explicar(conexion, resultado['sql'])[1]
+    finally:
+        with conexion.schema_editor(atomic=not concurrente) as editor:
+            editor.remove_index(modelo, indice, **opciones)
+    return resultados
+
+
+def escribir_migracion(app_label, indices):
+    """
+    Escribe una migración de `app_label` que agrega los índices [(modelo,
+    models.Index)]. Retorna la ruta del archivo.
+    """
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    hojas = loader.graph.leaf_nodes(app_label)
+    numero = max((int(nombre[:4]) for _, nombre in hojas if nombre[:4].isdigit()), default=0) + 1
+    migracion = migrations.Migration(f'{numero:04d}_indices_consultas', app_label)
+    migracion.dependencies = hojas
+    migracion.operations = [
+        migrations.AddIndex(model_name=modelo._meta.model_name, index=indice)
+        for modelo, indice in indices
+    ]
+    writer = MigrationWriter(migracion)
+    with open(writer.path, 'w') as archivo:
+        archivo.write(writer.as_string())
+    return writer.path
@@ -0,0 +1,250 @@
+"""
+Generación masiva de fichas de clientes en PDF y XLSX.
+
+Cada ficha tiene los datos que muestra el detalle del cliente (las claves de
+acceso solo si se piden con credenciales) y se genera en un pool de
+procesos: el proceso principal lee los clientes de la base y los procesos
+hijos solo arman los documentos, sin conexión propia.
+
+Las fichas generadas se guardan en `REPORTES_DIR/cache/<base>`, con un nombre que
+depende del cliente, de su `fecha_modificacion` y de `VERSION`; un cliente
+que no cambió desde la corrida anterior reutiliza su ficha sin volver a
+generarla. A medida que las fichas están listas se agregan a un único ZIP
+escrito directo a disco, así que ni el ZIP ni el conjunto de las fichas se
+mantienen en memoria.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+from monitoreo.metricas import contar_cache
+
+from . import documentos
+from .models import Cliente
+
+
+DIRECTORIO = getattr(settings, 'REPORTES_DIR', os.path.join(settings.BASE_DIR, 'reportes'))
+
+# Se incrementa al cambiar el contenido o el diseño de las fichas, para no
+# reutilizar las generadas con la versión anterior
+VERSION = 1
+
+FORMATOS = ('pdf', 'xlsx')
+
+# Segundos mínimos entre avisos de progreso
+INTERVALO_PROGRESO = 1
+
+# Secciones de la ficha, como en el detalle del cliente
+SECCIONES = [
+    ('Información Básica', ['nombre', 'cuit', 'domicilio', 'activo']),
+    ('Información Adicional', ['registro_de_empleadores', 'otros_datos']),
+    ('Información Técnica', ['carpeta', 'ptovta', 'nombase', 'ruta_base', 'rutabackup']),
+    ('Auditoría', ['fecha_creacion', 'fecha_modificacion']),
+]
+
+CLAVES = [campo.name for campo in Cliente._meta.concrete_fields if campo.name.startswith('clave_')]
+
+
+def variante(con_credenciales):
+    return 'completo' if con_credenciales else 'sin_credenciales'
+
+
+def ruta_zip(con_credenciales, estudio=None):
+    """
+    Ruta en `DIRECTORIO` del ZIP de una corrida, con el identificador del
+    estudio si se genera para uno (cada base tiene su propio ZIP).
+    """
+    estudio = f'-{estudio.slug}' if estudio else ''
+    return os.path.join(
+        DIRECTORIO, f'fichas-{variante(con_credenciales)}{estudio}-{timezone.localtime():%Y%m%d-%H%M%S}.zip'
+    )
+
+
+def secciones(con_credenciales):
+    if not con_credenciales:
+        return SECCIONES
+    return SECCIONES[:1] + [('Claves de Acceso', CLAVES)] + SECCIONES[1:]
+
+
+def _valor(campo, valor):
+    if valor is None or valor == '':
+        return 'No especificado'
+    if campo == 'activo':
+        return 'Activo' if valor else 'Inactivo'
+    if hasattr(valor, 'strftime'):
+        return timezone.localtime(valor).strftime('%d/%m/%Y %H:%M:%S')
+    return str(valor)
+
+
+def contenido(fila, con_credenciales):
+    """
+    Retorna las secciones de la ficha como [(título, [(etiqueta, valor)])].
+    """
+    return [
+        (titulo, [
+            (str(Cliente._meta.get_field(campo).verbose_name), _valor(campo, fila[campo]))
+            for campo in campos
+        ])
+        for titulo, campos in secciones(con_credenciales)
+    ]
+
+
+def renderizar(fila, formato, con_credenciales):
+    """
+    Retorna los bytes de la ficha del cliente en el formato indicado.
+    """
+    partes = contenido(fila, con_credenciales)
+    if formato == 'pdf':
+        bloques = [
+            ('titulo', fila['nombre']),
+            ('subtitulo', f'CUIT: {fila["cuit"]}'),
+        ]
+        for titulo, campos in partes:
+            bloques.append(('seccion', titulo))
+            bloques.extend(('campo', etiqueta, valor) for etiqueta, valor in campos)
+        return documentos.pdf(bloques, titulo=fila['nombre'])
+
+    filas = [('Cliente', fila['nombre']), ('CUIT', fila['cuit'])]
+    for titulo, campos in partes:
+        filas.append(('', ''))
+        filas.append((titulo, ''))
+        filas.extend(campos)
+    return documentos.xlsx(filas, hoja=fila['cuit'])
+
+
+def _generar(fila, formato, con_credenciales, ruta):
+    """
+    Genera la ficha en `ruta` (en un proceso del pool). Retorna la ruta.
+    """
+    carpeta = os.path.dirname(ruta)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(renderizar(fila, formato, con_credenciales))
+        if con_credenciales:
+            os.chmod(temporal, 0o600)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return ruta
+
+
+def _nombre_cache(fila, formato, con_credenciales):
+    clave = f'{VERSION}:{formato}:{con_credenciales}:{fila["pk"]}:{fila["fecha_modificacion"].isoformat()}'
+    return f'{fila["pk"]}-{hashlib.sha256(clave.encode()).hexdigest()[:16]}.{formato}'
+
+
+def _nombre_zip(fila, formato):
+    return f'{fila["cuit"]}_{slugify(fila["nombre"])[:60]}.{formato}'
+
+
+def generar_reportes(clientes, salida, formatos=FORMATOS, con_credenciales=False, procesos=4, informar=None):
+    """
+    Genera las fichas de los clientes y las escribe en el ZIP `salida`.
+
+    `informar(progreso)` se llama como máximo cada `INTERVALO_PROGRESO`
+    segundos y al terminar, con {total, listos, reutilizados, generados}.
+    Retorna el mismo diccionario con la ruta y el tamaño del ZIP.
+    """
+    campos = {campo for _, lista in secciones(con_credenciales) for campo in lista}
+    filas = list(clientes.order_by('pk').values('pk', *sorted(campos)))
+
+    carpetas = {}
+    for formato in formatos:
+        # Los ids se repiten entre las bases de los estudios
+        carpetas[formato] = os.path.join(DIRECTORIO, 'cache', clientes.db, variante(con_credenciales), formato)
+        os.makedirs(carpetas[formato], exist_ok=True)
+
+    trabajos = []
+    for fila in filas:
+        for formato in formatos:
+            ruta = os.path.join(carpetas[formato], _nombre_cache(fila, formato, con_credenciales))
+            trabajos.append((fila, formato, ruta))
+
+    progreso = {'total': len(trabajos), 'listos': 0, 'reutilizados': 0, 'generados': 0}
+    ultimo_aviso = 0.0
+
+    def avisar(final=False):
+        nonlocal ultimo_aviso
+        if informar and (final or time.monotonic() - ultimo_aviso >= INTERVALO_PROGRESO):
+            ultimo_aviso = time.monotonic()
+            informar(dict(progreso))
+
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    temporal = f'{salida}.tmp'
+    try:
+        with zipfile.ZipFile(temporal, 'w', zipfile.ZIP_DEFLATED) as archivo_zip:
+
+            def agregar(fila, formato, ruta):
+                # El XLSX ya es un ZIP comprimido
+                compresion = zipfile.ZIP_STORED if formato == 'xlsx' else zipfile.ZIP_DEFLATED
+                archivo_zip.write(ruta, _nombre_zip(fila, formato), compress_type=compresion)
+                progreso['listos'] += 1
+                avisar()
+
+            pendientes = []
+            for fila, formato, ruta in trabajos:
+                if os.path.isfile(ruta):
+                    progreso['reutilizados'] += 1
+                    agregar(fila, formato, ruta)
+                else:
+                    pendientes.append((fila, formato, ruta))
+            contar_cache('reportes_clientes', True, progreso['reutilizados'])
+            contar_cache('reportes_clientes', False, len(pendientes))
+
+            if pendientes:
+                # Los procesos hijos no deben heredar conexiones abiertas a la base
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+                    # Una ventana acotada de trabajos en vuelo, para no encolar
+                    # todas las filas de una vez
+                    restantes = iter(pendientes)
+                    en_curso = {}
+                    while True:
+                        while len(en_curso) < procesos * 4:
+                            trabajo = next(restantes, None)
+                            if trabajo is None:
+                                break
+                            fila, formato, ruta = trabajo
+                            en_curso[ejecutor.submit(_generar, fila, formato, con_credenciales, ruta)] = trabajo
+                        if not en_curso:
+                            break
+                        listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                        for futuro in listos:
+                            fila, formato, ruta = en_curso.pop(futuro)
+                            futuro.result()
+                            progreso['generados'] += 1
+                            agregar(fila, formato, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+    if con_credenciales:
+        os.chmod(temporal, 0o600)
+    os.replace(temporal, salida)
+    _descartar_viejos(carpetas, {os.path.basename(ruta) for _, _, ruta in trabajos}, filas)
+    avisar(final=True)
+    return {**progreso, 'salida': str(salida), 'tamanio': os.path.getsize(salida)}
+
+
+def _descartar_viejos(carpetas, vigentes, filas):
+    """
+    Borra las fichas anteriores de los clientes incluidos en la corrida.
+    """
+    clientes = {str(fila['pk']) for fila in filas}
+    for carpeta in carpetas.values():
+        for entrada in os.scandir(carpeta):
+            if entrada.name not in vigentes and entrada.name.split('-', 1)[0] in clientes:
+                os.remove(entrada.path)
@@ -1,5 +1,22 @@
 from rest_framework import serializers
-from .models import Cliente
+
+from estudios.contexto import estudio_para_alta
+
+from .cuit import es_valido
+from .models import Cliente, ClienteArchivado, ArchivoCliente
+
+
+def cuit_en_uso(cuit, instance=None):
+    """
+    Indica si otro cliente del mismo estudio, activo o archivado, ya tiene el
+    CUIT; un cliente nuevo va al estudio en curso.
+    """
+    estudio_id = instance.estudio_id if instance is not None else estudio_para_alta().pk
+    pk = instance.pk if instance is not None else None
+    return any(
+        modelo.todos.filter(estudio_id=estudio_id, cuit=cuit).exclude(pk=pk).exists()
+        for modelo in (Cliente, ClienteArchivado)
+    )
 
 
 class ClienteSerializer(serializers.ModelSerializer):
@@ -13,7 +30,7 @@ class ClienteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_modificacion']
+        read_only_fields = ['estudio', 'fecha_creacion', 'fecha_modificacion']
     
     def validate_cuit(self, value):
         """
@@ -26,6 +43,12 @@ class ClienteSerializer(serializers.ModelSerializer):
         if len(value) != 13 or value.count('-') != 2:
             raise serializers.ValidationError("El CUIT debe tener el formato XX-XXXXXXXX-X")
         
+        if not es_valido(value):
+            raise serializers.ValidationError("El dígito verificador del CUIT no es válido.")
+        
+        if cuit_en_uso(value, self.instance):
+            raise serializers.ValidationError("Ya existe un cliente con este CUIT.")
+        
         return value
 
 
@@ -63,6 +86,14 @@ class ClienteCreateSerializer(serializers.ModelSerializer):
             'activo'
         ]
     
+    def validate_cuit(self, value):
+        """
+        El CUIT no puede repetirse dentro del estudio del cliente nuevo.
+        """
+        if cuit_en_uso(value):
+            raise serializers.ValidationError("Ya existe un cliente con este CUIT.")
+        return value
+    
     def validate_nombre(self, value):
         """
         Validación para el nombre del cliente.
@@ -80,14 +111,32 @@ class ClienteUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_modificacion']
+        read_only_fields = ['estudio', 'fecha_creacion', 'fecha_modificacion']
     
     def validate_cuit(self, value):
         """
         Validación del CUIT en actualizaciones.
         """
+        if value and not es_valido(value):
+            raise serializers.ValidationError("El dígito verificador del CUIT no es válido.")
         if value and self.instance and value != self.instance.cuit:
             # Verificar que el nuevo CUIT no esté en uso
-            if Cliente.objects.filter(cuit=value).exclude(pk=self.instance.pk).exists():
+            if cuit_en_uso(value, self.instance):
                 raise serializers.ValidationError("Ya existe un cliente con este CUIT.")
         return value
+
+
+class ArchivoClienteSerializer(serializers.ModelSerializer):
+    """
+    Serializer para los archivos indexados de la carpeta de un cliente.
+    """
+    
+    class Meta:
+        model = ArchivoCliente
+        fields = [
+            'ruta',
+            'nombre',
+            'tipo',
+            'tamanio',
+            'modificado'
+        ]
@@ -0,0 +1,272 @@
+"""
+Snapshots SQLite de solo lectura de los clientes para las herramientas de
+escritorio.
+
+Cada snapshot es una base SQLite compacta con la tabla `clientes` (las
+mismas columnas del modelo, sin las claves si se piden sin credenciales),
+índices por CUIT (y estudio) y nombre, y una tabla `metadatos`. Se arma recorriendo los
+clientes en lotes con un iterador del servidor, sin cargarlos todos en
+memoria.
+
+La versión es un hash del contenido: si los datos no cambiaron, la versión
+y por lo tanto el ETag son los mismos. Se conservan las últimas
+`SNAPSHOTS_CONSERVAR` versiones de cada variante para poder calcular parches
+entre una versión vieja y la vigente (filas nuevas o modificadas e ids
+eliminados), así las herramientas solo descargan lo que cambió.
+
+Cada estudio tiene sus propios snapshots, con los clientes que ve el usuario
+que los pide.
+"""
+
+import datetime
+import decimal
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from estudios.contexto import SIN_ESTUDIO, estudio_actual
+
+from .models import Cliente
+
+
+DIRECTORIO = getattr(settings, 'SNAPSHOTS_DIR', os.path.join(settings.BASE_DIR, 'snapshots'))
+
+CONSERVAR = getattr(settings, 'SNAPSHOTS_CONSERVAR', 10)
+
+TAMANIO_LOTE = 2000
+
+# Se incrementa si cambia el formato de la base generada
+ESQUEMA = 2
+
+TIPOS_SQLITE = {
+    'AutoField': 'INTEGER',
+    'BigAutoField': 'INTEGER',
+    'IntegerField': 'INTEGER',
+    'BigIntegerField': 'INTEGER',
+    'PositiveIntegerField': 'INTEGER',
+    'BooleanField': 'INTEGER',
+    'FloatField': 'REAL',
+}
+
+PATRON_VERSION = re.compile(r'[0-9a-f]{16}')
+
+
+def campos(con_credenciales):
+    """
+    Campos del modelo incluidos en el snapshot; las claves (`clave_*`) solo
+    con credenciales.
+    """
+    return [
+        campo for campo in Cliente._meta.concrete_fields
+        if con_credenciales or not campo.name.startswith('clave_')
+    ]
+
+
+def variante(con_credenciales):
+    return 'completo' if con_credenciales else 'sin_credenciales'
+
+
+def carpeta_snapshots(con_credenciales):
+    """
+    Carpeta de los snapshots del estudio en curso (`todos` sin estudio).
+    """
+    estudio = estudio_actual()
+    if estudio is SIN_ESTUDIO:
+        ambito = 'ninguno'
+    elif estudio is None:
+        ambito = 'todos'
+    else:
+        ambito = f'estudio-{estudio.pk}'
+    return os.path.join(DIRECTORIO, ambito, variante(con_credenciales))
+
+
+def ruta_snapshot(version, con_credenciales):
+    return os.path.join(carpeta_snapshots(con_credenciales), f'{version}.sqlite3')
+
+
+def _valor(valor):
+    if isinstance(valor, bool):
+        return int(valor)
+    if isinstance(valor, (datetime.date, datetime.datetime)):
+        return valor.isoformat()
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+    return valor
+
+
+def _clave_datos():
+    """
+    Resumen barato de la tabla: cambia con cualquier alta, baja o
+    modificación hecha a través del modelo.
+    """
+    datos = Cliente.objects.aggregate(cantidad=Count('pk'), maximo=Max('pk'), ultima=Max('fecha_modificacion'))
+    ultima = datos['ultima'].isoformat() if datos['ultima'] else ''
+    return f'{datos["cantidad"]}:{datos["maximo"]}:{ultima}'
+
+
+def snapshot_actual(con_credenciales=False):
+    """
+    Retorna los datos del último snapshot generado, o None.
+    """
+    try:
+        with open(os.path.join(carpeta_snapshots(con_credenciales), 'actual.json')) as archivo:
+            actual = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+    if not os.path.isfile(ruta_snapshot(actual['version'], con_credenciales)):
+        return None
+    return actual
+
+
+def generar_snapshot(con_credenciales=False, forzar=False):
+    """
+    Genera un snapshot si los clientes cambiaron desde el último.
+    Retorna {version, clave, filas, tamanio, generado} del snapshot vigente.
+    """
+    clave = _clave_datos()
+    actual = snapshot_actual(con_credenciales)
+    if actual and actual['clave'] == clave and not forzar:
+        return actual
+
+    carpeta = carpeta_snapshots(con_credenciales)
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    os.close(descriptor)
+    try:
+        version, filas = _escribir(temporal, campos(con_credenciales), con_credenciales)
+        ruta = ruta_snapshot(version, con_credenciales)
+        os.chmod(temporal, 0o444)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+    actual = {
+        'version': version,
+        'clave': clave,
+        'filas': filas,
+        'tamanio': os.path.getsize(ruta),
+        'generado': timezone.now().isoformat(),
+    }
+    temporal = os.path.join(carpeta, 'actual.json.tmp')
+    with open(temporal, 'w') as archivo:
+        json.dump(actual, archivo)
+    os.replace(temporal, os.path.join(carpeta, 'actual.json'))
+    _descartar_viejos(carpeta, version)
+    return actual
+
+
+def _escribir(ruta, campos_snapshot, con_credenciales):
+    columnas = [campo.column for campo in campos_snapshot]
+    definiciones = []
+    for campo in campos_snapshot:
+        # Las claves foráneas llevan el tipo de la clave a la que apuntan
+        interno = (campo.target_field if campo.is_relation else campo).get_internal_type()
+        tipo = TIPOS_SQLITE.get(interno, 'TEXT')
+        definiciones.append(f'{campo.column} INTEGER PRIMARY KEY' if campo.primary_key else f'{campo.column} {tipo}')
+
+    digesto = hashlib.sha256(f'{ESQUEMA}:{",".join(columnas)}'.encode())
+    conexion = sqlite3.connect(ruta)
+    try:
+        # Base descartable hasta el os.replace: sin diario ni fsync
+        conexion.execute('PRAGMA journal_mode = OFF')
+        conexion.execute('PRAGMA synchronous = OFF')
+        conexion.execute(f'CREATE TABLE clientes ({", ".join(definiciones)})')
+        conexion.execute('CREATE TABLE metadatos (clave TEXT PRIMARY KEY, valor TEXT) WITHOUT ROWID')
+
+        insertar = f'INSERT INTO clientes ({", ".join(columnas)}) VALUES ({", ".join("?" * len(columnas))})'
+        filas = Cliente.objects.order_by('pk').values_list(
+            *[campo.attname for campo in campos_snapshot]
+        ).iterator(chunk_size=TAMANIO_LOTE)
+        lote = []
+        cantidad = 0
+        for fila in filas:
+            fila = tuple(_valor(valor) for valor in fila)
+            digesto.update(repr(fila).encode())
+            lote.append(fila)
+            if len(lote) >= TAMANIO_LOTE:
+                conexion.executemany(insertar, lote)
+                cantidad += len(lote)
+                lote = []
+        conexion.executemany(insertar, lote)
+        cantidad += len(lote)
+
+        # Los índices se crean al final: más rápido que mantenerlos al insertar
+        # El CUIT es único por estudio, y sin estudio hay clientes de todos
+        conexion.execute('CREATE UNIQUE INDEX clientes_cuit ON clientes (cuit, estudio_id)')
+        conexion.execute('CREATE INDEX clientes_nombre ON clientes (nombre COLLATE NOCASE)')
+
+        version = digesto.hexdigest()[:16]
+        conexion.executemany('INSERT INTO metadatos VALUES (?, ?)', [
+            ('version', version),
+            ('esquema', str(ESQUEMA)),
+            ('credenciales', '1' if con_credenciales else '0'),
+            ('generado', timezone.now().isoformat()),
+        ])
+        conexion.commit()
+        conexion.execute('VACUUM')
+    finally:
+        conexion.close()
+    return version, cantidad
+
+
+def _descartar_viejos(carpeta, vigente):
+    snapshots = [
+        entrada for entrada in os.scandir(carpeta)
+        if entrada.name.endswith('.sqlite3') and entrada.name != f'{vigente}.sqlite3'
+    ]
+    snapshots.sort(key=lambda entrada: entrada.stat().st_mtime, reverse=True)
+    for entrada in snapshots[CONSERVAR - 1:]:
+        os.remove(entrada.path)
+
+
+def _columnas(conexion, base):
+    return [fila[1] for fila in conexion.execute(f'PRAGMA {base}.table_info(clientes)')]
+
+
+def parche(desde, con_credenciales=False):
+    """
+    Retorna el parche para pasar de la versión `desde` a la vigente:
+    {desde, hasta, columnas, actualizados, eliminados}. `actualizados` son
+    las filas nuevas o modificadas y `eliminados` los ids que ya no están.
+    Retorna None si la versión `desde` ya no se conserva o tiene otras
+    columnas; en ese caso hay que descargar el snapshot completo.
+    """
+    actual = generar_snapshot(con_credenciales)
+    if not PATRON_VERSION.fullmatch(desde or ''):
+        return None
+    viejo = ruta_snapshot(desde, con_credenciales)
+    if not os.path.isfile(viejo):
+        return None
+
+    nuevo = ruta_snapshot(actual['version'], con_credenciales)
+    conexion = sqlite3.connect(f'file:{nuevo}?mode=ro', uri=True)
+    try:
+        conexion.execute('ATTACH DATABASE ? AS viejo', (f'file:{viejo}?mode=ro',))
+        columnas = _columnas(conexion, 'main')
+        if columnas != _columnas(conexion, 'viejo'):
+            return None
+        actualizados = conexion.execute(
+            'SELECT * FROM main.clientes EXCEPT SELECT * FROM viejo.clientes ORDER BY 1'
+        ).fetchall()
+        eliminados = [fila[0] for fila in conexion.execute(
+            'SELECT id FROM viejo.clientes EXCEPT SELECT id FROM main.clientes ORDER BY 1'
+        )]
+    finally:
+        conexion.close()
+
+    return {
+        'desde': desde,
+        'hasta': actual['version'],
+        'columnas': columnas,
+        'actualizados': [list(fila) for fila in actualizados],
+        'eliminados': eliminados,
+    }
@@ -0,0 +1,53 @@
+import time
+
+from estudios.contexto import alcances, usar_estudio
+from procesos.cola import informar_progreso, tarea
+
+from .duplicados import UMBRAL, duplicados_clientes
+from .models import Cliente
+from .reportes import FORMATOS, generar_reportes, ruta_zip
+
+
+# Cantidad de pares que se guardan en el resultado del reporte de duplicados
+LIMITE_DUPLICADOS = 200
+
+
+@tarea('clientes.generar_reportes')
+def generar_fichas(formatos=FORMATOS, con_credenciales=False, clientes=None, inactivos=False, procesos=4):
+    """
+    Genera las fichas de los clientes en un ZIP de REPORTES_DIR, informando
+    el progreso. Sin estudio en curso genera además un ZIP por cada estudio
+    con base propia y retorna la lista de resultados.
+    """
+    resultados = []
+    for estudio in alcances():
+        with usar_estudio(estudio):
+            consulta = Cliente.objects.all() if inactivos else Cliente.objects.filter(activo=True)
+            if clientes:
+                consulta = Cliente.objects.filter(pk__in=clientes)
+            resultados.append(generar_reportes(
+                consulta,
+                ruta_zip(con_credenciales, estudio),
+                formatos=tuple(formatos),
+                con_credenciales=con_credenciales,
+                procesos=procesos,
+                informar=informar_progreso,
+            ))
+    return resultados[0] if len(resultados) == 1 else resultados
+
+
+@tarea('clientes.detectar_duplicados')
+def detectar_duplicados(umbral=UMBRAL, solo_activos=False):
+    """
+    Busca los posibles clientes duplicados del estudio en curso y guarda los
+    primeros pares en el resultado, que es lo que muestra el admin.
+    """
+    clientes = Cliente.objects.filter(activo=True) if solo_activos else Cliente.objects.all()
+    inicio = time.perf_counter()
+    pares = duplicados_clientes(clientes, umbral=umbral)
+    return {
+        'umbral': umbral,
+        'total': len(pares),
+        'segundos': round(time.perf_counter() - inicio, 1),
+        'pares': pares[:LIMITE_DUPLICADOS],
+    }
@@ -1,3 +1,155 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.db import DatabaseError
 from django.test import TestCase
 
-# Create your tests here.
+from estudios.contexto import usar_estudio
+from estudios.models import Estudio
+
+from . import auditoria, snapshots
+from .models import CambioCliente, Cliente
+from .views import filtrar_clientes
+
+
+class SnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.estudio_a = Estudio.objects.create(nombre='Estudio A', slug='estudio-a')
+        cls.estudio_b = Estudio.objects.create(nombre='Estudio B', slug='estudio-b')
+        # El mismo CUIT en dos estudios
+        Cliente.objects.create(estudio=cls.estudio_a, nombre='Cliente A', cuit='20-11111111-2')
+        Cliente.objects.create(estudio=cls.estudio_b, nombre='Cliente B', cuit='20-11111111-2')
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        parche = mock.patch.object(snapshots, 'DIRECTORIO', directorio)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _cuits(self, actual):
+        conexion = sqlite3.connect(snapshots.ruta_snapshot(actual['version'], False))
+        try:
+            return conexion.execute('SELECT cuit, estudio_id FROM clientes ORDER BY estudio_id').fetchall()
+        finally:
+            conexion.close()
+
+    def test_sin_estudio_con_cuit_repetido(self):
+        with usar_estudio(None):
+            actual = snapshots.generar_snapshot(forzar=True)
+            self.assertEqual(actual['filas'], 2)
+            self.assertEqual(self._cuits(actual), [
+                ('20-11111111-2', self.estudio_a.pk), ('20-11111111-2', self.estudio_b.pk),
+            ])
+
+    def test_por_estudio(self):
+        with usar_estudio(self.estudio_a):
+            actual = snapshots.generar_snapshot(forzar=True)
+            self.assertEqual(self._cuits(actual), [('20-11111111-2', self.estudio_a.pk)])
+
+
+class AuditorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Cliente', cuit='20-11111111-2')
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        # Un intervalo largo deja el volcado periódico fuera de la prueba
+        self.auditor = auditoria.Auditor(directorio=self.directorio, intervalo=3600, max_pendientes=3)
+        parche = mock.patch.object(auditoria, 'auditor', self.auditor)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _modificar(self, *nombres):
+        for nombre in nombres:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.cliente.nombre = nombre
+                self.cliente.save()
+
+    def _archivos(self):
+        return sorted(os.listdir(self.directorio))
+
+    def test_registra_los_campos_modificados(self):
+        self._modificar('Nuevo')
+
+        fila, = self.auditor.pendientes(self.cliente.pk)
+        self.assertEqual(fila['accion'], CambioCliente.MODIFICACION)
+        self.assertEqual(fila['cambios'], {'nombre': ['Cliente', 'Nuevo']})
+        self.assertEqual(CambioCliente.todos.count(), 0)
+
+    def test_cola_llena_se_vuelca_al_agregar(self):
+        self._modificar('Uno', 'Dos')
+        self.assertEqual(CambioCliente.todos.count(), 0)
+
+        # El tercero llena la cola: quien lo agrega inserta el lote
+        self._modificar('Tres')
+
+        self.assertEqual(CambioCliente.todos.count(), 3)
+        self.assertEqual(self.auditor.pendientes(self.cliente.pk), [])
+
+    def test_base_caida_guarda_en_disco_y_recupera(self):
+        self._modificar('Uno', 'Dos')
+        with mock.patch.object(self.auditor, '_insertar', side_effect=DatabaseError('sin conexión')):
+            self.auditor.volcar()
+            self.assertEqual(len(self._archivos()), 1)
+            self.assertEqual(self.auditor.pendientes(self.cliente.pk), [])
+
+            # Con la base todavía caída el archivo queda para más adelante
+            self.assertEqual(self.auditor.recuperar(), 0)
+            self.assertEqual(len(self._archivos()), 1)
+
+        self.assertEqual(self.auditor.recuperar(), 2)
+
+        self.assertEqual(self._archivos(), [])
+        self.assertEqual(
+            list(CambioCliente.todos.values_list('cambios', flat=True)),
+            [{'nombre': ['Uno', 'Dos']}, {'nombre': ['Cliente', 'Uno']}],
+        )
+
+    def test_cerrar_con_un_lote_en_curso_guarda_en_disco(self):
+        self._modificar('Uno')
+
+        with self.auditor._escritura:
+            self.auditor.cerrar(espera=0.1)
+
+        self.assertEqual(len(self._archivos()), 1)
+        self.assertEqual(CambioCliente.todos.count(), 0)
+        self.assertEqual(self.auditor.recuperar(), 1)
+
+    def test_historial_incluye_los_pendientes(self):
+        self._modificar('Uno', 'Dos')
+
+        cambios = auditoria.historial(self.cliente.pk, CambioCliente.todos.all())
+
+        self.assertEqual([cambio.cambios['nombre'][1] for cambio in cambios], ['Dos', 'Uno'])
+
+
+class FiltrarClientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Cliente.objects.create(nombre='Por CUIT', cuit='20-11111111-2')
+        Cliente.objects.create(nombre='Por Domicilio', cuit='27-33333333-4', domicilio='Av. Mitre 2011')
+        Cliente.objects.create(nombre='Otro', cuit='30-22222222-5', domicilio='Belgrano 100')
+
+    def _nombres(self, busqueda, prefijo_cuit=True):
+        clientes = filtrar_clientes(Cliente.objects.all(), busqueda, '', prefijo_cuit=prefijo_cuit)
+        return list(clientes.values_list('nombre', flat=True))
+
+    def test_digitos_buscan_prefijo_de_cuit_y_el_resto_de_los_campos(self):
+        self.assertEqual(self._nombres('2011'), ['Por CUIT', 'Por Domicilio'])
+        self.assertEqual(self._nombres('20-111'), ['Por CUIT'])
+
+    def test_sin_prefijo_de_cuit(self):
+        self.assertEqual(self._nombres('2011', prefijo_cuit=False), ['Por Domicilio'])
+
+    def test_texto(self):
+        self.assertEqual(self._nombres('belgrano'), ['Otro'])
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
@@ -14,8 +15,19 @@ urlpatterns = [
     
     # URLs de las vistas web tradicionales
     path('clientes/', views.lista_clientes, name='lista'),
+    path('clientes/buscar/', views.buscar_clientes, name='buscar'),
     path('clientes/<int:pk>/', views.detalle_cliente, name='detalle'),
     path('clientes/crear/', views.crear_cliente, name='crear'),
     path('clientes/<int:pk>/editar/', views.editar_cliente, name='editar'),
     path('clientes/<int:pk>/eliminar/', views.eliminar_cliente, name='eliminar'),
 ]
+
+# Bajo ASGI las lecturas más frecuentes usan las vistas asíncronas, con los
+# mismos nombres para que reverse() y las métricas no cambien
+if settings.VISTAS_ASYNC:
+    urlpatterns = [
+        path('api/clientes/buscar_por_cuit/', views.buscar_por_cuit_async, name='cliente-buscar-por-cuit'),
+        path('api/clientes/estadisticas/', views.estadisticas_async, name='cliente-estadisticas'),
+        path('clientes/', views.lista_clientes_async, name='lista'),
+        path('clientes/<int:pk>/', views.detalle_cliente_async, name='detalle'),
+    ] + urlpatterns
@@ -1,17 +1,33 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from .models import Cliente
+from home.renderers import JSONRendererRapido
+from monitoreo.metricas import registrar_error
+
+from .models import Cliente, ClienteArchivado
+from .archivo import acoincidencias, aobtener_cliente, coincidencias, obtener_cliente, restaurar
+from .auditoria import historial
+from .autocompletado import obtener_indice
+from .cuit import validar_lote
+from .snapshots import generar_snapshot, parche, ruta_snapshot
 from .serializers import (
+    ArchivoClienteSerializer,
     ClienteSerializer, 
     ClienteListSerializer, 
     ClienteCreateSerializer,
@@ -21,27 +37,89 @@ from .serializers import (
 
 # ====== VISTAS WEB (TRADICIONALES) ======
 
-def lista_clientes(request):
+# Cantidad máxima de filas que devuelve la búsqueda incremental
+LIMITE_BUSQUEDA = 20
+
+# Cantidad máxima de archivos que muestra la búsqueda en la carpeta del cliente
+LIMITE_ARCHIVOS = 100
+
+# Cantidad de cambios que muestra el historial en el detalle del cliente
+LIMITE_HISTORIAL = 50
+
+# Columnas necesarias para dibujar una fila de la tabla de clientes
+CAMPOS_FILA = ['id', 'nombre', 'cuit', 'domicilio', 'activo', 'fecha_creacion']
+
+# Respuesta de la búsqueda por CUIT sin estudio elegido cuando varios
+# estudios tienen un cliente con ese CUIT
+CUIT_EN_VARIOS_ESTUDIOS = 'El CUIT corresponde a clientes de varios estudios: elegir un estudio (o enviar X-Estudio)'
+
+
+# Conteos de las estadísticas, resueltos en una sola consulta agregada
+TOTALES_ESTADISTICAS = {
+    'total': Count('pk'),
+    'activos': Count('pk', filter=Q(activo=True)),
+    'con_clave_fiscal': Count('pk', filter=~Q(clave_fiscal__isnull=True) & ~Q(clave_fiscal='')),
+}
+
+
+def formatear_prefijo_cuit(digitos):
     """
-    Vista web para mostrar la lista de clientes.
+    Convierte un prefijo de dígitos al formato XX-XXXXXXXX-X del CUIT.
+    Lanza ValueError si tiene más dígitos que un CUIT.
     """
-    search_query = request.GET.get('search', '')
-    activo_filter = request.GET.get('activo', '')
+    if len(digitos) > 11:
+        raise ValueError(f'Un CUIT tiene 11 dígitos y el prefijo tiene {len(digitos)}')
+    partes = [digitos[:2], digitos[2:10], digitos[10:11]]
+    return '-'.join(parte for parte in partes if parte) + ('-' if len(digitos) in (2, 10) else '')
+
+
+def buscar_archivos(cliente, texto):
+    """
+    Busca en el índice de la carpeta del cliente los archivos cuyo nombre
+    contiene el texto, o del tipo indicado si el texto empieza con punto.
+    """
+    archivos = cliente.archivos.only('ruta', 'nombre', 'tipo', 'tamanio', 'modificado')
+    if texto.startswith('.'):
+        return archivos.filter(tipo=texto[1:].lower())
+    return archivos.filter(nombre__icontains=texto)
+
+
+def filtrar_clientes(clientes, search_query, activo_filter, prefijo_cuit=False):
+    """
+    Aplica los filtros de búsqueda y estado usados por la lista de clientes.
     
-    clientes = Cliente.objects.all()
+    Con `prefijo_cuit`, una búsqueda de hasta 11 dígitos (con o sin guiones)
+    también encuentra los CUIT que empiezan con esos dígitos aunque se hayan
+    escrito sin guiones, además de las coincidencias en el nombre, el CUIT
+    o el domicilio (por ejemplo la altura de una calle).
+    """
+    search_query = search_query.strip()
     
-    # Aplicar filtros
     if search_query:
-        clientes = clientes.filter(
+        busqueda = (
             Q(nombre__icontains=search_query) |
             Q(cuit__icontains=search_query) |
             Q(domicilio__icontains=search_query)
         )
+        digitos = search_query.replace('-', '')
+        if prefijo_cuit and digitos.isdigit() and len(digitos) <= 11:
+            busqueda |= Q(cuit__startswith=formatear_prefijo_cuit(digitos))
+        clientes = clientes.filter(busqueda)
     
     if activo_filter:
         clientes = clientes.filter(activo=activo_filter == 'true')
     
-    clientes = clientes.order_by('nombre')
+    return clientes.order_by('nombre')
+
+
+def lista_clientes(request):
+    """
+    Vista web para mostrar la lista de clientes.
+    """
+    search_query = request.GET.get('search', '')
+    activo_filter = request.GET.get('activo', '')
+    
+    clientes = filtrar_clientes(Cliente.objects.all(), search_query, activo_filter)
     
     # Paginación
     paginator = Paginator(clientes, 10)
@@ -57,14 +135,47 @@ def lista_clientes(request):
     return render(request, 'clientes/lista.html', context)
 
 
+def buscar_clientes(request):
+    """
+    Vista parcial para la búsqueda mientras se escribe.
+    
+    Devuelve solo las filas de la tabla (sin layout ni paginación) y evita
+    el COUNT del paginador trayendo una fila extra para saber si hay más.
+    Las búsquedas numéricas también se buscan como prefijo de CUIT.
+    """
+    search_query = request.GET.get('search', '')
+    activo_filter = request.GET.get('activo', '')
+    
+    clientes = filtrar_clientes(
+        Cliente.objects.only(*CAMPOS_FILA), search_query, activo_filter, prefijo_cuit=True
+    )
+    clientes = list(clientes[:LIMITE_BUSQUEDA + 1])
+    
+    context = {
+        'clientes': clientes[:LIMITE_BUSQUEDA],
+        'hay_mas': len(clientes) > LIMITE_BUSQUEDA,
+        'search_query': search_query,
+    }
+    
+    return render(request, 'clientes/_filas.html', context)
+
+
 def detalle_cliente(request, pk):
     """
-    Vista web para mostrar el detalle de un cliente.
+    Vista web para mostrar el detalle de un cliente, también si está
+    archivado.
     """
-    cliente = get_object_or_404(Cliente, pk=pk)
+    try:
+        cliente = obtener_cliente(pk=pk)
+    except Cliente.DoesNotExist:
+        raise Http404('Cliente no encontrado')
+    busqueda_archivos = request.GET.get('archivos', '').strip()
     
     context = {
         'cliente': cliente,
+        'busqueda_archivos': busqueda_archivos,
+        'archivos': buscar_archivos(cliente, busqueda_archivos)[:LIMITE_ARCHIVOS] if busqueda_archivos else None,
+        'cambios': historial(cliente.pk, cliente.cambios.all()[:LIMITE_HISTORIAL], cliente._state.db)[:LIMITE_HISTORIAL],
     }
     
     return render(request, 'clientes/detalle.html', context)
@@ -98,6 +209,7 @@ def crear_cliente(request):
             return redirect('clientes:lista')
             
         except Exception as e:
+            registrar_error(request, e)
             messages.error(request, f'Error al crear cliente: {str(e)}')
     
     return render(request, 'clientes/crear.html')
@@ -133,6 +245,7 @@ def eliminar_cliente(request, pk):
             'message': f'Cliente {cliente.nombre} eliminado correctamente.'
         })
     except Exception as e:
+        registrar_error(request, e)
         return JsonResponse({
             'success': False,
             'message': f'Error al eliminar cliente: {str(e)}'
@@ -195,8 +308,17 @@ class ClienteViewSet(viewsets.ModelViewSet):
     def toggle_activo(self, request, pk=None):
         """
         Acción personalizada para cambiar el estado activo/inactivo de un cliente.
+        
+        Un cliente archivado se restaura antes de activarlo.
         """
-        cliente = self.get_object()
+        try:
+            cliente = self.get_object()
+        except Http404:
+            archivado = get_object_or_404(ClienteArchivado.objects, pk=pk)
+            try:
+                cliente = restaurar(archivado)
+            except ValidationError as error:
+                return Response(error.message_dict, status=status.HTTP_400_BAD_REQUEST)
         cliente.activo = not cliente.activo
         cliente.save()
         
@@ -219,7 +341,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            cliente = Cliente.objects.get(cuit=cuit)
+            cliente = obtener_cliente(cuit=cuit)
             serializer = self.get_serializer(cliente)
             return Response(serializer.data)
         except Cliente.DoesNotExist:
@@ -227,23 +349,266 @@ class ClienteViewSet(viewsets.ModelViewSet):
                 {'error': 'Cliente no encontrado'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        except Cliente.MultipleObjectsReturned:
+            return Response(
+                {'error': CUIT_EN_VARIOS_ESTUDIOS, 'clientes': coincidencias(cuit=cuit)},
+                status=status.HTTP_409_CONFLICT
+            )
+    
+    @action(detail=False, methods=['post'])
+    def validar_cuits(self, request):
+        """
+        Valida en bloque el dígito verificador de una lista de CUIT.
+        """
+        cuits = request.data.get('cuits')
+        if not isinstance(cuits, list):
+            return Response(
+                {'error': 'Se requiere una lista "cuits"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        validos = validar_lote(cuits)
+        return Response({
+            'total': len(cuits),
+            'validos': sum(validos),
+            'invalidos': [cuit for cuit, valido in zip(cuits, validos) if not valido],
+        })
+    
+    @action(detail=True, methods=['get'])
+    def archivos(self, request, pk=None):
+        """
+        Busca en el índice de archivos de la carpeta del cliente.
+        """
+        cliente = self.get_object()
+        texto = request.query_params.get('q', '').strip()
+        archivos = buscar_archivos(cliente, texto) if texto else cliente.archivos.all()
+        
+        page = self.paginate_queryset(archivos)
+        serializer = ArchivoClienteSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Sugiere clientes activos cuyo nombre o CUIT comienzan con `q`.
+        
+        Se resuelve con el índice de prefijos en memoria del proceso, sin
+        consultar la base de datos en cada tecla.
+        """
+        texto = request.query_params.get('q', '')
+        try:
+            limite = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            limite = 10
+        
+        resultados = obtener_indice().buscar(texto, limite)
+        
+        return Response([
+            {'id': pk, 'nombre': nombre, 'cuit': cuit}
+            for pk, nombre, cuit in resultados
+        ])
+    
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        Descarga el snapshot SQLite de solo lectura de los clientes.
+        
+        Las claves se incluyen solo para usuarios staff con
+        `?credenciales=1`. Responde 304 si `If-None-Match` ya es la versión
+        vigente.
+        """
+        con_credenciales = request.query_params.get('credenciales') == '1'
+        if con_credenciales and not request.user.is_staff:
+            return Response(
+                {'error': 'Solo el personal del estudio puede descargar las claves'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        actual = generar_snapshot(con_credenciales)
+        etag = f'"{actual["version"]}"'
+        # La compresión marca el ETag como débil; la versión es la misma
+        vigentes = [valor.removeprefix('W/') for valor in parse_etags(request.headers.get('If-None-Match', ''))]
+        if etag in vigentes or '*' in vigentes:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                open(ruta_snapshot(actual['version'], con_credenciales), 'rb'),
+                as_attachment=True,
+                filename=f'clientes-{actual["version"]}.sqlite3',
+                content_type='application/vnd.sqlite3',
+            )
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    @action(detail=False, methods=['get'], url_path='snapshot/delta')
+    def snapshot_delta(self, request):
+        """
+        Retorna las filas nuevas o modificadas y los ids eliminados desde la
+        versión `desde` del snapshot hasta la vigente.
+        """
+        con_credenciales = request.query_params.get('credenciales') == '1'
+        if con_credenciales and not request.user.is_staff:
+            return Response(
+                {'error': 'Solo el personal del estudio puede descargar las claves'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        datos = parche(request.query_params.get('desde', ''), con_credenciales)
+        if datos is None:
+            return Response(
+                {'error': 'La versión indicada ya no está disponible; descargue el snapshot completo'},
+                status=status.HTTP_410_GONE
+            )
+        return Response(datos)
     
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
         """
         Retorna estadísticas básicas de clientes.
         """
-        total_clientes = Cliente.objects.count()
-        clientes_activos = Cliente.objects.filter(activo=True).count()
-        clientes_inactivos = total_clientes - clientes_activos
-        clientes_con_clave_fiscal = Cliente.objects.exclude(
-            Q(clave_fiscal__isnull=True) | Q(clave_fiscal='')
-        ).count()
+        return Response(formatear_estadisticas(
+            Cliente.objects.aggregate(**TOTALES_ESTADISTICAS), ClienteArchivado.objects.count()
+        ))
+
+
+def formatear_estadisticas(totales, archivados):
+    """
+    Arma la respuesta de estadísticas a partir de `TOTALES_ESTADISTICAS` y
+    la cantidad de clientes archivados, que cuentan como inactivos.
+    """
+    total_clientes = totales['total'] + archivados
+    clientes_activos = totales['activos']
+    return {
+        'total_clientes': total_clientes,
+        'clientes_activos': clientes_activos,
+        'clientes_inactivos': total_clientes - clientes_activos,
+        'clientes_con_clave_fiscal': totales['con_clave_fiscal'],
+        'porcentaje_activos': round((clientes_activos / total_clientes * 100), 2) if total_clientes > 0 else 0,
+    }
+
+
+# ====== VISTAS ASÍNCRONAS (ASGI) ======
+#
+# Con `VISTAS_ASYNC` (lo activa config/asgi.py) las lecturas más frecuentes
+# usan estas versiones: las consultas se esperan con el ORM asíncrono en
+# lugar de ocupar un hilo por solicitud. Las plantillas se dibujan con
+# `sync_to_async` porque el contexto de autenticación consulta la sesión.
+
+
+async def lista_clientes_async(request):
+    """
+    Versión asíncrona de `lista_clientes`.
+    """
+    search_query = request.GET.get('search', '')
+    activo_filter = request.GET.get('activo', '')
+    
+    clientes = filtrar_clientes(Cliente.objects.all(), search_query, activo_filter)
+    
+    # El paginador es sincrónico: se le da el total ya contado y la página
+    # se carga antes de dibujar la plantilla
+    paginator = Paginator(clientes, 10)
+    paginator.count = await clientes.acount()
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = [cliente async for cliente in page_obj.object_list]
+    
+    context = {
+        'page_obj': page_obj,
+        'search_query': search_query,
+        'activo_filter': activo_filter,
+    }
+    
+    return await sync_to_async(render)(request, 'clientes/lista.html', context)
+
+
+async def detalle_cliente_async(request, pk):
+    """
+    Versión asíncrona de `detalle_cliente`.
+    """
+    try:
+        cliente = await aobtener_cliente(pk=pk)
+    except Cliente.DoesNotExist:
+        raise Http404('Cliente no encontrado')
+    busqueda_archivos = request.GET.get('archivos', '').strip()
+    
+    archivos = None
+    if busqueda_archivos:
+        archivos = [
+            archivo async for archivo in buscar_archivos(cliente, busqueda_archivos)[:LIMITE_ARCHIVOS]
+        ]
+    
+    cambios = [cambio async for cambio in cliente.cambios.all()[:LIMITE_HISTORIAL]]
+    
+    context = {
+        'cliente': cliente,
+        'busqueda_archivos': busqueda_archivos,
+        'archivos': archivos,
+        'cambios': historial(cliente.pk, cambios, cliente._state.db)[:LIMITE_HISTORIAL],
+    }
+    
+    return await sync_to_async(render)(request, 'clientes/detalle.html', context)
+
+
+def api_asincronica(accion):
+    """
+    Decorador para las versiones asíncronas de acciones GET de
+    `ClienteViewSet`.
+    
+    La versión asíncrona responde JSON a usuarios autenticados por sesión.
+    Las demás solicitudes (autenticación básica, API navegable, `?format=`)
+    pasan a la acción de DRF, que conserva su negociación y sus errores.
+    """
+    vista_drf = ClienteViewSet.as_view({'get': accion})
+    
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            usuario = await request.auser()
+            if (
+                request.method != 'GET'
+                or not usuario.is_authenticated
+                or 'format' in request.GET
+                or 'text/html' in request.headers.get('Accept', '')
+            ):
+                return await sync_to_async(vista_drf)(request, *args, **kwargs)
+            datos, estado = await vista(request, *args, **kwargs)
+            response = HttpResponse(
+                JSONRendererRapido().render(datos), status=estado, content_type='application/json'
+            )
+            patch_vary_headers(response, ('Accept',))
+            return response
         
-        return Response({
-            'total_clientes': total_clientes,
-            'clientes_activos': clientes_activos,
-            'clientes_inactivos': clientes_inactivos,
-            'clientes_con_clave_fiscal': clientes_con_clave_fiscal,
-            'porcentaje_activos': round((clientes_activos / total_clientes * 100), 2) if total_clientes > 0 else 0,
-        })
+        envoltura.csrf_exempt = True
+        return envoltura
+    
+    return decorador
+
+
+@api_asincronica('buscar_por_cuit')
+async def buscar_por_cuit_async(request):
+    """
+    Versión asíncrona de `ClienteViewSet.buscar_por_cuit`.
+    """
+    cuit = request.GET.get('cuit', None)
+    if not cuit:
+        return {'error': 'El parámetro CUIT es requerido'}, status.HTTP_400_BAD_REQUEST
+    
+    try:
+        cliente = await aobtener_cliente(cuit=cuit)
+    except Cliente.DoesNotExist:
+        return {'error': 'Cliente no encontrado'}, status.HTTP_404_NOT_FOUND
+    except Cliente.MultipleObjectsReturned:
+        return {'error': CUIT_EN_VARIOS_ESTUDIOS, 'clientes': await acoincidencias(cuit=cuit)}, status.HTTP_409_CONFLICT
+    return ClienteSerializer(cliente).data, status.HTTP_200_OK
+
+
+@api_asincronica('estadisticas')
+async def estadisticas_async(request):
+    """
+    Versión asíncrona de `ClienteViewSet.estadisticas`.
+    """
+    totales, archivados = await asyncio.gather(
+        Cliente.objects.aaggregate(**TOTALES_ESTADISTICAS),
+        ClienteArchivado.objects.acount(),
+    )
+    return formatear_estadisticas(totales, archivados), status.HTTP_200_OK
@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# Bajo ASGI las lecturas de clientes usan las vistas asíncronas
+os.environ.setdefault('VISTAS_ASYNC', 'True')
+
 application = get_asgi_application()
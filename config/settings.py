@@ -59,18 +59,24 @@ INSTALLED_APPS = [
     'rest_framework',
     # Local apps
     'home',
+    'estudios',
     'clientes',
     'procesos',
     'afip',
+    'monitoreo',
 ]
 
 MIDDLEWARE = [
+    'monitoreo.middleware.MetricasMiddleware',
+    'home.middleware.CompresionMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'home.middleware.ArchivosEstaticosMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'estudios.middleware.EstudioMiddleware',
+    'monitoreo.middleware.PerfiladorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,6 +93,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'estudios.context_processors.estudios',
             ],
         },
     },
@@ -94,6 +101,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Vistas asíncronas para las lecturas de clientes; config/asgi.py las activa
+VISTAS_ASYNC = os.environ.get('VISTAS_ASYNC', 'False') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -110,6 +120,61 @@ DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
     DATABASES['default'] = dj_database_url.parse(DATABASE_URL)
 
+# Bases propias de estudios grandes: "alias=url alias=url"; el alias se indica
+# en `Estudio.base_datos` y cada base se migra con `migrate --database alias`
+for _base in os.environ.get('ESTUDIOS_BASES', '').split():
+    _alias, _url = _base.split('=', 1)
+    DATABASES[_alias] = dj_database_url.parse(_url)
+
+DATABASE_ROUTERS = ['estudios.router.EstudiosRouter']
+ESTUDIOS_APPS = ['clientes', 'afip']  # apps con datos de clientes, en la base de su estudio
+
+
+# Caché compartida por los workers: Redis si está configurado, si no archivos
+# locales (los workers de una misma máquina ven las mismas entradas). Las
+# sesiones y los usuarios autenticados van en su propia caché, para que las
+# demás entradas no las desplacen.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'sesiones': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sesiones',
+        },
+    }
+else:
+    CACHE_DIR = os.environ.get('CACHE_DIR', '/tmp/estudio-web-cache')
+    # Al superar el máximo la caché de archivos borra un tercio de las
+    # entradas; el valor por omisión de Django (300) es chico para este uso
+    CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', 10000))
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRADAS},
+        },
+        'sesiones': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'sesiones'),
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRADAS},
+        },
+    }
+
+# Sesiones leídas de la caché, con la base como respaldo
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sesiones'
+
+# Los mensajes viajan en una cookie y no obligan a guardar la sesión
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+AUTHENTICATION_BACKENDS = ['home.autenticacion.ModelBackendCacheado']
+AUTH_USUARIO_CACHE_TTL = 60  # segundos que se reutiliza el usuario de la sesión
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,6 +225,15 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # Django REST Framework
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'home.renderers.JSONRendererRapido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'home.renderers.JSONParserRapido',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
     ],
@@ -167,6 +241,46 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# AFIP
+AFIP_WSAA_URL = os.environ.get('AFIP_WSAA_URL', 'https://wsaahomo.afip.gov.ar/ws/services/LoginCms')
+AFIP_CERTIFICADOS_DIR = os.environ.get('AFIP_CERTIFICADOS_DIR', BASE_DIR / 'certificados')
+AFIP_WSAA_MARGEN_RENOVACION = 600  # segundos antes del vencimiento del ticket
+AFIP_CUIT_REPRESENTADA = os.environ.get('AFIP_CUIT_REPRESENTADA', '')
+AFIP_PADRON_URL = os.environ.get('AFIP_PADRON_URL', 'https://awshomo.afip.gov.ar/sr-padron/webservices/personaServiceA5')
+AFIP_WSFE_URL = os.environ.get('AFIP_WSFE_URL', 'https://wswhomo.afip.gov.ar/wsfev1/service.asmx')
+AFIP_PADRON_TTL = 7 * 24 * 3600  # segundos que se reutiliza una consulta al padrón
+
+# Procesos en segundo plano
+PROCESOS_SHARDS = int(os.environ.get('PROCESOS_SHARDS', 1))
+
+# Métricas (con varios workers, un directorio compartido vaciado antes de iniciar)
+METRICAS_DIR = os.environ.get('METRICAS_DIR')
+METRICAS_INTERVALO = 5  # segundos entre volcados del registro de cada worker
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
+# Perfilado por muestreo (desactivado si no hay directorio)
+PERFILADOR_DIR = os.environ.get('PERFILADOR_DIR')
+PERFILADOR_FRACCION = float(os.environ.get('PERFILADOR_FRACCION', 0))  # fracción de solicitudes perfiladas
+PERFILADOR_INTERVALO = 0.005  # segundos entre muestras
+
+# Backups de las bases de los clientes
+BACKUP_MAX_DIAS = int(os.environ.get('BACKUP_MAX_DIAS', 2))  # antigüedad máxima de un backup
+
+# Snapshots SQLite de clientes para las herramientas de escritorio
+SNAPSHOTS_DIR = os.environ.get('SNAPSHOTS_DIR', BASE_DIR / 'snapshots')
+SNAPSHOTS_CONSERVAR = 10  # versiones de cada variante disponibles para parches
+
+# Historial de cambios de clientes, insertado en lotes fuera de la solicitud
+AUDITORIA_DIR = os.environ.get('AUDITORIA_DIR', BASE_DIR / 'auditoria')  # cambios pendientes si la base falla
+AUDITORIA_INTERVALO = 1  # segundos entre inserciones de lotes
+AUDITORIA_MAX_PENDIENTES = 5000  # cambios en memoria antes de insertar en la propia solicitud
+
+# Clientes inactivos que se pasan a la tabla de archivados
+ARCHIVO_DIAS_INACTIVO = int(os.environ.get('ARCHIVO_DIAS_INACTIVO', 365))  # días sin cambios antes de archivar
+
+# Fichas PDF/XLSX de clientes (ZIP generados y fichas reutilizables entre corridas)
+REPORTES_DIR = os.environ.get('REPORTES_DIR', BASE_DIR / 'reportes')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -22,7 +22,10 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('home.urls')),
+    path('', include('estudios.urls')),
     path('', include('clientes.urls')),
+    path('', include('procesos.urls')),
+    path('', include('monitoreo.urls')),
     path('api-auth/', include('rest_framework.urls')),  # Para login/logout de DRF
 ]
 
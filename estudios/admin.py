@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import Estudio
+
+
+@admin.register(Estudio)
+class EstudioAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para el modelo Estudio.
+    """
+    
+    list_display = ['nombre', 'slug', 'base_datos', 'activo', 'fecha_creacion']
+    
+    list_filter = ['activo', 'base_datos']
+    
+    search_fields = ['nombre', 'slug']
+    
+    prepopulated_fields = {'slug': ('nombre',)}
+    
+    filter_horizontal = ['usuarios']
+
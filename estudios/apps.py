@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class EstudiosConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'estudios'
+
+    def ready(self):
+        from django.db.models.signals import m2m_changed, post_delete, post_save
+        from . import contexto
+        from .models import Estudio
+
+        # Invalidar los estudios cacheados de los usuarios
+        post_save.connect(contexto.invalidar_estudios, sender=Estudio)
+        post_delete.connect(contexto.invalidar_estudios, sender=Estudio)
+        m2m_changed.connect(contexto.invalidar_estudios, sender=Estudio.usuarios.through)
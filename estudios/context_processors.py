@@ -0,0 +1,15 @@
+from .contexto import SIN_ESTUDIO, estudio_de_solicitud, estudios_del_usuario
+
+
+def estudios(request):
+    """
+    Agrega el estudio en curso y los que el usuario puede elegir.
+    """
+    usuario = getattr(request, 'user', None)
+    if usuario is None or not usuario.is_authenticated:
+        return {}
+    estudio = estudio_de_solicitud(request)
+    return {
+        'estudio_actual': None if estudio is SIN_ESTUDIO else estudio,
+        'estudios_disponibles': estudios_del_usuario(usuario),
+    }
@@ -0,0 +1,204 @@
+"""
+Estudio en curso para las consultas de los datos de clientes.
+
+`EstudioMiddleware` deja la solicitud en una variable de contexto y el
+estudio se resuelve la primera vez que una consulta lo necesita, a partir
+del usuario:
+
+- El estudio elegido con `cambiar_estudio` (en la sesión) o con el
+  encabezado `X-Estudio`, si el usuario es miembro o superusuario.
+- Si no, el primer estudio del que el usuario es miembro.
+- Un superusuario sin estudio elegido ve los de todos los estudios.
+- Si hay un único estudio activo, cualquier otro usuario trabaja en él, así
+  una instalación de un solo estudio funciona igual que antes; con varios,
+  no ve ningún cliente.
+
+Fuera de una solicitud (comandos, tareas) no hay estudio salvo que se
+active con `usar_estudio`, y las consultas abarcan todos los estudios de la
+base `default`; los procesos recorren además los estudios con base propia
+con `alcances`.
+
+Los estudios activos y los de cada usuario se guardan en la caché; un
+cambio en cualquier estudio o en sus miembros invalida la de todos.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+
+from .middleware import solicitud_actual
+
+
+TTL = getattr(settings, 'AUTH_USUARIO_CACHE_TTL', 60)
+
+# Clave de la sesión con el estudio elegido
+SESION = 'estudio_id'
+
+# Resultado de `estudio_actual` para un usuario sin acceso a ningún estudio
+SIN_ESTUDIO = object()
+
+_NO_ACTIVADO = object()
+
+# Estudio activado explícitamente con `usar_estudio`
+_activado = ContextVar('estudio_activado', default=_NO_ACTIVADO)
+
+
+def _version():
+    return cache.get_or_set('estudios:version', time.time_ns, None)
+
+
+def invalidar_estudios(sender, **kwargs):
+    """
+    Receptor de `post_save`/`post_delete` de los estudios y de
+    `m2m_changed` de sus usuarios.
+    """
+    cache.set('estudios:version', time.time_ns(), None)
+
+
+def estudios_activos():
+    """
+    Retorna {id: Estudio} de los estudios activos.
+    """
+    from .models import Estudio
+
+    clave = f'estudios:activos:{_version()}'
+    estudios = cache.get(clave)
+    if estudios is None:
+        estudios = {estudio.pk: estudio for estudio in Estudio.objects.filter(activo=True)}
+        cache.set(clave, estudios, TTL)
+    return estudios
+
+
+def _estudios_de(usuario):
+    from .models import Estudio
+
+    clave = f'estudios:usuario:{usuario.pk}:{_version()}'
+    ids = cache.get(clave)
+    if ids is None:
+        ids = list(Estudio.usuarios.through.objects.filter(user_id=usuario.pk)
+                   .order_by('estudio_id').values_list('estudio_id', flat=True))
+        cache.set(clave, ids, TTL)
+    return ids
+
+
+def estudios_del_usuario(usuario):
+    """
+    Retorna los estudios activos que el usuario puede elegir: todos para un
+    superusuario, si no aquellos de los que es miembro.
+    """
+    estudios = estudios_activos()
+    if usuario.is_superuser:
+        return list(estudios.values())
+    return [estudios[pk] for pk in _estudios_de(usuario) if pk in estudios]
+
+
+def _elegido(request):
+    valor = request.headers.get('X-Estudio') or getattr(request, 'session', {}).get(SESION)
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def estudio_de_solicitud(request):
+    """
+    Retorna el estudio de la solicitud, None si puede ver todos o
+    `SIN_ESTUDIO`. El resultado se guarda en la solicitud.
+    """
+    try:
+        return request._estudio
+    except AttributeError:
+        pass
+
+    estudios = estudios_activos()
+    usuario = getattr(request, 'user', None)
+    autenticado = usuario is not None and usuario.is_authenticated
+    elegido = _elegido(request)
+
+    if elegido in estudios and autenticado and (usuario.is_superuser or elegido in _estudios_de(usuario)):
+        estudio = estudios[elegido]
+    elif autenticado and usuario.is_superuser:
+        estudio = None
+    else:
+        propios = estudios_del_usuario(usuario) if autenticado else []
+        if propios:
+            estudio = propios[0]
+        elif len(estudios) == 1:
+            estudio = next(iter(estudios.values()))
+        else:
+            estudio = SIN_ESTUDIO
+
+    request._estudio = estudio
+    return estudio
+
+
+def estudio_actual():
+    """
+    Retorna el estudio en curso, None si no hay restricción o `SIN_ESTUDIO`.
+    """
+    activado = _activado.get()
+    if activado is not _NO_ACTIVADO:
+        return activado
+    request = solicitud_actual.get()
+    if request is None:
+        return None
+    return estudio_de_solicitud(request)
+
+
+@contextmanager
+def usar_estudio(estudio):
+    """
+    Restringe las consultas del bloque al estudio indicado (None: todos).
+    """
+    token = _activado.set(estudio)
+    try:
+        yield estudio
+    finally:
+        _activado.reset(token)
+
+
+def alcances():
+    """
+    Retorna los estudios que un proceso activa uno por vez con
+    `usar_estudio` para recorrer todos los clientes a su alcance: el estudio
+    en curso si lo hay; si no, None (los estudios de `default`) y cada
+    estudio activo con base propia.
+    """
+    estudio = estudio_actual()
+    if estudio is not None:
+        return [estudio]
+    return [None] + [
+        estudio for _, estudio in sorted(estudios_activos().items()) if estudio.base_datos != 'default'
+    ]
+
+
+def filtrar_por_estudio(queryset, campo='estudio'):
+    """
+    Restringe el queryset al estudio en curso a través de `campo`.
+    """
+    estudio = estudio_actual()
+    if estudio is None:
+        return queryset
+    if estudio is SIN_ESTUDIO:
+        return queryset.none()
+    return queryset.filter(**{campo: estudio.pk})
+
+
+def estudio_para_alta():
+    """
+    Retorna el estudio al que se asigna un registro nuevo sin estudio: el
+    estudio en curso o, si no hay restricción, el estudio activo más antiguo.
+    """
+    estudio = estudio_actual()
+    if estudio is SIN_ESTUDIO:
+        raise PermissionDenied('El usuario no pertenece a ningún estudio')
+    if estudio is None:
+        estudios = estudios_activos()
+        if not estudios:
+            raise PermissionDenied('No hay ningún estudio activo')
+        estudio = estudios[min(estudios)]
+    return estudio
@@ -0,0 +1,25 @@
+from django.db import models
+
+from .contexto import filtrar_por_estudio
+
+
+class EstudioManager(models.Manager):
+    """
+    Manager que restringe las consultas al estudio en curso.
+    """
+
+    # Campo por el que se llega al estudio; es un atributo de la clase para
+    # que lo hereden los managers de las relaciones
+    campo = 'estudio'
+
+    def get_queryset(self):
+        return filtrar_por_estudio(super().get_queryset(), self.campo)
+
+
+class EstudioClienteManager(EstudioManager):
+    """
+    Manager de los modelos de un cliente, restringido al estudio en curso a
+    través del cliente.
+    """
+
+    campo = 'cliente__estudio'
@@ -0,0 +1,42 @@
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+# Solicitud en curso. Se guarda la solicitud y no el usuario porque DRF
+# autentica recién en la vista; el ORM asíncrono copia el contexto al hilo
+# que ejecuta las consultas
+solicitud_actual = ContextVar('solicitud_actual', default=None)
+
+
+class EstudioMiddleware:
+    """
+    Deja la solicitud en curso a la vista del código que depende del
+    usuario sin recibir la solicitud: el estudio de las consultas de
+    clientes y la auditoría de sus cambios.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = solicitud_actual.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            solicitud_actual.reset(token)
+
+    async def __acall__(self, request):
+        token = solicitud_actual.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            solicitud_actual.reset(token)
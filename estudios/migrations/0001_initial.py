@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Estudio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200, verbose_name='Nombre')),
+                ('slug', models.SlugField(unique=True, verbose_name='Identificador')),
+                ('base_datos', models.CharField(default='default', help_text='Alias en DATABASES de la base con los clientes del estudio', max_length=50, verbose_name='Base de Datos')),
+                ('activo', models.BooleanField(default=True, verbose_name='Activo')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('usuarios', models.ManyToManyField(blank=True, related_name='estudios', to=settings.AUTH_USER_MODEL, verbose_name='Usuarios')),
+            ],
+            options={
+                'verbose_name': 'Estudio',
+                'verbose_name_plural': 'Estudios',
+                'ordering': ['nombre'],
+            },
+        ),
+    ]
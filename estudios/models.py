@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.db import models
+
+
+class Estudio(models.Model):
+    """
+    Estudio contable alojado en el sistema. Cada cliente pertenece a un
+    estudio y sus usuarios solo ven los clientes de los estudios de los que
+    son miembros.
+    """
+    
+    nombre = models.CharField(
+        max_length=200,
+        verbose_name="Nombre"
+    )
+    
+    slug = models.SlugField(
+        max_length=50,
+        unique=True,
+        verbose_name="Identificador"
+    )
+    
+    base_datos = models.CharField(
+        max_length=50,
+        default='default',
+        verbose_name="Base de Datos",
+        help_text="Alias en DATABASES de la base con los clientes del estudio"
+    )
+    
+    usuarios = models.ManyToManyField(
+        settings.AUTH_USER_MODEL,
+        blank=True,
+        related_name='estudios',
+        verbose_name="Usuarios"
+    )
+    
+    activo = models.BooleanField(
+        default=True,
+        verbose_name="Activo"
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+    
+    class Meta:
+        verbose_name = "Estudio"
+        verbose_name_plural = "Estudios"
+        ordering = ['nombre']
+    
+    def __str__(self):
+        return self.nombre
@@ -0,0 +1,42 @@
+"""
+Router de bases de datos por estudio.
+
+Los modelos de las apps de `ESTUDIOS_APPS` (los datos de los clientes) se
+leen y escriben en la base del estudio en curso (`Estudio.base_datos`), así
+un estudio grande puede vivir en su propia base. El resto, incluidos los
+estudios, los usuarios y las sesiones, queda siempre en `default`. Todas las
+bases tienen el esquema completo: se migran con `migrate --database`.
+"""
+
+from django.conf import settings
+
+from .contexto import SIN_ESTUDIO, estudio_actual
+
+
+APPS = set(getattr(settings, 'ESTUDIOS_APPS', ['clientes']))
+
+
+class EstudiosRouter:
+
+    def _base(self, model, **hints):
+        if model._meta.app_label not in APPS:
+            # Explícito: si no, el estudio de un cliente de otra base se
+            # buscaría en la base del cliente
+            return 'default'
+        # Las relaciones de un objeto ya cargado quedan en su misma base
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._meta.app_label in APPS and instancia._state.db:
+            return instancia._state.db
+        estudio = estudio_actual()
+        if estudio is None or estudio is SIN_ESTUDIO:
+            return None
+        return estudio.base_datos
+
+    db_for_read = _base
+    db_for_write = _base
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La clave foránea al estudio cruza bases: no tiene restricción en la base
+        if 'estudios' in (obj1._meta.app_label, obj2._meta.app_label):
+            return True
+        return None
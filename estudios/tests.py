@@ -0,0 +1,81 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+
+from clientes.models import Cliente, EstadoBackup
+from clientes.views import estadisticas_async, lista_clientes_async
+from home.views import home_view_async
+
+from .middleware import solicitud_actual
+from .models import Estudio
+
+
+class AislamientoEstudiosTests(TestCase):
+    """
+    Un usuario de un estudio no ve nada de los clientes de otro estudio.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.estudio_a = Estudio.objects.create(nombre='Estudio A', slug='estudio-a')
+        cls.estudio_b = Estudio.objects.create(nombre='Estudio B', slug='estudio-b')
+        cls.usuario = User.objects.create_user('usuario-a', password='x')
+        cls.estudio_a.usuarios.add(cls.usuario)
+
+        cls.cliente_a = Cliente.objects.create(
+            estudio=cls.estudio_a, nombre='Cliente Propio', cuit='20-11111111-2'
+        )
+        cls.cliente_b = Cliente.objects.create(
+            estudio=cls.estudio_b, nombre='Cliente Ajeno', cuit='20-22222222-3', activo=False
+        )
+        for cliente in (cls.cliente_a, cls.cliente_b):
+            EstadoBackup.objects.create(cliente=cliente, estado=EstadoBackup.FALTANTE, detalle='Sin backups')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_inicio(self):
+        response = self.client.get('/')
+
+        self.assertContains(response, 'Cliente Propio')
+        self.assertNotContains(response, 'Cliente Ajeno')
+        self.assertEqual(response.context['total_clientes'], 1)
+        self.assertEqual(response.context['total_backups_con_problemas'], 1)
+
+    def test_lista_clientes(self):
+        response = self.client.get('/clientes/')
+
+        self.assertContains(response, 'Cliente Propio')
+        self.assertNotContains(response, 'Cliente Ajeno')
+
+    def test_api_lista(self):
+        response = self.client.get('/api/clientes/')
+
+        self.assertContains(response, 'Cliente Propio')
+        self.assertNotContains(response, 'Cliente Ajeno')
+
+    def test_api_estadisticas(self):
+        datos = self.client.get('/api/clientes/estadisticas/').json()
+
+        self.assertEqual(datos['total_clientes'], 1)
+        self.assertEqual(datos['clientes_inactivos'], 0)
+
+    def _asincronica(self, vista, ruta):
+        request = RequestFactory().get(ruta)
+        request.user = self.usuario
+        request.session = {}
+        token = solicitud_actual.set(request)
+        try:
+            return async_to_sync(vista)(request)
+        finally:
+            solicitud_actual.reset(token)
+
+    def test_vistas_asincronicas(self):
+        for vista, ruta in ((home_view_async, '/'), (lista_clientes_async, '/clientes/')):
+            with self.subTest(ruta=ruta):
+                contenido = self._asincronica(vista, ruta).content.decode()
+                self.assertIn('Cliente Propio', contenido)
+                self.assertNotIn('Cliente Ajeno', contenido)
+
+        datos, _ = self._asincronica(estadisticas_async.__wrapped__, '/api/clientes/estadisticas/')
+        self.assertEqual(datos['total_clientes'], 1)
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'estudios'
+
+urlpatterns = [
+    path('estudios/cambiar/', views.cambiar_estudio, name='cambiar'),
+]
@@ -0,0 +1,28 @@
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import redirect
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+
+from .contexto import SESION, estudios_del_usuario
+
+
+@login_required
+@require_POST
+def cambiar_estudio(request):
+    """
+    Guarda en la sesión el estudio con el que trabaja el usuario; sin
+    estudio, un superusuario vuelve a ver todos.
+    """
+    valor = request.POST.get('estudio', '')
+    if valor:
+        if not valor.isdigit() or int(valor) not in {estudio.pk for estudio in estudios_del_usuario(request.user)}:
+            raise Http404('Estudio no encontrado')
+        request.session[SESION] = int(valor)
+    else:
+        request.session.pop(SESION, None)
+
+    siguiente = request.POST.get('next', '')
+    if not url_has_allowed_host_and_scheme(siguiente, {request.get_host()}, request.is_secure()):
+        siguiente = '/'
+    return redirect(siguiente)
@@ -7,6 +7,19 @@ class HomeConfig(AppConfig):
     name = 'home'
 
     def ready(self):
+        from django.contrib.auth.models import Group, Permission, User
+        from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+        from . import autenticacion
+
+        # Invalidar el usuario cacheado cuando cambian sus datos o permisos
+        post_save.connect(autenticacion.invalidar_usuario, sender=User)
+        post_delete.connect(autenticacion.invalidar_usuario, sender=User)
+        m2m_changed.connect(autenticacion.invalidar_relacion, sender=User.groups.through)
+        m2m_changed.connect(autenticacion.invalidar_relacion, sender=User.user_permissions.through)
+        m2m_changed.connect(autenticacion.invalidar_relacion, sender=Group.permissions.through)
+        pre_delete.connect(autenticacion.invalidar_eliminacion, sender=Group)
+        pre_delete.connect(autenticacion.invalidar_eliminacion, sender=Permission)
+
         # Solo ejecutar en producción y una vez
         import os
         if not os.environ.get('DEBUG', 'True').lower() == 'true':
@@ -0,0 +1,88 @@
+"""
+Carga de usuarios autenticados desde la caché.
+
+`AuthenticationMiddleware` busca el usuario de la sesión en la base en cada
+solicitud. `ModelBackendCacheado` lo guarda en la caché de las sesiones
+(`SESSION_CACHE_ALIAS`) por `AUTH_USUARIO_CACHE_TTL` segundos, y las señales de abajo lo invalidan
+cuando cambian su contraseña, sus datos o sus permisos, para que un cambio
+de clave o una baja se apliquen en la solicitud siguiente.
+"""
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+
+TTL = getattr(settings, 'AUTH_USUARIO_CACHE_TTL', 60)
+
+cache = ConnectionProxy(caches, settings.SESSION_CACHE_ALIAS)
+
+
+def clave_usuario(user_id):
+    return f'auth:usuario:{user_id}'
+
+
+class ModelBackendCacheado(ModelBackend):
+    """
+    Backend de autenticación de Django con el usuario de la sesión cacheado.
+    """
+
+    def get_user(self, user_id):
+        clave = clave_usuario(user_id)
+        user = cache.get(clave)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(clave, user, TTL)
+        return user
+
+
+def invalidar_usuario(sender, instance, **kwargs):
+    """
+    Receptor de `post_save`/`post_delete` del usuario.
+    """
+    cache.delete(clave_usuario(instance.pk))
+
+
+def invalidar_relacion(sender, instance, action, model, pk_set, **kwargs):
+    """
+    Receptor de `m2m_changed` de los grupos y permisos de los usuarios y de
+    los permisos de los grupos, desde cualquiera de los dos lados.
+    """
+    # Antes de un clear todavía se ve quiénes estaban relacionados
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    from django.contrib.auth.models import Group, User
+
+    ids = _usuarios_relacionados(instance)
+    if pk_set and model is User:
+        ids.update(pk_set)
+    elif pk_set and model is Group:
+        ids.update(User.objects.filter(groups__in=pk_set).values_list('pk', flat=True))
+
+    cache.delete_many([clave_usuario(pk) for pk in ids])
+
+
+def invalidar_eliminacion(sender, instance, **kwargs):
+    """
+    Receptor de `pre_delete` de los grupos y permisos: al borrarlos, Django
+    elimina las filas intermedias sin emitir `m2m_changed`.
+    """
+    ids = _usuarios_relacionados(instance)
+    cache.delete_many([clave_usuario(pk) for pk in ids])
+
+
+def _usuarios_relacionados(instance):
+    """
+    Ids de los usuarios cuyos permisos dependen de `instance` (un usuario,
+    un grupo o un permiso, directo o por sus grupos).
+    """
+    from django.contrib.auth.models import Group, User
+
+    if isinstance(instance, User):
+        return {instance.pk}
+    ids = set(instance.user_set.values_list('pk', flat=True))
+    if not isinstance(instance, Group):
+        ids.update(User.objects.filter(groups__permissions=instance).values_list('pk', flat=True))
+    return ids
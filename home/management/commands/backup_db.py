@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.respaldo import FILAS_POR_PARTE, TAMANIO_LOTE, respaldar
+
+
+class Command(BaseCommand):
+    help = 'Generar un backup de la base en NDJSON comprimido con manifiesto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('destino', help='Directorio donde se escribe el backup')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--excluir', nargs='*', default=[],
+                            help='Apps o modelos (app.modelo) que no se respaldan')
+        parser.add_argument('--nivel', type=int, default=6, choices=range(1, 10),
+                            help='Nivel de compresión gzip')
+        parser.add_argument('--lote', type=int, default=TAMANIO_LOTE)
+        parser.add_argument('--filas-por-parte', type=int, default=FILAS_POR_PARTE,
+                            help='Filas por archivo; las partes se restauran en paralelo')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        manifiesto = respaldar(
+            options['destino'], alias=options['database'], excluir=options['excluir'],
+            nivel=options['nivel'], lote=options['lote'], filas_por_parte=options['filas_por_parte'],
+            informar=self._informar,
+        )
+        duracion = time.perf_counter() - inicio
+
+        filas = sum(entrada['filas'] for entrada in manifiesto['modelos'])
+        tamanio = sum(entrada['bytes'] for entrada in manifiesto['modelos'])
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {len(manifiesto["modelos"])} modelos, {filas:,} filas, '
+            f'{tamanio / 1024 / 1024:.1f} MB en {duracion:.1f} s ({filas / duracion:,.0f} filas/s).'
+        ))
+
+    def _informar(self, entrada, segundos):
+        if entrada['filas']:
+            self.stdout.write(
+                f'{entrada["modelo"]}: {entrada["filas"]:,} filas en {len(entrada["partes"])} partes, '
+                f'{entrada["bytes"] / 1024:.1f} KB '
+                f'({entrada["filas"] / max(segundos, 1e-6):,.0f} filas/s)'
+            )
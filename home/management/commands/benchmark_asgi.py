@@ -0,0 +1,210 @@
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+
+from clientes.models import Cliente
+
+
+class Command(BaseCommand):
+    help = 'Comparar la concurrencia de las lecturas de clientes bajo WSGI y ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', choices=['ambos', 'wsgi', 'asgi'], default='ambos')
+        parser.add_argument('--trabajadores', type=int, default=4,
+                            help='Hilos que atienden solicitudes bajo WSGI (un worker gthread)')
+        parser.add_argument('--concurrencia', type=int, default=32,
+                            help='Clientes simultáneos enviando solicitudes')
+        parser.add_argument('--solicitudes', type=int, default=800)
+        parser.add_argument('--latencia', type=float, default=2.0,
+                            help='Demora agregada a cada consulta SQL, en ms (simula una base remota)')
+
+    def handle(self, *args, **options):
+        if options['modo'] == 'ambos':
+            # Cada modo en su propio proceso: las URL se eligen al importarlas
+            for modo in ('wsgi', 'asgi'):
+                self._ejecutar_proceso(modo, options)
+            self.stdout.write(self.style.SUCCESS('\nProceso completado.'))
+            return
+
+        rutas, cookie = self._preparar()
+        if not cookie:
+            self.stdout.write(self.style.WARNING('No hay superusuarios: se omiten las rutas de la API'))
+            rutas = [ruta for ruta in rutas if not ruta.startswith('/api/')]
+        self._demorar_consultas(options['latencia'] / 1000)
+
+        solicitudes = [rutas[i % len(rutas)] for i in range(options['solicitudes'])]
+        if options['modo'] == 'wsgi':
+            duraciones, estados, total = self._medir_wsgi(solicitudes, cookie, options)
+            titulo = f'WSGI ({options["trabajadores"]} hilos)'
+        else:
+            duraciones, estados, total = asyncio.run(self._medir_asgi(solicitudes, cookie, options))
+            titulo = 'ASGI (un event loop)'
+
+        duraciones.sort()
+        errores = sum(1 for estado in estados if estado >= 400)
+        self.stdout.write(self.style.WARNING(
+            f'\n{titulo}, {options["concurrencia"]} clientes simultáneos, '
+            f'{options["latencia"]:g} ms por consulta'
+        ))
+        self.stdout.write(f'  solicitudes por segundo: {len(duraciones) / total:.1f}')
+        self.stdout.write(f'  latencia p50: {self._percentil(duraciones, 0.5) * 1000:.1f} ms')
+        self.stdout.write(f'  latencia p95: {self._percentil(duraciones, 0.95) * 1000:.1f} ms')
+        if errores:
+            self.stdout.write(self.style.ERROR(f'  respuestas con error: {errores}'))
+
+    def _ejecutar_proceso(self, modo, options):
+        entorno = dict(os.environ, VISTAS_ASYNC='True' if modo == 'asgi' else 'False')
+        comando = [
+            sys.executable, '-m', 'django', 'benchmark_asgi', '--modo', modo,
+            '--trabajadores', str(options['trabajadores']),
+            '--concurrencia', str(options['concurrencia']),
+            '--solicitudes', str(options['solicitudes']),
+            '--latencia', str(options['latencia']),
+        ]
+        resultado = subprocess.run(
+            comando, env=entorno, cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        self.stdout.write(resultado.stdout.rstrip('\n'))
+        if resultado.returncode:
+            self.stdout.write(self.style.ERROR(resultado.stderr))
+
+    def _preparar(self):
+        """
+        Retorna las rutas a consultar y la cookie de una sesión de superusuario.
+        """
+        cliente = Cliente.objects.order_by('pk').first()
+        rutas = ['/', '/clientes/', '/api/clientes/estadisticas/']
+        if cliente:
+            rutas += [f'/clientes/{cliente.pk}/', f'/api/clientes/buscar_por_cuit/?cuit={cliente.cuit}']
+
+        usuario = get_user_model().objects.filter(is_superuser=True, is_active=True).first()
+        if usuario is None:
+            return rutas, ''
+        sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+        sesion[SESSION_KEY] = str(usuario.pk)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sesion.create()
+        return rutas, f'{settings.SESSION_COOKIE_NAME}={sesion.session_key}'
+
+    def _demorar_consultas(self, segundos):
+        if not segundos:
+            return
+
+        def demorar(execute, sql, params, many, context):
+            time.sleep(segundos)
+            return execute(sql, params, many, context)
+
+        def agregar(sender, connection, **kwargs):
+            if demorar not in connection.execute_wrappers:
+                connection.execute_wrappers.append(demorar)
+
+        # Cada hilo tiene su propia conexión, que se reabre en cada solicitud
+        connection_created.connect(agregar, weak=False)
+
+    def _medir_wsgi(self, solicitudes, cookie, options):
+        aplicacion = get_wsgi_application()
+        pendientes = iter(solicitudes)
+        lock = threading.Lock()
+        duraciones = []
+        estados = []
+
+        # Los clientes esperan un hilo libre en orden, como en la cola de un
+        # worker gthread
+        with ThreadPoolExecutor(max_workers=options['trabajadores']) as servidor:
+
+            def cliente():
+                while True:
+                    with lock:
+                        ruta = next(pendientes, None)
+                    if ruta is None:
+                        return
+                    inicio = time.perf_counter()
+                    estado = servidor.submit(self._solicitar_wsgi, aplicacion, ruta, cookie).result()
+                    with lock:
+                        duraciones.append(time.perf_counter() - inicio)
+                        estados.append(estado)
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrencia']) as clientes:
+                for _ in range(options['concurrencia']):
+                    clientes.submit(cliente)
+            total = time.perf_counter() - inicio
+        return duraciones, estados, total
+
+    def _solicitar_wsgi(self, aplicacion, ruta, cookie):
+        camino, _, consulta = ruta.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': camino, 'QUERY_STRING': consulta,
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie, 'HTTP_ACCEPT': 'application/json',
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        estado = []
+        cuerpo = aplicacion(environ, lambda status, headers, exc_info=None: estado.append(status))
+        try:
+            b''.join(cuerpo)
+        finally:
+            if hasattr(cuerpo, 'close'):
+                cuerpo.close()
+        return int(estado[0].split()[0])
+
+    async def _medir_asgi(self, solicitudes, cookie, options):
+        aplicacion = get_asgi_application()
+        pendientes = iter(solicitudes)
+        duraciones = []
+        estados = []
+
+        async def cliente():
+            for ruta in pendientes:
+                inicio = time.perf_counter()
+                estados.append(await self._solicitar_asgi(aplicacion, ruta, cookie))
+                duraciones.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(options['concurrencia'])))
+        return duraciones, estados, time.perf_counter() - inicio
+
+    async def _solicitar_asgi(self, aplicacion, ruta, cookie):
+        camino, _, consulta = ruta.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': camino, 'raw_path': camino.encode(), 'root_path': '',
+            'query_string': consulta.encode(), 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode()), (b'accept', b'application/json')],
+        }
+        enviado = False
+        estado = []
+
+        async def recibir():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # Sin desconexión: Django cancela esta espera al terminar la respuesta
+            await asyncio.Event().wait()
+
+        async def enviar(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                estado.append(mensaje['status'])
+
+        await aplicacion(scope, recibir, enviar)
+        return estado[0]
+
+    def _percentil(self, valores, fraccion):
+        return valores[min(len(valores) - 1, int(len(valores) * fraccion))]
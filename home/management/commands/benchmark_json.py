@@ -0,0 +1,57 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from clientes.models import Cliente
+from clientes.serializers import ClienteSerializer
+from home.middleware import CALIDAD_BROTLI, brotli
+from home.renderers import JSONRendererRapido
+
+
+class Command(BaseCommand):
+    help = 'Medir codificación JSON y bytes transferidos de páginas de clientes de la API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanios', type=int, nargs='+', default=[20, 500, 5000])
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        ahora = timezone.now()
+        for tamanio in options['tamanios']:
+            clientes = [
+                Cliente(
+                    pk=pk, nombre=f'CLIENTE DE PRUEBA {pk} S.A.', cuit=f'30-{pk:08d}-1',
+                    domicilio=f'Av. Corrientes {pk}, CABA', clave_fiscal='clave', activo=pk % 5 != 0,
+                    carpeta=f'/clientes/{pk}', fecha_creacion=ahora, fecha_modificacion=ahora,
+                )
+                for pk in range(1, tamanio + 1)
+            ]
+            datos = {
+                'count': tamanio, 'next': None, 'previous': None,
+                'results': ClienteSerializer(clientes, many=True).data,
+            }
+
+            estandar = self._medir(JSONRenderer(), datos, options['repeticiones'])
+            rapido = self._medir(JSONRendererRapido(), datos, options['repeticiones'])
+            contenido = JSONRendererRapido().render(datos)
+            comprimido_gzip = gzip.compress(contenido, compresslevel=6)
+
+            self.stdout.write(self.style.WARNING(f'\nPágina de {tamanio} clientes'))
+            self.stdout.write(f'  json estándar: {estandar * 1000:.2f} ms')
+            self.stdout.write(f'  renderer rápido: {rapido * 1000:.2f} ms ({estandar / rapido:.1f}x)')
+            self.stdout.write(f'  sin comprimir: {len(contenido):,} bytes')
+            self.stdout.write(f'  gzip: {len(comprimido_gzip):,} bytes')
+            if brotli is not None:
+                comprimido_br = brotli.compress(contenido, quality=CALIDAD_BROTLI)
+                self.stdout.write(f'  brotli: {len(comprimido_br):,} bytes')
+
+        self.stdout.write(self.style.SUCCESS('\nProceso completado.'))
+
+    def _medir(self, renderer, datos, repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            renderer.render(datos)
+        return (time.perf_counter() - inicio) / repeticiones
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+
+from home.respaldo import TAMANIO_LOTE, ErrorRespaldo, leer_manifiesto, restaurar
+
+
+class Command(BaseCommand):
+    help = 'Restaurar un backup generado con backup_db (reemplaza el contenido de las tablas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('origen', help='Directorio del backup')
+        parser.add_argument('--database', default='default',
+                            help='Base en la que se restaura. En paralelo un error deja la base incompleta: '
+                                 'lo más seguro es restaurar en una base nueva y migrada y pasar a usarla al terminar')
+        parser.add_argument('--procesos', type=int, default=4,
+                            help='Procesos que restauran modelos en paralelo (en SQLite siempre 1)')
+        parser.add_argument('--lote', type=int, default=TAMANIO_LOTE)
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='No pedir confirmación')
+
+    def handle(self, *args, **options):
+        try:
+            manifiesto = leer_manifiesto(options['origen'])
+        except ErrorRespaldo as e:
+            raise CommandError(str(e))
+
+        if options['interactive']:
+            respuesta = input(
+                f'Se reemplazará el contenido de {len(manifiesto["modelos"])} tablas con el backup '
+                f'del {manifiesto["creado"]}. ¿Continuar? [s/N] '
+            )
+            if respuesta.strip().lower() not in ('s', 'si', 'sí'):
+                self.stdout.write(self.style.WARNING('Restauración cancelada'))
+                return
+
+        inicio = time.perf_counter()
+        try:
+            cantidades = restaurar(
+                options['origen'], alias=options['database'], procesos=options['procesos'],
+                lote=options['lote'], informar=self._informar,
+            )
+        except ErrorRespaldo as e:
+            raise CommandError(str(e))
+        duracion = time.perf_counter() - inicio
+        ContentType.objects.clear_cache()
+
+        filas = sum(cantidades.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {len(cantidades)} modelos, {filas:,} filas verificadas '
+            f'en {duracion:.1f} s ({filas / duracion:,.0f} filas/s).'
+        ))
+
+    def _informar(self, modelo, parte, segundos):
+        if parte['filas']:
+            self.stdout.write(
+                f'{parte["archivo"]}: {parte["filas"]:,} filas ({parte["filas"] / max(segundos, 1e-6):,.0f} filas/s)'
+            )
@@ -0,0 +1,141 @@
+"""
+Compresión de respuestas negociada por `Accept-Encoding` y archivos
+estáticos servidos también bajo ASGI.
+
+Usa brotli cuando el cliente lo acepta y el paquete está instalado, y si no
+gzip con el `GZipMiddleware` de Django. Las páginas HTML, que llevan el token
+CSRF y pueden mostrar claves, siempre van con gzip: Django le agrega relleno
+de largo aleatorio como mitigación de BREACH y brotli no lo tiene. Las respuestas en streaming se
+comprimen bloque a bloque, vaciando el compresor en cada uno para que el
+cliente reciba los datos a medida que se generan.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Calidad de brotli (0 a 11): 5 comprime mejor que gzip a un costo similar
+CALIDAD_BROTLI = 5
+
+TAMANIO_MINIMO = 200
+
+# Tipos de contenido que no se comprimen con brotli (ver BREACH arriba)
+TIPOS_SIN_BROTLI = ('text/html', 'application/xhtml+xml')
+
+
+def acepta_codificacion(accept_encoding, codificacion):
+    """
+    Indica si el encabezado Accept-Encoding acepta la codificación con q > 0.
+    """
+    for opcion in accept_encoding.split(','):
+        nombre, _, parametros = opcion.strip().partition(';')
+        if nombre.strip().lower() != codificacion:
+            continue
+        parametros = parametros.replace(' ', '')
+        if parametros.startswith('q='):
+            try:
+                return float(parametros[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def comprimir_secuencia_brotli(secuencia):
+    compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+    for bloque in secuencia:
+        salida = compresor.process(bloque) + compresor.flush()
+        if salida:
+            yield salida
+    yield compresor.finish()
+
+
+async def comprimir_secuencia_brotli_async(secuencia):
+    compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+    async for bloque in secuencia:
+        salida = compresor.process(bloque) + compresor.flush()
+        if salida:
+            yield salida
+    yield compresor.finish()
+
+
+class CompresionMiddleware(GZipMiddleware):
+    """
+    `GZipMiddleware` con brotli para los clientes que lo aceptan.
+    """
+
+    def process_response(self, request, response):
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        tipo = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if (
+            brotli is None
+            or tipo in TIPOS_SIN_BROTLI
+            or not acepta_codificacion(accept_encoding, 'br')
+        ):
+            return super().process_response(request, response)
+
+        if not response.streaming and len(response.content) < TAMANIO_MINIMO:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = comprimir_secuencia_brotli_async(response.streaming_content)
+            else:
+                response.streaming_content = comprimir_secuencia_brotli(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            comprimido = brotli.compress(response.content, quality=CALIDAD_BROTLI)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class ArchivosEstaticosMiddleware(WhiteNoiseMiddleware):
+    """
+    `WhiteNoiseMiddleware` que además admite una cadena asíncrona.
+
+    WhiteNoise es solo sincrónico: bajo ASGI Django adapta todo lo que está
+    debajo a sincrónico y las vistas asíncronas vuelven a correr en un hilo.
+    Buscar el archivo es una consulta a un diccionario (o al disco con
+    autorefresh, solo en desarrollo), así que puede hacerse en el event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,70 @@
+"""
+Renderer y parser JSON de la API basados en orjson.
+
+orjson codifica directamente a bytes, varias veces más rápido que el módulo
+`json` de la biblioteca estándar, y entiende fechas, UUID y dataclasses sin
+conversiones previas. Los Decimal y los textos traducibles se convierten a
+texto. Si orjson no está instalado se usan el renderer y el parser JSON de
+DRF.
+"""
+
+from decimal import Decimal
+
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _convertir(valor):
+    if isinstance(valor, (Decimal, Promise)):
+        return str(valor)
+    if hasattr(valor, 'tolist'):
+        return valor.tolist()
+    if hasattr(valor, '__iter__'):
+        return list(valor)
+    raise TypeError(f'{type(valor).__name__} no es serializable a JSON')
+
+
+class JSONRendererRapido(BaseRenderer if orjson else JSONRenderer):
+    """
+    Renderer JSON con orjson. Respeta `indent` en el media type aceptado
+    (como la API navegable) con indentación de dos espacios.
+    """
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        opciones = orjson.OPT_NON_STR_KEYS
+        if 'indent' in (accepted_media_type or '') or (renderer_context or {}).get('indent'):
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_convertir, option=opciones)
+
+
+class JSONParserRapido(BaseParser if orjson else JSONParser):
+    """
+    Parser JSON con orjson.
+    """
+
+    media_type = 'application/json'
+    renderer_class = JSONRendererRapido
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read() if stream is not None else b'')
+        except orjson.JSONDecodeError as e:
+            raise ParseError(f'JSON inválido: {e}')
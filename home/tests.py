@@ -1,3 +1,51 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 
-# Create your tests here.
+from . import autenticacion
+
+
+class InvalidacionUsuarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo = ContentType.objects.get_for_model(User)
+        cls.permiso = Permission.objects.create(codename='ver_prueba', name='Ver prueba', content_type=tipo)
+        cls.grupo = Group.objects.create(name='Prueba')
+        cls.grupo.permissions.add(cls.permiso)
+        cls.por_grupo = User.objects.create_user('por-grupo')
+        cls.por_grupo.groups.add(cls.grupo)
+        cls.directo = User.objects.create_user('directo')
+        cls.directo.user_permissions.add(cls.permiso)
+        cls.ajeno = User.objects.create_user('ajeno')
+
+    def setUp(self):
+        self.usuarios = [self.por_grupo, self.directo, self.ajeno]
+        claves = [autenticacion.clave_usuario(usuario.pk) for usuario in self.usuarios]
+        self.addCleanup(autenticacion.cache.delete_many, claves)
+        backend = autenticacion.ModelBackendCacheado()
+        for usuario in self.usuarios:
+            backend.get_user(usuario.pk)
+
+    def _cacheados(self):
+        return [
+            usuario.username for usuario in self.usuarios
+            if autenticacion.cache.get(autenticacion.clave_usuario(usuario.pk)) is not None
+        ]
+
+    def test_cambio_de_grupos(self):
+        self.assertEqual(self._cacheados(), ['por-grupo', 'directo', 'ajeno'])
+
+        self.grupo.permissions.clear()
+
+        self.assertEqual(self._cacheados(), ['directo', 'ajeno'])
+
+    def test_borrar_grupo(self):
+        self.grupo.delete()
+
+        self.assertEqual(self._cacheados(), ['directo', 'ajeno'])
+
+    def test_borrar_permiso(self):
+        self.permiso.delete()
+
+        self.assertEqual(self._cacheados(), ['ajeno'])
@@ -1,8 +1,9 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 app_name = 'home'
 
 urlpatterns = [
-    path('', views.home_view, name='index'),
+    path('', views.home_view_async if settings.VISTAS_ASYNC else views.home_view, name='index'),
 ]
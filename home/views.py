@@ -1,5 +1,15 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q
 from django.shortcuts import render
-from clientes.models import Cliente
+from clientes.models import Cliente, ClienteArchivado, EstadoBackup
+
+
+ESTADOS_CON_PROBLEMAS = [EstadoBackup.DESACTUALIZADO, EstadoBackup.FALTANTE, EstadoBackup.ERROR]
+
+# Cantidad de backups con problemas que se listan en el dashboard
+LIMITE_BACKUPS = 20
 
 
 def home_view(request):
@@ -7,15 +17,53 @@ def home_view(request):
     Vista principal del estudio contable.
     Muestra un dashboard con estadísticas y accesos rápidos.
     """
-    # Estadísticas básicas
-    total_clientes = Cliente.objects.count()
+    # Estadísticas básicas; los clientes archivados cuentan como inactivos
+    total_clientes = Cliente.objects.count() + ClienteArchivado.objects.count()
     clientes_activos = Cliente.objects.filter(activo=True).count()
     clientes_inactivos = total_clientes - clientes_activos
     
+    # Backups desactualizados, faltantes o ilegibles según la última verificación
+    backups = EstadoBackup.objects.filter(estado__in=ESTADOS_CON_PROBLEMAS)
+    
     context = {
         'total_clientes': total_clientes,
         'clientes_activos': clientes_activos,
         'clientes_inactivos': clientes_inactivos,
+        'total_backups_con_problemas': backups.count(),
+        'backups_con_problemas': backups.select_related('cliente').order_by('fecha_backup')[:LIMITE_BACKUPS],
     }
     
     return render(request, 'home/index.html', context)
+
+
+async def home_view_async(request):
+    """
+    Versión asíncrona de `home_view` para ASGI.
+    
+    Los totales salen de una sola consulta agregada y se piden junto con los
+    backups a revisar; la plantilla se dibuja con los datos ya cargados.
+    """
+    backups = EstadoBackup.objects.filter(estado__in=ESTADOS_CON_PROBLEMAS)
+    
+    totales, archivados, total_backups, backups_con_problemas = await asyncio.gather(
+        Cliente.objects.aaggregate(total=Count('pk'), activos=Count('pk', filter=Q(activo=True))),
+        ClienteArchivado.objects.acount(),
+        backups.acount(),
+        _listar(backups.select_related('cliente').order_by('fecha_backup')[:LIMITE_BACKUPS]),
+    )
+    total_clientes = totales['total'] + archivados
+    
+    context = {
+        'total_clientes': total_clientes,
+        'clientes_activos': totales['activos'],
+        'clientes_inactivos': total_clientes - totales['activos'],
+        'total_backups_con_problemas': total_backups,
+        'backups_con_problemas': backups_con_problemas,
+    }
+    
+    # El usuario y los mensajes del contexto se resuelven fuera del event loop
+    return await sync_to_async(render)(request, 'home/index.html', context)
+
+
+async def _listar(queryset):
+    return [objeto async for objeto in queryset]
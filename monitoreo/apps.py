@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+
+
+class MonitoreoConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoreo'
+
+    def ready(self):
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        from .middleware import instalar_contador
+
+        connection_created.connect(instalar_contador, dispatch_uid='monitoreo_contar_consultas')
+        # Las conexiones que otras apps ya abrieron en su ready()
+        for conexion in connections.all(initialized_only=True):
+            if conexion.connection is not None:
+                instalar_contador(None, conexion)
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from monitoreo.middleware import MetricasMiddleware
+
+
+class Command(BaseCommand):
+    help = 'Medir el costo por solicitud del middleware de métricas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solicitudes', type=int, default=100000)
+        parser.add_argument(
+            '--presupuesto', type=float, default=50,
+            help='Costo máximo aceptable por solicitud, en microsegundos'
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options['solicitudes']
+        request = RequestFactory().get('/clientes/')
+        request.resolver_match = resolve('/clientes/')
+
+        def vista(request):
+            return HttpResponse()
+
+        middleware = MetricasMiddleware(vista)
+
+        inicio = time.perf_counter()
+        for _ in range(cantidad):
+            vista(request)
+        base = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for _ in range(cantidad):
+            middleware(request)
+        medido = time.perf_counter() - inicio
+
+        costo = (medido - base) / cantidad * 1e6
+        self.stdout.write(f'Solicitudes: {cantidad}')
+        self.stdout.write(f'Costo del middleware: {costo:.1f} µs por solicitud')
+
+        if costo > options['presupuesto']:
+            self.stdout.write(self.style.ERROR(
+                f'\nProceso completado. Supera el presupuesto de {options["presupuesto"]:.0f} µs.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'\nProceso completado. Dentro del presupuesto de {options["presupuesto"]:.0f} µs.'
+            ))
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoreo.perfilador import funciones_principales, leer_perfiles, nombre_archivo
+
+
+class Command(BaseCommand):
+    help = 'Resumir las funciones más costosas por vista según los perfiles muestreados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=1, help='Ventana de tiempo hacia atrás')
+        parser.add_argument('--vista', help='Nombre de la vista (por ejemplo clientes:lista)')
+        parser.add_argument('--top', type=int, default=15, help='Funciones a mostrar por vista')
+        parser.add_argument(
+            '--exportar', metavar='ARCHIVO',
+            help='Guardar las pilas combinadas en formato folded para generar un flame graph'
+        )
+
+    def handle(self, *args, **options):
+        directorio = getattr(settings, 'PERFILADOR_DIR', None)
+        if not directorio:
+            raise CommandError('PERFILADOR_DIR no está configurado')
+
+        desde = datetime.now() - timedelta(hours=options['horas'])
+        perfiles = leer_perfiles(directorio, desde)
+        if options['vista']:
+            vista = nombre_archivo(options['vista'])
+            perfiles = {vista: perfiles[vista]} if vista in perfiles else {}
+
+        for vista, pilas in sorted(perfiles.items(), key=lambda item: -sum(item[1].values())):
+            total = sum(pilas.values())
+            self.stdout.write(self.style.WARNING(f'\n{vista} ({total} muestras)'))
+            self.stdout.write(f'  {"propias":>8} {"totales":>8}  función')
+            for marco, propias, totales in funciones_principales(pilas, options['top']):
+                self.stdout.write(
+                    f'  {propias / total:>8.1%} {totales / total:>8.1%}  {marco}'
+                )
+
+        if options['exportar']:
+            with open(options['exportar'], 'w') as archivo:
+                for vista, pilas in perfiles.items():
+                    for pila, muestras in pilas.items():
+                        archivo.write(f'{vista};{pila} {muestras}\n')
+            self.stdout.write(f'\nPilas exportadas a {options["exportar"]}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProceso completado. {len(perfiles)} vistas con perfiles desde {desde:%d/%m/%Y %H:%M}.'
+        ))
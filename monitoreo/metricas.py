@@ -0,0 +1,190 @@
+"""
+Registro de métricas en memoria con exposición en formato de texto de
+Prometheus.
+
+Cada proceso acumula sus contadores e histogramas en memoria. Con varios
+workers de gunicorn, cada uno vuelca su registro a un archivo propio en
+`METRICAS_DIR` (como máximo cada `METRICAS_INTERVALO` segundos y siempre
+antes de exponer) y `/metrics` suma los archivos de todos los procesos. Los
+archivos de workers que ya terminaron se conservan, para que los contadores
+nunca retrocedan; el directorio debe vaciarse antes de arrancar gunicorn.
+Sin `METRICAS_DIR` se exponen solo las métricas del proceso que atiende la
+consulta.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+
+DIRECTORIO = getattr(settings, 'METRICAS_DIR', None)
+
+INTERVALO_VOLCADO = getattr(settings, 'METRICAS_INTERVALO', 5)
+
+# Límites superiores (segundos) de los buckets de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+DESCRIPCIONES = {
+    'http_solicitudes_total': ('counter', 'Solicitudes atendidas por vista, método y código de estado'),
+    'http_duracion_segundos': ('histogram', 'Duración de las solicitudes por vista'),
+    'http_excepciones_total': ('counter', 'Excepciones no capturadas por vista y tipo'),
+    'errores_capturados_total': ('counter', 'Errores capturados por las vistas y mostrados al usuario'),
+    'db_consultas_total': ('counter', 'Consultas SQL ejecutadas por vista'),
+    'cache_consultas_total': ('counter', 'Consultas a cachés internas por caché y resultado'),
+}
+
+
+class Registro:
+    """
+    Contadores e histogramas del proceso, indexados por (nombre, etiquetas).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = defaultdict(float)
+        self.histogramas = {}
+        self._ultimo_volcado = 0.0
+
+    def incrementar(self, nombre, etiquetas=(), valor=1):
+        with self._lock:
+            self.contadores[(nombre, etiquetas)] += valor
+
+    def observar(self, nombre, etiquetas, valor):
+        with self._lock:
+            clave = (nombre, etiquetas)
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                # Un contador por bucket, más la suma y la cantidad
+                histograma = self.histogramas[clave] = [0] * len(BUCKETS) + [0.0, 0]
+            for indice, limite in enumerate(BUCKETS):
+                if valor <= limite:
+                    histograma[indice] += 1
+                    break
+            histograma[-2] += valor
+            histograma[-1] += 1
+
+    def instantanea(self):
+        with self._lock:
+            return {
+                'contadores': [[nombre, list(etiquetas), valor]
+                               for (nombre, etiquetas), valor in self.contadores.items()],
+                'histogramas': [[nombre, list(etiquetas), list(valores)]
+                                for (nombre, etiquetas), valores in self.histogramas.items()],
+            }
+
+    def volcar(self, forzar=False):
+        """
+        Escribe el registro en el archivo del proceso si pasó el intervalo.
+        """
+        if not DIRECTORIO:
+            return
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_volcado < INTERVALO_VOLCADO:
+            return
+        self._ultimo_volcado = ahora
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        ruta = os.path.join(DIRECTORIO, f'metricas-{os.getpid()}.json')
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w') as archivo:
+            json.dump(self.instantanea(), archivo)
+        os.replace(temporal, ruta)
+
+
+registro = Registro()
+
+
+def contar_cache(cache, acierto, cantidad=1):
+    """
+    Registra consultas a una caché interna (aciertos o fallos).
+    """
+    if cantidad:
+        registro.incrementar(
+            'cache_consultas_total', (('cache', cache), ('resultado', 'acierto' if acierto else 'fallo')), cantidad
+        )
+
+
+def registrar_error(request, error):
+    """
+    Registra un error que una vista capturó para mostrarlo como mensaje.
+    """
+    vista = request.resolver_match.view_name if request.resolver_match else 'sin_ruta'
+    registro.incrementar(
+        'errores_capturados_total', (('vista', vista), ('error', type(error).__name__))
+    )
+
+
+def _instantaneas():
+    if not DIRECTORIO:
+        yield registro.instantanea()
+        return
+    registro.volcar(forzar=True)
+    for nombre in os.listdir(DIRECTORIO):
+        if not nombre.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(DIRECTORIO, nombre)) as archivo:
+                yield json.load(archivo)
+        except (OSError, ValueError):
+            continue
+
+
+def combinar():
+    """
+    Suma las métricas de todos los procesos.
+    """
+    contadores = defaultdict(float)
+    histogramas = {}
+    for instantanea in _instantaneas():
+        for nombre, etiquetas, valor in instantanea['contadores']:
+            contadores[(nombre, tuple(map(tuple, etiquetas)))] += valor
+        for nombre, etiquetas, valores in instantanea['histogramas']:
+            clave = (nombre, tuple(map(tuple, etiquetas)))
+            previos = histogramas.get(clave)
+            histogramas[clave] = valores if previos is None else [a + b for a, b in zip(previos, valores)]
+    return contadores, histogramas
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    valores = ','.join(
+        '{}="{}"'.format(clave, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for clave, valor in etiquetas
+    )
+    return '{' + valores + '}'
+
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def exponer():
+    """
+    Retorna todas las métricas en formato de texto de Prometheus.
+    """
+    contadores, histogramas = combinar()
+    series = defaultdict(list)
+    for (nombre, etiquetas), valor in sorted(contadores.items()):
+        series[nombre].append(f'{nombre}{_etiquetas(etiquetas)} {_numero(valor)}')
+    for (nombre, etiquetas), valores in sorted(histogramas.items()):
+        acumulado = 0
+        for limite, cantidad in zip(BUCKETS, valores):
+            acumulado += cantidad
+            series[nombre].append(
+                f'{nombre}_bucket{_etiquetas(etiquetas + (("le", _numero(limite)),))} {acumulado}'
+            )
+        series[nombre].append(f'{nombre}_bucket{_etiquetas(etiquetas + (("le", "+Inf"),))} {valores[-1]}')
+        series[nombre].append(f'{nombre}_sum{_etiquetas(etiquetas)} {_numero(valores[-2])}')
+        series[nombre].append(f'{nombre}_count{_etiquetas(etiquetas)} {valores[-1]}')
+
+    lineas = []
+    for nombre in sorted(series):
+        tipo, descripcion = DESCRIPCIONES.get(nombre, ('untyped', ''))
+        lineas.append(f'# HELP {nombre} {descripcion}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        lineas.extend(series[nombre])
+    return '\n'.join(lineas) + '\n'
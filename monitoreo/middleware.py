@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metricas import registro
+from .perfilador import acumulador, muestreador
+
+
+METODOS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# Consultas de la solicitud en curso. Es una variable de contexto porque el
+# ORM asíncrono ejecuta las consultas en otro hilo y con otra conexión; el
+# contexto se copia a ese hilo y la lista es la misma
+consultas_solicitud = ContextVar('consultas_solicitud', default=None)
+
+
+def contar_consulta(execute, sql, params, many, context):
+    contador = consultas_solicitud.get()
+    if contador is not None:
+        contador[0] += 1
+    return execute(sql, params, many, context)
+
+
+def instalar_contador(sender, connection, **kwargs):
+    """
+    Receptor de `connection_created`: cuenta las consultas de cada conexión.
+    El mismo objeto de conexión se reconecta en cada solicitud, así que el
+    contador se agrega una sola vez.
+    """
+    if contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consulta)
+
+
+class MetricasMiddleware:
+    """
+    Mide la latencia, el código de estado y la cantidad de consultas SQL de
+    cada solicitud, etiquetadas por el nombre de la URL resuelta.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        contador = [0]
+        token = consultas_solicitud.set(contador)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            consultas_solicitud.reset(token)
+        self._registrar(request, response, time.perf_counter() - inicio, contador[0])
+        return response
+
+    async def __acall__(self, request):
+        contador = [0]
+        token = consultas_solicitud.set(contador)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            consultas_solicitud.reset(token)
+        self._registrar(request, response, time.perf_counter() - inicio, contador[0])
+        return response
+
+    def _registrar(self, request, response, duracion, consultas):
+        vista = _vista(request)
+        metodo = request.method if request.method in METODOS else 'OTRO'
+        registro.incrementar(
+            'http_solicitudes_total',
+            (('vista', vista), ('metodo', metodo), ('estado', str(response.status_code))),
+        )
+        registro.observar('http_duracion_segundos', (('vista', vista),), duracion)
+        if consultas:
+            registro.incrementar('db_consultas_total', (('vista', vista),), consultas)
+        registro.volcar()
+
+    def process_exception(self, request, exception):
+        registro.incrementar(
+            'http_excepciones_total', (('vista', _vista(request)), ('excepcion', type(exception).__name__))
+        )
+
+
+def _vista(request):
+    # Las URL sin resolver (404) se agrupan para no crear una serie por ruta
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'sin_ruta'
+
+
+class PerfiladorMiddleware:
+    """
+    Perfila por muestreo una fracción de las solicitudes
+    (`PERFILADOR_FRACCION`) y las de usuarios staff que envían el encabezado
+    `X-Perfilar`. Debe ir después de `AuthenticationMiddleware`.
+
+    Bajo ASGI las solicitudes comparten hilos y el muestreo por hilo
+    mezclaría sus pilas, así que en modo asíncrono no se perfila.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.fraccion = getattr(settings, 'PERFILADOR_FRACCION', 0)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        if not self._perfilar(request):
+            return self.get_response(request)
+
+        hilo = threading.get_ident()
+        muestreador.iniciar(hilo)
+        try:
+            response = self.get_response(request)
+        finally:
+            pilas = muestreador.terminar(hilo)
+        if pilas:
+            acumulador.agregar(_vista(request), pilas)
+        return response
+
+    def _perfilar(self, request):
+        if not acumulador.directorio:
+            return False
+        if self.fraccion and random.random() < self.fraccion:
+            return True
+        if 'X-Perfilar' in request.headers:
+            usuario = getattr(request, 'user', None)
+            return bool(usuario and usuario.is_staff)
+        return False
@@ -0,0 +1,194 @@
+"""
+Perfilado por muestreo de solicitudes en producción.
+
+Un hilo por proceso toma cada `PERFILADOR_INTERVALO` segundos la pila de los
+hilos que están atendiendo una solicitud perfilada (`sys._current_frames`),
+así que el costo no depende de cuántas funciones ejecuta la vista y es nulo
+cuando no hay solicitudes perfiladas.
+
+Las pilas se acumulan por vista y por hora en formato "folded"
+(`a;b;c cantidad`, el que leen flamegraph.pl y speedscope) y cada proceso
+vuelca las suyas a `PERFILADOR_DIR/AAAAMMDDHH/<vista>.<pid>.folded`.
+`resumen_perfiles` las combina para una ventana de tiempo.
+"""
+
+import atexit
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from django.conf import settings
+
+
+DIRECTORIO = getattr(settings, 'PERFILADOR_DIR', None)
+
+INTERVALO = getattr(settings, 'PERFILADOR_INTERVALO', 0.005)
+
+INTERVALO_VOLCADO = 30
+
+PROFUNDIDAD_MAXIMA = 80
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BIBLIOTECA_ESTANDAR = sysconfig.get_paths()['stdlib']
+
+
+def nombre_archivo(vista):
+    """Convierte el nombre de una vista en un nombre de archivo seguro"""
+    return ''.join(c if c.isalnum() or c in '-_' else '.' for c in vista) or 'sin_ruta'
+
+
+def _marco(codigo):
+    archivo = codigo.co_filename
+    if archivo.startswith(RAIZ):
+        archivo = os.path.relpath(archivo, RAIZ)
+    elif archivo.startswith(BIBLIOTECA_ESTANDAR):
+        archivo = os.path.relpath(archivo, BIBLIOTECA_ESTANDAR)
+    else:
+        # De las librerías alcanza con el camino desde site-packages
+        archivo = archivo.rsplit('site-packages' + os.sep, 1)[-1]
+    return f'{codigo.co_name} ({archivo}:{codigo.co_firstlineno})'.replace(';', ',')
+
+
+def pila(frame):
+    """Pila del frame en formato folded, de la raíz a la hoja"""
+    marcos = []
+    while frame is not None and len(marcos) < PROFUNDIDAD_MAXIMA:
+        marcos.append(_marco(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(marcos))
+
+
+class Muestreador:
+    """
+    Hilo que muestrea las pilas de los hilos registrados.
+    """
+
+    def __init__(self, intervalo=INTERVALO):
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._activos = {}
+        self._hay_activos = threading.Event()
+        self._hilo = None
+
+    def iniciar(self, hilo):
+        with self._lock:
+            self._activos[hilo] = Counter()
+            self._hay_activos.set()
+            if self._hilo is None or not self._hilo.is_alive():
+                # Después de un fork el hilo del proceso padre no existe
+                self._hilo = threading.Thread(target=self._muestrear, name='perfilador', daemon=True)
+                self._hilo.start()
+
+    def terminar(self, hilo):
+        with self._lock:
+            pilas = self._activos.pop(hilo, Counter())
+            if not self._activos:
+                self._hay_activos.clear()
+        return pilas
+
+    def _muestrear(self):
+        while True:
+            self._hay_activos.wait()
+            time.sleep(self.intervalo)
+            marcos = sys._current_frames()
+            with self._lock:
+                for hilo, pilas in self._activos.items():
+                    frame = marcos.get(hilo)
+                    if frame is not None:
+                        pilas[pila(frame)] += 1
+
+
+class Acumulador:
+    """
+    Pilas del proceso por (hora, vista), volcadas periódicamente a disco.
+    """
+
+    def __init__(self, directorio=DIRECTORIO):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self._pilas = defaultdict(Counter)
+        self._ultimo_volcado = time.monotonic()
+
+    def agregar(self, vista, pilas):
+        hora = datetime.now().strftime('%Y%m%d%H')
+        with self._lock:
+            self._pilas[(hora, vista)].update(pilas)
+        if time.monotonic() - self._ultimo_volcado >= INTERVALO_VOLCADO:
+            self.volcar()
+
+    def volcar(self):
+        """
+        Reescribe los archivos de este proceso y descarta las horas pasadas,
+        que ya no van a recibir muestras.
+        """
+        if not self.directorio:
+            return
+        self._ultimo_volcado = time.monotonic()
+        hora_actual = datetime.now().strftime('%Y%m%d%H')
+        with self._lock:
+            pendientes = list(self._pilas.items())
+            for clave in [clave for clave in self._pilas if clave[0] != hora_actual]:
+                del self._pilas[clave]
+        for (hora, vista), pilas in pendientes:
+            carpeta = os.path.join(self.directorio, hora)
+            os.makedirs(carpeta, exist_ok=True)
+            ruta = os.path.join(carpeta, f'{nombre_archivo(vista)}.{os.getpid()}.folded')
+            temporal = f'{ruta}.tmp'
+            with open(temporal, 'w') as archivo:
+                for linea, cantidad in pilas.items():
+                    archivo.write(f'{linea} {cantidad}\n')
+            os.replace(temporal, ruta)
+
+
+muestreador = Muestreador()
+
+acumulador = Acumulador()
+
+# Los workers que terminan de forma ordenada vuelcan sus últimas muestras
+atexit.register(acumulador.volcar)
+
+
+def leer_perfiles(directorio, desde):
+    """
+    Combina los archivos folded de las horas posteriores a `desde`.
+    Retorna {vista: Counter(pila → muestras)}.
+    """
+    limite = desde.strftime('%Y%m%d%H')
+    perfiles = defaultdict(Counter)
+    if not os.path.isdir(directorio):
+        return perfiles
+    for hora in sorted(os.listdir(directorio)):
+        carpeta = os.path.join(directorio, hora)
+        if hora < limite or not os.path.isdir(carpeta):
+            continue
+        for nombre in os.listdir(carpeta):
+            if not nombre.endswith('.folded'):
+                continue
+            vista = nombre.rsplit('.', 2)[0]
+            with open(os.path.join(carpeta, nombre)) as archivo:
+                for linea in archivo:
+                    pila_texto, _, cantidad = linea.rstrip('\n').rpartition(' ')
+                    if pila_texto and cantidad.isdigit():
+                        perfiles[vista][pila_texto] += int(cantidad)
+    return perfiles
+
+
+def funciones_principales(pilas, cantidad=20):
+    """
+    Retorna [(función, muestras propias, muestras totales)] ordenada por
+    muestras propias. Las propias son las muestras en que la función estaba
+    ejecutándose; las totales incluyen las de las funciones que llamó.
+    """
+    propias = Counter()
+    totales = Counter()
+    for pila_texto, muestras in pilas.items():
+        marcos = pila_texto.split(';')
+        propias[marcos[-1]] += muestras
+        for marco in set(marcos):
+            totales[marco] += muestras
+    return [(marco, muestras, totales[marco]) for marco, muestras in propias.most_common(cantidad)]
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'monitoreo'
+
+urlpatterns = [
+    path('metrics', views.metricas, name='metricas'),
+    path('healthz', views.healthz, name='healthz'),
+    path('readyz', views.readyz, name='readyz'),
+]
@@ -0,0 +1,45 @@
+import hmac
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+
+from .metricas import exponer
+
+
+def metricas(request):
+    """
+    Métricas de todos los workers en formato de texto de Prometheus.
+
+    Si `METRICAS_TOKEN` está configurado, se requiere el encabezado
+    `Authorization: Bearer <token>`.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token:
+        recibido = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(recibido.encode(), token.encode()):
+            return HttpResponse(status=401)
+    return HttpResponse(exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def healthz(request):
+    """
+    El proceso está vivo y atiende solicitudes. No consulta la base.
+    """
+    return HttpResponse('ok', content_type='text/plain')
+
+
+def readyz(request):
+    """
+    El proceso puede atender tráfico: todas las bases responden.
+    """
+    errores = {}
+    for alias in connections:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception as e:
+            errores[alias] = str(e)
+    if errores:
+        return JsonResponse({'estado': 'no_listo', 'errores': errores}, status=503)
+    return JsonResponse({'estado': 'listo'})
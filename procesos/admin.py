@@ -1,3 +1,37 @@
 from django.contrib import admin
+from .models import Tarea, Programacion
 
-# Register your models here.
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para las tareas en segundo plano.
+    """
+    
+    list_display = [
+        'nombre',
+        'estado',
+        'prioridad',
+        'intentos',
+        'ejecutar_desde',
+        'iniciada',
+        'finalizada',
+    ]
+    
+    list_filter = ['estado', 'nombre', 'shard', 'estudio']
+    
+    search_fields = ['nombre', 'worker']
+    
+    readonly_fields = ['clave', 'shard', 'worker', 'iniciada', 'finalizada', 'resultado', 'error', 'fecha_creacion']
+
+
+@admin.register(Programacion)
+class ProgramacionAdmin(admin.ModelAdmin):
+    """
+    Configuración del panel de administración para los procesos recurrentes.
+    """
+    
+    list_display = ['nombre', 'tarea', 'frecuencia', 'dia', 'hora', 'ventana_minutos', 'activa', 'ultimo_periodo']
+    list_filter = ['frecuencia', 'activa']
+    list_editable = ['activa']
+    readonly_fields = ['ultimo_periodo']
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class ProcesosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'procesos'
+
+    def ready(self):
+        # Registrar las tareas definidas en el módulo tareas.py de cada app
+        autodiscover_modules('tareas')
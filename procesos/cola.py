@@ -0,0 +1,239 @@
+"""
+Cola de tareas en segundo plano sobre la base de datos del proyecto.
+
+Las funciones se registran con `@tarea('nombre')` en el módulo `tareas.py`
+de cada app y se encolan con `encolar('nombre', ...)`. Los workers toman las
+tareas con `SELECT ... FOR UPDATE SKIP LOCKED` en PostgreSQL; en SQLite, que
+no lo soporta, la toma es un UPDATE condicional sobre el estado, de modo que
+solo un worker puede pasar una tarea de PENDIENTE a EN_CURSO.
+
+Cada tarea se ejecuta con el estudio en curso al encolarla (`Tarea.estudio`),
+así las de un estudio con base propia leen y escriben en esa base.
+"""
+
+import signal
+import traceback
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+
+from estudios.contexto import SIN_ESTUDIO, estudio_actual, usar_estudio
+
+from .models import Tarea
+
+
+# Funciones registradas por nombre
+registro = {}
+
+# Segundos base del backoff exponencial entre reintentos
+ESPERA_REINTENTO = 30
+
+# Tareas en curso que pasan su timeout por este margen se consideran perdidas
+MARGEN_TAREA_PERDIDA = 60
+
+# Tarea que se está ejecutando, para que pueda informar su progreso
+tarea_actual = ContextVar('tarea_actual', default=None)
+
+
+class TiempoAgotado(Exception):
+    """La tarea superó su timeout"""
+
+
+def tarea(nombre):
+    """
+    Decorador que registra una función como tarea ejecutable por los workers.
+    """
+    def registrar(funcion):
+        registro[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def encolar(nombre, argumentos=None, prioridad=0, max_intentos=3, timeout=600, ejecutar_desde=None):
+    """
+    Crea una tarea pendiente, con el estudio en curso, y la retorna.
+    """
+    if nombre not in registro:
+        raise KeyError(f'No hay ninguna tarea registrada como "{nombre}"')
+    estudio = estudio_actual()
+    return Tarea.objects.create(
+        nombre=nombre,
+        estudio=None if estudio is SIN_ESTUDIO else estudio,
+        argumentos=argumentos or {},
+        prioridad=prioridad,
+        max_intentos=max_intentos,
+        timeout=timeout,
+        ejecutar_desde=ejecutar_desde or timezone.now(),
+    )
+
+
+def tomar_tarea(worker, shards=None):
+    """
+    Toma la próxima tarea disponible para el worker, o retorna None.
+
+    Si se indican `shards`, el worker solo toma tareas sin shard o de
+    alguno de esos shards.
+    """
+    ahora = timezone.now()
+    disponibles = Tarea.objects.filter(
+        estado=Tarea.PENDIENTE, ejecutar_desde__lte=ahora
+    ).order_by('-prioridad', 'ejecutar_desde', 'id')
+    if shards is not None:
+        disponibles = disponibles.filter(Q(shard__isnull=True) | Q(shard__in=shards))
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            tarea = disponibles.select_for_update(skip_locked=True).first()
+            if tarea is None:
+                return None
+            Tarea.objects.filter(pk=tarea.pk).update(
+                estado=Tarea.EN_CURSO, worker=worker, iniciada=ahora, intentos=F('intentos') + 1
+            )
+    else:
+        for pk in disponibles.values_list('pk', flat=True)[:10]:
+            tomada = Tarea.objects.filter(pk=pk, estado=Tarea.PENDIENTE).update(
+                estado=Tarea.EN_CURSO, worker=worker, iniciada=ahora, intentos=F('intentos') + 1
+            )
+            if tomada:
+                tarea = Tarea(pk=pk)
+                break
+        else:
+            return None
+
+    tarea.refresh_from_db()
+    return tarea
+
+
+def _agotar_tiempo(signum, frame):
+    raise TiempoAgotado()
+
+
+def ejecutar(tarea):
+    """
+    Ejecuta una tarea ya tomada y registra el resultado o el error.
+
+    El timeout se aplica con SIGALRM, por lo que solo es efectivo en el hilo
+    principal de un worker en sistemas Unix.
+    """
+    funcion = registro.get(tarea.nombre)
+    usar_alarma = hasattr(signal, 'SIGALRM')
+    try:
+        if funcion is None:
+            raise KeyError(f'No hay ninguna tarea registrada como "{tarea.nombre}"')
+        if usar_alarma:
+            signal.signal(signal.SIGALRM, _agotar_tiempo)
+            signal.alarm(tarea.timeout)
+        token = tarea_actual.set(tarea)
+        try:
+            with usar_estudio(tarea.estudio) if tarea.estudio_id else nullcontext():
+                resultado = funcion(**tarea.argumentos)
+        finally:
+            tarea_actual.reset(token)
+            if usar_alarma:
+                signal.alarm(0)
+    except Exception as e:
+        _registrar_fallo(tarea, e)
+        return False
+
+    tarea.estado = Tarea.COMPLETADA
+    tarea.resultado = resultado if _es_json(resultado) else repr(resultado)
+    tarea.finalizada = timezone.now()
+    tarea.error = ''
+    tarea.save(update_fields=['estado', 'resultado', 'finalizada', 'error'])
+    return True
+
+
+def informar_progreso(datos):
+    """
+    Guarda `datos` como resultado parcial de la tarea en ejecución, visible
+    mientras corre. Fuera de una tarea no hace nada.
+    """
+    tarea = tarea_actual.get()
+    if tarea is not None:
+        Tarea.objects.filter(pk=tarea.pk).update(resultado=datos)
+
+
+def _es_json(valor):
+    return valor is None or isinstance(valor, (str, int, float, bool, list, dict))
+
+
+def _espera_reintento(intentos):
+    return timedelta(seconds=ESPERA_REINTENTO * 2 ** (intentos - 1))
+
+
+def _registrar_fallo(tarea, error):
+    if isinstance(error, TiempoAgotado):
+        tarea.error = f'Superó el timeout de {tarea.timeout} segundos'
+    else:
+        tarea.error = ''.join(traceback.format_exception(error))
+    if tarea.intentos < tarea.max_intentos:
+        tarea.estado = Tarea.PENDIENTE
+        tarea.ejecutar_desde = timezone.now() + _espera_reintento(tarea.intentos)
+    else:
+        tarea.estado = Tarea.FALLIDA
+        tarea.finalizada = timezone.now()
+    tarea.save(update_fields=['estado', 'error', 'ejecutar_desde', 'finalizada'])
+
+
+def recuperar_perdidas():
+    """
+    Resuelve las tareas en curso cuyo worker murió sin terminarlas como un
+    intento fallido: vuelven a la cola con el backoff de los reintentos o,
+    si agotaron sus intentos (por ejemplo una tarea que mata a su worker),
+    quedan FALLIDA. Retorna la cantidad de tareas resueltas.
+    """
+    ahora = timezone.now()
+    recuperadas = 0
+    tareas = Tarea.objects.filter(estado=Tarea.EN_CURSO)
+    for tarea in tareas.only('pk', 'iniciada', 'timeout', 'intentos', 'max_intentos'):
+        if tarea.iniciada + timedelta(seconds=tarea.timeout + MARGEN_TAREA_PERDIDA) >= ahora:
+            continue
+        if tarea.intentos < tarea.max_intentos:
+            datos = {'estado': Tarea.PENDIENTE, 'ejecutar_desde': ahora + _espera_reintento(tarea.intentos)}
+        else:
+            datos = {'estado': Tarea.FALLIDA, 'finalizada': ahora}
+        recuperadas += Tarea.objects.filter(pk=tarea.pk, estado=Tarea.EN_CURSO).update(
+            error='Worker perdido durante la ejecución', **datos
+        )
+    return recuperadas
+
+
+def metricas(ventana=timedelta(hours=1)):
+    """
+    Retorna la profundidad de la cola y las latencias de la última ventana.
+    """
+    ahora = timezone.now()
+    profundidad = {
+        fila['estado']: fila['cantidad']
+        for fila in Tarea.objects.values('estado').annotate(cantidad=Count('id')).order_by()
+    }
+    listas = Tarea.objects.filter(estado=Tarea.PENDIENTE, ejecutar_desde__lte=ahora)
+    mas_antigua = listas.order_by('ejecutar_desde').values_list('ejecutar_desde', flat=True).first()
+
+    recientes = Tarea.objects.filter(
+        estado__in=[Tarea.COMPLETADA, Tarea.FALLIDA], finalizada__gte=ahora - ventana
+    )
+    tiempos = recientes.aggregate(
+        espera=Avg(F('iniciada') - F('ejecutar_desde')),
+        ejecucion=Avg(F('finalizada') - F('iniciada')),
+        ejecucion_max=Max(F('finalizada') - F('iniciada')),
+    )
+
+    return {
+        'profundidad': {estado: profundidad.get(estado, 0) for estado, _ in Tarea.ESTADOS},
+        'listas_para_ejecutar': listas.count(),
+        'espera_maxima_segundos': (ahora - mas_antigua).total_seconds() if mas_antigua else 0,
+        'finalizadas_en_ventana': recientes.count(),
+        'fallidas_en_ventana': recientes.filter(estado=Tarea.FALLIDA).count(),
+        'espera_promedio_segundos': _segundos(tiempos['espera']),
+        'ejecucion_promedio_segundos': _segundos(tiempos['ejecucion']),
+        'ejecucion_maxima_segundos': _segundos(tiempos['ejecucion_max']),
+    }
+
+
+def _segundos(duracion):
+    return round(duracion.total_seconds(), 3) if duracion is not None else None
@@ -0,0 +1,83 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from procesos.cola import ejecutar, metricas, recuperar_perdidas, tomar_tarea
+
+
+class Command(BaseCommand):
+    help = 'Ejecutar workers que procesan la cola de tareas en segundo plano'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=2, help='Cantidad de procesos worker')
+        parser.add_argument('--espera', type=float, default=2.0, help='Segundos entre consultas con la cola vacía')
+        parser.add_argument(
+            '--shard', type=int, nargs='+', dest='shards',
+            help='Shards que atiende este nodo (por defecto todos)'
+        )
+        parser.add_argument('--vaciar', action='store_true', help='Terminar cuando no queden tareas listas')
+        parser.add_argument('--metricas', action='store_true', help='Mostrar métricas de la cola y salir')
+
+    def handle(self, *args, **options):
+        if options['metricas']:
+            self.stdout.write(json.dumps(metricas(), indent=2))
+            return
+
+        recuperadas = recuperar_perdidas()
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f'{recuperadas} tareas perdidas vueltas a la cola o fallidas'))
+
+        # Cada worker abre sus propias conexiones a la base
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=trabajar, args=(numero, options['espera'], options['vaciar'], options['shards']), daemon=False
+            )
+            for numero in range(options['procesos'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f'{len(workers)} workers iniciados'))
+
+        def detener(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    os.kill(worker.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS('Workers detenidos'))
+
+
+def trabajar(numero, espera, vaciar, shards=None):
+    """
+    Ciclo principal de un proceso worker.
+    """
+    nombre = f'{socket.gethostname()}:{os.getpid()}'
+    detenido = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: detenido.append(True))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    ultima_recuperacion = time.monotonic()
+    while not detenido:
+        tarea = tomar_tarea(nombre, shards)
+        if tarea is not None:
+            ejecutar(tarea)
+            continue
+        if vaciar:
+            break
+        if numero == 0 and time.monotonic() - ultima_recuperacion > 60:
+            recuperar_perdidas()
+            ultima_recuperacion = time.monotonic()
+        time.sleep(espera)
+
+    connections.close_all()
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from procesos.programador import programar
+
+
+class Command(BaseCommand):
+    help = 'Generar las tareas por cliente de las programaciones vencidas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cada', type=int, default=0,
+            help='Repetir cada N segundos en lugar de ejecutar una sola vez'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            generadas = programar()
+            for nombre, cantidad in generadas.items():
+                self.stdout.write(self.style.SUCCESS(f'{nombre}: {cantidad} tareas generadas'))
+            if not options['cada']:
+                break
+            time.sleep(options['cada'])
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(help_text='Nombre con el que se registró la función de la tarea', max_length=100, verbose_name='Nombre')),
+                ('argumentos', models.JSONField(blank=True, default=dict, verbose_name='Argumentos')),
+                ('prioridad', models.SmallIntegerField(default=0, help_text='Las tareas de mayor prioridad se ejecutan primero', verbose_name='Prioridad')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida')], default='PENDIENTE', max_length=10, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('max_intentos', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de Intentos')),
+                ('timeout', models.PositiveIntegerField(default=600, help_text='Segundos máximos de ejecución de cada intento', verbose_name='Timeout')),
+                ('ejecutar_desde', models.DateTimeField(verbose_name='Ejecutar Desde')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('iniciada', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada')),
+                ('finalizada', models.DateTimeField(blank=True, null=True, verbose_name='Finalizada')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', '-prioridad', 'ejecutar_desde', 'id'], name='tarea_cola')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procesos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Programacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('tarea', models.CharField(help_text='Tarea registrada que recibe cliente_id y periodo', max_length=100, verbose_name='Tarea')),
+                ('frecuencia', models.CharField(choices=[('DIARIA', 'Diaria'), ('SEMANAL', 'Semanal'), ('MENSUAL', 'Mensual')], default='MENSUAL', max_length=10, verbose_name='Frecuencia')),
+                ('dia', models.PositiveSmallIntegerField(default=1, help_text='Día del mes (1 a 28) o de la semana (0 = lunes) según la frecuencia', verbose_name='Día')),
+                ('hora', models.TimeField(verbose_name='Hora')),
+                ('ventana_minutos', models.PositiveIntegerField(default=60, help_text='Minutos en los que se reparten las tareas de un período', verbose_name='Ventana (minutos)')),
+                ('prioridad', models.SmallIntegerField(default=0, verbose_name='Prioridad')),
+                ('activa', models.BooleanField(default=True, verbose_name='Activa')),
+                ('ultimo_periodo', models.CharField(blank=True, help_text='Último período para el que ya se generaron las tareas', max_length=20, verbose_name='Último Período')),
+            ],
+            options={
+                'verbose_name': 'Programación',
+                'verbose_name_plural': 'Programaciones',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tarea',
+            name='clave',
+            field=models.CharField(blank=True, help_text='Identifica la ejecución para no encolarla dos veces', max_length=200, null=True, unique=True, verbose_name='Clave'),
+        ),
+        migrations.AddField(
+            model_name='tarea',
+            name='shard',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Grupo de workers que puede tomar la tarea (vacío = cualquiera)', null=True, verbose_name='Shard'),
+        ),
+    ]
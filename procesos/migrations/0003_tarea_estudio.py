@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estudios', '0001_initial'),
+        ('procesos', '0002_programacion_tarea_clave_tarea_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarea',
+            name='estudio',
+            field=models.ForeignKey(blank=True, help_text='Estudio con el que se ejecuta la tarea (vacío = todos los de la base default)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tareas', to='estudios.estudio', verbose_name='Estudio'),
+        ),
+    ]
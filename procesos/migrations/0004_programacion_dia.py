@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:22
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('procesos', '0003_tarea_estudio'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='programacion',
+            name='dia',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Día del mes (1 a 31; en los meses más cortos, el último) o de la semana (0 = lunes a 6 = domingo) según la frecuencia', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(31)], verbose_name='Día'),
+        ),
+    ]
@@ -1,3 +1,237 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-# Create your models here.
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano guardado en la base de datos.
+
+    Los workers de `procesar_tareas` toman las tareas pendientes por
+    prioridad y las ejecutan fuera del ciclo de request.
+    """
+
+    PENDIENTE = 'PENDIENTE'
+    EN_CURSO = 'EN_CURSO'
+    COMPLETADA = 'COMPLETADA'
+    FALLIDA = 'FALLIDA'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    nombre = models.CharField(
+        max_length=100,
+        verbose_name="Nombre",
+        help_text="Nombre con el que se registró la función de la tarea"
+    )
+
+    argumentos = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Argumentos"
+    )
+
+    prioridad = models.SmallIntegerField(
+        default=0,
+        verbose_name="Prioridad",
+        help_text="Las tareas de mayor prioridad se ejecutan primero"
+    )
+
+    estado = models.CharField(
+        max_length=10,
+        choices=ESTADOS,
+        default=PENDIENTE,
+        verbose_name="Estado"
+    )
+
+    intentos = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Intentos"
+    )
+
+    max_intentos = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name="Máximo de Intentos"
+    )
+
+    timeout = models.PositiveIntegerField(
+        default=600,
+        verbose_name="Timeout",
+        help_text="Segundos máximos de ejecución de cada intento"
+    )
+
+    ejecutar_desde = models.DateTimeField(
+        verbose_name="Ejecutar Desde"
+    )
+
+    clave = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name="Clave",
+        help_text="Identifica la ejecución para no encolarla dos veces"
+    )
+
+    shard = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Shard",
+        help_text="Grupo de workers que puede tomar la tarea (vacío = cualquiera)"
+    )
+
+    estudio = models.ForeignKey(
+        'estudios.Estudio',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tareas',
+        verbose_name="Estudio",
+        help_text="Estudio con el que se ejecuta la tarea (vacío = todos los de la base default)"
+    )
+
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Worker"
+    )
+
+    iniciada = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Iniciada"
+    )
+
+    finalizada = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Finalizada"
+    )
+
+    resultado = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Resultado"
+    )
+
+    error = models.TextField(
+        blank=True,
+        verbose_name="Error"
+    )
+
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(
+                fields=['estado', '-prioridad', 'ejecutar_desde', 'id'],
+                name='tarea_cola'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} #{self.pk} ({self.estado})"
+
+
+class Programacion(models.Model):
+    """
+    Proceso recurrente que se ejecuta para cada cliente activo.
+
+    En cada período se genera una tarea por cliente, repartidas en
+    `ventana_minutos` a partir de la hora programada para no lanzar
+    miles de tareas al mismo tiempo.
+    """
+
+    DIARIA = 'DIARIA'
+    SEMANAL = 'SEMANAL'
+    MENSUAL = 'MENSUAL'
+    FRECUENCIAS = [
+        (DIARIA, 'Diaria'),
+        (SEMANAL, 'Semanal'),
+        (MENSUAL, 'Mensual'),
+    ]
+
+    nombre = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Nombre"
+    )
+
+    tarea = models.CharField(
+        max_length=100,
+        verbose_name="Tarea",
+        help_text="Tarea registrada que recibe cliente_id y periodo"
+    )
+
+    frecuencia = models.CharField(
+        max_length=10,
+        choices=FRECUENCIAS,
+        default=MENSUAL,
+        verbose_name="Frecuencia"
+    )
+
+    dia = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(0), MaxValueValidator(31)],
+        verbose_name="Día",
+        help_text=(
+            "Día del mes (1 a 31; en los meses más cortos, el último) o de la "
+            "semana (0 = lunes a 6 = domingo) según la frecuencia"
+        )
+    )
+
+    hora = models.TimeField(
+        verbose_name="Hora"
+    )
+
+    ventana_minutos = models.PositiveIntegerField(
+        default=60,
+        verbose_name="Ventana (minutos)",
+        help_text="Minutos en los que se reparten las tareas de un período"
+    )
+
+    prioridad = models.SmallIntegerField(
+        default=0,
+        verbose_name="Prioridad"
+    )
+
+    activa = models.BooleanField(
+        default=True,
+        verbose_name="Activa"
+    )
+
+    ultimo_periodo = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name="Último Período",
+        help_text="Último período para el que ya se generaron las tareas"
+    )
+
+    class Meta:
+        verbose_name = "Programación"
+        verbose_name_plural = "Programaciones"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.get_frecuencia_display()})"
+
+    def clean(self):
+        """
+        Valida el día según la frecuencia.
+        """
+        super().clean()
+        if self.frecuencia == self.MENSUAL and not 1 <= self.dia <= 31:
+            raise ValidationError({'dia': 'Para una programación mensual el día debe estar entre 1 y 31.'})
+        if self.frecuencia == self.SEMANAL and not 0 <= self.dia <= 6:
+            raise ValidationError({
+                'dia': 'Para una programación semanal el día debe estar entre 0 (lunes) y 6 (domingo).'
+            })
@@ -0,0 +1,135 @@
+"""
+Expansión de las programaciones recurrentes en tareas por cliente.
+
+`programar()` es idempotente: cada tarea generada lleva la clave
+`programacion:periodo:cliente`, única en la base, así que correr el
+programador varias veces o desde varios nodos a la vez nunca duplica una
+ejecución.
+
+Cada tarea se asigna a un shard según el hash del CUIT del cliente, para que
+cada grupo de workers (`procesar_tareas --shard`) atienda siempre los mismos
+clientes, y su inicio se desplaza dentro de la ventana de la programación
+según ese mismo hash para repartir la carga.
+
+Los clientes de los estudios con base propia se recorren en su base y sus
+tareas se ejecutan con ese estudio (`Tarea.estudio`).
+"""
+
+import calendar
+import zlib
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from clientes.models import Cliente
+from estudios.contexto import alcances, usar_estudio
+
+from .models import Programacion, Tarea
+
+
+# Cantidad de shards entre los que se reparten las tareas por cliente
+SHARDS = getattr(settings, 'PROCESOS_SHARDS', 1)
+
+TAMANIO_LOTE = 1000
+
+
+def hash_cuit(cuit):
+    """Hash estable del CUIT, igual en todos los procesos y nodos"""
+    return zlib.crc32(cuit.replace('-', '').encode('ascii'))
+
+
+def shard_de(cuit, shards=None):
+    return hash_cuit(cuit) % (shards or SHARDS)
+
+
+def _dia_del_mes(fecha, dia):
+    """La fecha del mes de `fecha` con el día indicado, o el último si el mes es más corto"""
+    return fecha.replace(day=min(max(dia, 1), calendar.monthrange(fecha.year, fecha.month)[1]))
+
+
+def periodo_actual(programacion, ahora=None):
+    """
+    Retorna (clave del período, inicio) de la ocurrencia más reciente de la
+    programación que ya debería haber comenzado.
+    """
+    ahora = timezone.localtime(ahora or timezone.now())
+    hora = programacion.hora
+
+    def en(fecha):
+        return timezone.make_aware(datetime.combine(fecha, hora))
+
+    if programacion.frecuencia == Programacion.DIARIA:
+        inicio = en(ahora.date())
+        if inicio > ahora:
+            inicio = en(ahora.date() - timedelta(days=1))
+        return inicio.strftime('%Y-%m-%d'), inicio
+
+    if programacion.frecuencia == Programacion.SEMANAL:
+        fecha = ahora.date() - timedelta(days=(ahora.weekday() - programacion.dia) % 7)
+        inicio = en(fecha)
+        if inicio > ahora:
+            inicio = en(fecha - timedelta(days=7))
+        return inicio.strftime('%G-W%V'), inicio
+
+    inicio = en(_dia_del_mes(ahora.date(), programacion.dia))
+    if inicio > ahora:
+        mes_anterior = ahora.date().replace(day=1) - timedelta(days=1)
+        inicio = en(_dia_del_mes(mes_anterior, programacion.dia))
+    return inicio.strftime('%Y-%m'), inicio
+
+
+def expandir(programacion, periodo, inicio, shards=None):
+    """
+    Genera en bloque una tarea por cliente activo para el período, en todas
+    las bases. Retorna la cantidad de tareas consideradas.
+    """
+    total = 0
+    for estudio in alcances():
+        with usar_estudio(estudio):
+            total += _expandir(programacion, periodo, inicio, estudio, shards or SHARDS)
+    return total
+
+
+def _expandir(programacion, periodo, inicio, estudio, shards):
+    ventana = programacion.ventana_minutos * 60
+    clientes = Cliente.objects.filter(activo=True).order_by().values_list('pk', 'cuit')
+    # Los ids de clientes se repiten entre las bases de los estudios
+    prefijo = f'{programacion.pk}:{periodo}:' + (f'{estudio.pk}:' if estudio else '')
+
+    total = 0
+    lote = []
+    for pk, cuit in clientes.iterator(chunk_size=TAMANIO_LOTE):
+        valor = hash_cuit(cuit)
+        lote.append(Tarea(
+            nombre=programacion.tarea,
+            argumentos={'cliente_id': pk, 'periodo': periodo},
+            prioridad=programacion.prioridad,
+            clave=f'{prefijo}{pk}',
+            shard=valor % shards,
+            estudio=estudio,
+            ejecutar_desde=inicio + timedelta(seconds=(valor // shards) % ventana if ventana else 0),
+        ))
+        if len(lote) >= TAMANIO_LOTE:
+            Tarea.objects.bulk_create(lote, ignore_conflicts=True)
+            total += len(lote)
+            lote = []
+    if lote:
+        Tarea.objects.bulk_create(lote, ignore_conflicts=True)
+        total += len(lote)
+    return total
+
+
+def programar(ahora=None):
+    """
+    Expande todas las programaciones activas cuyo período actual todavía no
+    fue generado. Retorna un diccionario {programación: tareas}.
+    """
+    generadas = {}
+    for programacion in Programacion.objects.filter(activa=True):
+        periodo, inicio = periodo_actual(programacion, ahora)
+        if programacion.ultimo_periodo == periodo:
+            continue
+        generadas[programacion.nombre] = expandir(programacion, periodo, inicio)
+        Programacion.objects.filter(pk=programacion.pk).update(ultimo_periodo=periodo)
+    return generadas
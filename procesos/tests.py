@@ -1,3 +1,270 @@
+import time
+from datetime import datetime, time as hora, timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+
+from clientes.models import Cliente
+from estudios.contexto import estudio_actual, usar_estudio
+from estudios.models import Estudio
+
+from . import cola, programador
+from .models import Programacion, Tarea
+
+
+def _tarea_exitosa(**argumentos):
+    return {'recibidos': argumentos}
+
+
+def _tarea_con_error():
+    raise ValueError('falló')
+
+
+def _tarea_lenta():
+    time.sleep(5)
+
+
+def _tarea_con_estudio():
+    estudio = estudio_actual()
+    return estudio.slug if estudio else None
+
+
+def _tarea_con_progreso():
+    cola.informar_progreso({'hechos': 1})
+    return Tarea.objects.get(pk=cola.tarea_actual.get().pk).resultado
+
+
+REGISTRO_PRUEBA = {
+    'prueba.exitosa': _tarea_exitosa,
+    'prueba.error': _tarea_con_error,
+    'prueba.lenta': _tarea_lenta,
+    'prueba.estudio': _tarea_con_estudio,
+    'prueba.progreso': _tarea_con_progreso,
+    'prueba.objeto': lambda: object(),
+}
+
+
+class ColaTests(TestCase):
+
+    def setUp(self):
+        parche = mock.patch.dict(cola.registro, REGISTRO_PRUEBA)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_encolar_tarea_no_registrada(self):
+        with self.assertRaises(KeyError):
+            cola.encolar('prueba.inexistente')
+
+    def test_toma_por_prioridad_y_antiguedad(self):
+        antes = timezone.now() - timedelta(minutes=5)
+        cola.encolar('prueba.exitosa', {'orden': 3})
+        cola.encolar('prueba.exitosa', {'orden': 2}, ejecutar_desde=antes)
+        cola.encolar('prueba.exitosa', {'orden': 1}, prioridad=5)
+
+        ordenes = [cola.tomar_tarea('w').argumentos['orden'] for _ in range(3)]
+
+        self.assertEqual(ordenes, [1, 2, 3])
+        self.assertIsNone(cola.tomar_tarea('w'))
+
+    def test_tomar_marca_en_curso(self):
+        cola.encolar('prueba.exitosa')
+
+        tarea = cola.tomar_tarea('worker-1')
+
+        self.assertEqual(tarea.estado, Tarea.EN_CURSO)
+        self.assertEqual(tarea.worker, 'worker-1')
+        self.assertEqual(tarea.intentos, 1)
+        self.assertIsNotNone(tarea.iniciada)
+        # Ya tomada, otro worker no la ve
+        self.assertIsNone(cola.tomar_tarea('worker-2'))
+
+    def test_no_toma_tareas_futuras(self):
+        cola.encolar('prueba.exitosa', ejecutar_desde=timezone.now() + timedelta(minutes=1))
+
+        self.assertIsNone(cola.tomar_tarea('w'))
+
+    def test_shards(self):
+        otra = cola.encolar('prueba.exitosa')
+        Tarea.objects.filter(pk=otra.pk).update(shard=1)
+        propia = cola.encolar('prueba.exitosa')
+        Tarea.objects.filter(pk=propia.pk).update(shard=0)
+        sin_shard = cola.encolar('prueba.exitosa')
+
+        tomadas = {cola.tomar_tarea('w', shards=[0]).pk, cola.tomar_tarea('w', shards=[0]).pk}
+
+        self.assertEqual(tomadas, {propia.pk, sin_shard.pk})
+        self.assertIsNone(cola.tomar_tarea('w', shards=[0]))
+
+    def test_ejecutar_guarda_el_resultado(self):
+        cola.encolar('prueba.exitosa', {'a': 1})
+        tarea = cola.tomar_tarea('w')
+
+        self.assertTrue(cola.ejecutar(tarea))
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.COMPLETADA)
+        self.assertEqual(tarea.resultado, {'recibidos': {'a': 1}})
+        self.assertIsNotNone(tarea.finalizada)
+
+    def test_resultado_no_serializable(self):
+        cola.encolar('prueba.objeto')
+        tarea = cola.tomar_tarea('w')
+
+        cola.ejecutar(tarea)
+
+        tarea.refresh_from_db()
+        self.assertTrue(tarea.resultado.startswith('<object object'))
+
+    def test_reintento_con_backoff(self):
+        cola.encolar('prueba.error', max_intentos=2)
+
+        tarea = cola.tomar_tarea('w')
+        self.assertFalse(cola.ejecutar(tarea))
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.PENDIENTE)
+        self.assertIn('ValueError: falló', tarea.error)
+        espera = tarea.ejecutar_desde - timezone.now()
+        self.assertAlmostEqual(espera.total_seconds(), cola.ESPERA_REINTENTO, delta=5)
+
+        # Segundo y último intento, cuando vence la espera
+        Tarea.objects.filter(pk=tarea.pk).update(ejecutar_desde=timezone.now())
+        tarea = cola.tomar_tarea('w')
+        self.assertFalse(cola.ejecutar(tarea))
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+        self.assertEqual(tarea.intentos, 2)
+        self.assertIsNotNone(tarea.finalizada)
+
+    def test_backoff_exponencial(self):
+        self.assertEqual(
+            [cola._espera_reintento(intentos).total_seconds() for intentos in (1, 2, 3)],
+            [cola.ESPERA_REINTENTO, cola.ESPERA_REINTENTO * 2, cola.ESPERA_REINTENTO * 4],
+        )
+
+    def test_timeout(self):
+        cola.encolar('prueba.lenta', timeout=1, max_intentos=1)
+        tarea = cola.tomar_tarea('w')
+
+        inicio = time.monotonic()
+        self.assertFalse(cola.ejecutar(tarea))
+
+        self.assertLess(time.monotonic() - inicio, 4)
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, Tarea.FALLIDA)
+        self.assertEqual(tarea.error, 'Superó el timeout de 1 segundos')
+
+    def test_ejecuta_con_el_estudio_encolado(self):
+        estudio = Estudio.objects.create(nombre='Estudio A', slug='estudio-a')
+        with usar_estudio(estudio):
+            cola.encolar('prueba.estudio')
+        cola.encolar('prueba.estudio')
+
+        resultados = []
+        while (tarea := cola.tomar_tarea('w')) is not None:
+            cola.ejecutar(tarea)
+            tarea.refresh_from_db()
+            resultados.append((tarea.estudio_id, tarea.resultado))
+
+        self.assertCountEqual(resultados, [(estudio.pk, 'estudio-a'), (None, None)])
+
+    def test_informar_progreso(self):
+        cola.encolar('prueba.progreso')
+        tarea = cola.tomar_tarea('w')
+
+        cola.ejecutar(tarea)
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.resultado, {'hechos': 1})
+        # Fuera de una tarea no hace nada
+        cola.informar_progreso({'hechos': 2})
+
+    def _en_curso(self, iniciada, intentos, max_intentos=3):
+        tarea = cola.encolar('prueba.exitosa', max_intentos=max_intentos, timeout=60)
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado=Tarea.EN_CURSO, iniciada=iniciada, intentos=intentos
+        )
+        return tarea
+
+    def test_recuperar_perdidas(self):
+        vencida = timezone.now() - timedelta(seconds=60 + cola.MARGEN_TAREA_PERDIDA + 10)
+        reintentable = self._en_curso(vencida, intentos=1)
+        agotada = self._en_curso(vencida, intentos=3)
+        corriendo = self._en_curso(timezone.now(), intentos=1)
+
+        self.assertEqual(cola.recuperar_perdidas(), 2)
+
+        reintentable.refresh_from_db()
+        self.assertEqual(reintentable.estado, Tarea.PENDIENTE)
+        self.assertGreater(reintentable.ejecutar_desde, timezone.now())
+        self.assertEqual(reintentable.error, 'Worker perdido durante la ejecución')
+        agotada.refresh_from_db()
+        self.assertEqual(agotada.estado, Tarea.FALLIDA)
+        self.assertIsNotNone(agotada.finalizada)
+        corriendo.refresh_from_db()
+        self.assertEqual(corriendo.estado, Tarea.EN_CURSO)
+
+
+class ProgramadorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.estudio = Estudio.objects.create(nombre='Estudio A', slug='estudio-a')
+        cls.cuits = ['20-11111111-2', '20-22222222-3', '27-33333333-4']
+        for numero, cuit in enumerate(cls.cuits):
+            Cliente.objects.create(estudio=cls.estudio, nombre=f'Cliente {numero}', cuit=cuit)
+        Cliente.objects.create(estudio=cls.estudio, nombre='Inactivo', cuit='20-44444444-5', activo=False)
+        cls.programacion = Programacion.objects.create(
+            nombre='Mensual', tarea='prueba.cliente', frecuencia=Programacion.MENSUAL,
+            dia=5, hora=hora(8, 0), ventana_minutos=30,
+        )
+
+    def _ahora(self, *fecha):
+        return timezone.make_aware(datetime(*fecha))
+
+    def test_programar_genera_una_tarea_por_cliente_activo(self):
+        generadas = programador.programar(self._ahora(2026, 3, 10, 12, 0))
+
+        self.assertEqual(generadas, {'Mensual': 3})
+        tareas = Tarea.objects.filter(nombre='prueba.cliente')
+        self.assertEqual(tareas.count(), 3)
+        inicio = self._ahora(2026, 3, 5, 8, 0)
+        for tarea in tareas:
+            self.assertEqual(tarea.argumentos['periodo'], '2026-03')
+            self.assertGreaterEqual(tarea.ejecutar_desde, inicio)
+            self.assertLess(tarea.ejecutar_desde, inicio + timedelta(minutes=30))
+
+    def test_programar_es_idempotente(self):
+        ahora = self._ahora(2026, 3, 10, 12, 0)
+        programador.programar(ahora)
+
+        # Ya generado: no vuelve a expandir
+        self.assertEqual(programador.programar(ahora), {})
+        # Aunque se pierda la marca del período, las claves no se repiten
+        Programacion.objects.update(ultimo_periodo='')
+        programador.programar(ahora)
+        self.assertEqual(Tarea.objects.filter(nombre='prueba.cliente').count(), 3)
+
+        programador.programar(self._ahora(2026, 4, 6, 0, 0))
+        self.assertEqual(Tarea.objects.filter(nombre='prueba.cliente').count(), 6)
+
+    def test_shard_por_cuit(self):
+        programador.expandir(self.programacion, '2026-03', self._ahora(2026, 3, 5, 8, 0), shards=4)
+
+        cuits = dict(Cliente.objects.values_list('pk', 'cuit'))
+        for tarea in Tarea.objects.all():
+            self.assertEqual(tarea.shard, programador.shard_de(cuits[tarea.argumentos['cliente_id']], 4))
+
+    def test_periodo_con_dia_mayor_al_mes(self):
+        self.programacion.dia = 31
+
+        periodo, inicio = programador.periodo_actual(self.programacion, self._ahora(2026, 2, 28, 9, 0))
+
+        self.assertEqual(periodo, '2026-02')
+        self.assertEqual(inicio, self._ahora(2026, 2, 28, 8, 0))
+
+    def test_periodo_anterior_si_no_llego_la_hora(self):
+        periodo, inicio = programador.periodo_actual(self.programacion, self._ahora(2026, 3, 5, 7, 0))
 
-# Create your tests here.
+        self.assertEqual(periodo, '2026-02')
+        self.assertEqual(inicio, self._ahora(2026, 2, 5, 8, 0))
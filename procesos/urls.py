@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = 'procesos'
+
+urlpatterns = [
+    path('procesos/metricas/', views.metricas_tareas, name='metricas'),
+]
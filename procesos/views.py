@@ -1,3 +1,12 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 
-# Create your views here.
+from .cola import metricas
+
+
+@staff_member_required
+def metricas_tareas(request):
+    """
+    Vista JSON con la profundidad de la cola de tareas y sus latencias.
+    """
+    return JsonResponse(metricas())